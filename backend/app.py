@@ -1,40 +1,76 @@
-from flask import Flask, jsonify, render_template
+from flask import Flask, jsonify
+from werkzeug.middleware.proxy_fix import ProxyFix
 from config import Config
-from extensions import db, migrate, jwt
+from extensions import db, migrate, jwt, password_hasher, client_search_index
 from routes import register_routes
+from services import shipment_search, geocoding, client_stats, office_analytics, throughput, client_import
+from services.archival import shipment_archiver
+from services.report_jobs import report_jobs
+from services.tariff import tariff_engine
+from services.office_locator import office_locator
+from services.idempotency import idempotency
+from services.admission import admission
+from services.contact_buffer import contact_buffer
+from services.org_tree import org_tree
+from services.purge import purge_jobs
+from services.sharding import shards
+from services.assets import assets
 import models
 
 def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
+    hops = app.config.get("PROXY_FIX_HOPS", 0)
+    if hops:
+        # Client address, scheme and host as the outermost trusted proxy saw them
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
 
     # Extensions
+    shards.init_app(app)  # adds the shard binds, so before db
     db.init_app(app)
     migrate.init_app(app, db)
     jwt.init_app(app)
+    password_hasher.init_app(app)
+    client_search_index.init_app(app)
+    shipment_search.init_app(app)
+    client_stats.init_app(app)
+    office_analytics.init_app(app)
+    throughput.init_app(app)
+    geocoding.init_app(app)
+    client_import.init_app(app)
+    office_locator.init_app(app)
+    org_tree.init_app(app)
+    shipment_archiver.init_app(app)
+    report_jobs.init_app(app)
+    purge_jobs.init_app(app)
+    tariff_engine.init_app(app)
+    idempotency.init_app(app)
+    admission.init_app(app)
+    contact_buffer.init_app(app)
+    assets.init_app(app)
 
     # Routes
     register_routes(app)
 
     @app.get("/")
     def home():
-        return render_template("logistics-company.html")
+        return assets.page("logistics-company.html")
 
     @app.get("/login.html")
     def login():
-        return render_template("login.html")
+        return assets.page("login.html")
 
     @app.get("/register.html")
     def register():
-        return render_template("register.html")
+        return assets.page("register.html")
 
     @app.get("/shipments.html")
     def shipments():
-        return render_template("shipments.html")
+        return assets.page("shipments.html")
 
     @app.get("/dashboard.html")
     def dashboard():
-        return render_template("dashboard.html")
+        return assets.page("dashboard.html")
 
     @app.get("/api/health")
     def health():
@@ -0,0 +1,38 @@
+"""
+ASGI entry point (optional async serving mode)
+
+Hot read routes (shipment list/detail, tracking, client lookup) run on an
+async SQLAlchemy engine; every other request is handed to the Flask app.
+
+    uvicorn asgi:app --host 0.0.0.0 --port 8000 --workers 4
+"""
+from contextlib import asynccontextmanager
+from asgiref.wsgi import WsgiToAsgi
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from app import app as flask_app
+from async_routes import async_routes
+from services.async_db import create_async_session_factory
+
+def create_asgi_app(flask_app):
+    if flask_app.extensions["shards"].names():
+        # The async engine only knows the main database (services/sharding.py)
+        raise RuntimeError("ASGI mode does not support SHARDS; serve the WSGI app instead")
+    engine, session_factory = create_async_session_factory(flask_app.config)
+
+    @asynccontextmanager
+    async def lifespan(asgi_app):
+        yield
+        await engine.dispose()
+
+    asgi_app = Starlette(
+        routes=[*async_routes(), Mount("/", app=WsgiToAsgi(flask_app))],
+        lifespan=lifespan,
+    )
+    # Shared with the async handlers: JWT settings, the session factory and its pool
+    asgi_app.state.flask_app = flask_app
+    asgi_app.state.async_session = session_factory
+    asgi_app.state.async_engine = engine
+    return asgi_app
+
+app = create_asgi_app(flask_app)
@@ -0,0 +1,20 @@
+from starlette.middleware import Middleware
+from starlette.routing import Route
+from .admission import AdmissionMiddleware
+from .shipment import get_shipments, get_shipment, track_shipment
+from .client import get_current_client, get_client
+
+# Hot read routes served natively on the async engine in ASGI mode.
+# Same paths and responses as the Flask blueprints; every other request
+# falls through to the Flask app. They skip the Flask before_request hooks,
+# so admission control runs as middleware on each of them.
+
+def async_routes():
+    middleware = [Middleware(AdmissionMiddleware)]
+    return [
+        Route("/api/shipment", get_shipments, methods=["GET"], middleware=middleware),
+        Route("/api/shipment/{shipment_id:int}", get_shipment, methods=["GET"], middleware=middleware),
+        Route("/api/shipment/track/{tracking_number}", track_shipment, methods=["GET"], middleware=middleware),
+        Route("/api/client/me", get_current_client, methods=["GET"], middleware=middleware),
+        Route("/api/client/{client_id:int}", get_client, methods=["GET"], middleware=middleware),
+    ]
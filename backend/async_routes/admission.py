@@ -0,0 +1,42 @@
+from flask_jwt_extended import decode_token
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from services.admission import admission, client_address
+
+# Admission control for the async routes, the check services/admission.py runs
+# in the Flask app's before_request. All of them are reads; the in-flight
+# counts and token buckets are the ones the Flask requests use.
+
+class AdmissionMiddleware:
+    def __init__(self, app, kind="read"):
+        self.app = app
+        self.kind = kind
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not admission.enabled or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        request = Request(scope)
+        pool = request.app.state.async_engine.sync_engine.pool
+        error = admission.admit(self.kind, _identity(request), request.headers.get("X-Request-Start"), pool)
+        if error is not None:
+            body, status, headers = error
+            await JSONResponse(body, status_code=status, headers=headers)(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            admission.release(self.kind)
+
+
+def _identity(request):
+    header = request.headers.get("Authorization", "")
+    if header.startswith("Bearer "):
+        try:
+            with request.app.state.flask_app.app_context():
+                return f"user:{decode_token(header[len('Bearer '):])['sub']}"
+        except Exception:
+            # Rejected by the route; counted by address like in the Flask app
+            pass
+    remote_addr = request.client.host if request.client else None
+    return f"ip:{client_address(remote_addr, request.headers.get('X-Forwarded-For'), admission.proxy_hops)}"
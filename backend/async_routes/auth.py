@@ -0,0 +1,24 @@
+import functools
+from flask_jwt_extended import decode_token
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt import ExpiredSignatureError, PyJWTError
+from starlette.responses import JSONResponse
+
+# JWT check for async routes, using the Flask app's flask_jwt_extended settings
+
+def jwt_required(handler):
+    @functools.wraps(handler)
+    async def wrapper(request):
+        header = request.headers.get("Authorization", "")
+        if not header.startswith("Bearer "):
+            return JSONResponse({"msg": "Missing Authorization Header"}, status_code=401)
+        try:
+            with request.app.state.flask_app.app_context():
+                claims = decode_token(header[len("Bearer "):])
+        except ExpiredSignatureError:
+            return JSONResponse({"msg": "Token has expired"}, status_code=401)
+        except (PyJWTError, JWTExtendedException) as e:
+            return JSONResponse({"msg": str(e)}, status_code=422)
+        request.state.claims = claims
+        return await handler(request)
+    return wrapper
@@ -0,0 +1,40 @@
+from starlette.responses import JSONResponse
+from sqlalchemy import select
+from models.client import Client
+from models.client_shipment_stats import ClientShipmentStats
+from services.access import identity_from_claims
+from .auth import jwt_required
+
+# Async versions of the client lookup routes in routes/client.py
+
+@jwt_required
+async def get_current_client(request):
+    """Get current logged-in client's profile with shipment counters"""
+    role, user_id = identity_from_claims(request.state.claims)
+
+    if role != "CLIENT":
+        return JSONResponse({"error": "Only clients can access this endpoint"}, status_code=403)
+    if not user_id:
+        return JSONResponse({"error": "Invalid user ID"}, status_code=400)
+
+    async with request.app.state.async_session() as session:
+        client = (await session.execute(select(Client).where(Client.user_id == user_id))).scalar()
+        if not client:
+            return JSONResponse({"error": "Client profile not found"}, status_code=404)
+        # Maintained counters (one primary key lookup, no shipment scan)
+        stats = await session.get(ClientShipmentStats, client.id)
+
+    data = client.to_dict()
+    data["stats"] = stats.to_dict() if stats else ClientShipmentStats.empty()
+    return JSONResponse(data)
+
+@jwt_required
+async def get_client(request):
+    """Get specific client details"""
+    async with request.app.state.async_session() as session:
+        client = await session.get(Client, request.path_params["client_id"])
+
+    if not client:
+        return JSONResponse({"error": "Client not found"}, status_code=404)
+
+    return JSONResponse(client.to_dict())
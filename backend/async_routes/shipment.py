@@ -0,0 +1,67 @@
+from starlette.responses import JSONResponse
+from sqlalchemy import select
+from models.shipment import Shipment
+from services.parcel_size import size_filters
+from services.access import identity_from_claims, client_id_for_user, visible_shipments, can_view_shipment, tracking_view
+from .auth import jwt_required
+
+# Async versions of the shipment read routes in routes/shipment.py
+
+@jwt_required
+async def get_shipments(request):
+    """
+    Employees can view all shipments
+    Clients can only view their own shipments (sent or received)
+    Optional size ranges: min_/max_ weight, length, width, height, volume
+    """
+    role, user_id = identity_from_claims(request.state.claims)
+
+    try:
+        filters = size_filters(request.query_params, Shipment)
+    except ValueError as e:
+        return JSONResponse({"error": str(e)}, status_code=400)
+
+    async with request.app.state.async_session() as session:
+        client_id = None
+        if role != "EMPLOYEE":
+            client_id = (await session.execute(client_id_for_user(user_id))).scalar()
+            if not client_id:
+                return JSONResponse({"error": "Client profile not found"}, status_code=404)
+
+        shipments = (await session.execute(visible_shipments(role, client_id).where(*filters))).scalars().all()
+
+    return JSONResponse([s.to_dict() for s in shipments])
+
+@jwt_required
+async def get_shipment(request):
+    """
+    Employees can view any shipment
+    Clients can only view their own shipments
+    """
+    role, user_id = identity_from_claims(request.state.claims)
+
+    async with request.app.state.async_session() as session:
+        shipment = await session.get(Shipment, request.path_params["shipment_id"])
+        if not shipment:
+            return JSONResponse({"error": "Shipment not found"}, status_code=404)
+
+        client_id = None
+        if role == "CLIENT":
+            client_id = (await session.execute(client_id_for_user(user_id))).scalar()
+
+    if not can_view_shipment(role, client_id, shipment):
+        return JSONResponse({"error": "Unauthorized"}, status_code=403)
+
+    return JSONResponse(shipment.to_dict())
+
+async def track_shipment(request):
+    """Public shipment tracking by tracking number"""
+    async with request.app.state.async_session() as session:
+        shipment = (await session.execute(
+            select(Shipment).where(Shipment.tracking_number == request.path_params["tracking_number"])
+        )).scalar()
+
+    if not shipment:
+        return JSONResponse({"error": "Shipment not found"}, status_code=404)
+
+    return JSONResponse(tracking_view(shipment))
@@ -0,0 +1,81 @@
+#!/usr/bin/env python
+"""
+Cold start: time from launching gunicorn to the first served requests
+
+Starts the production server (gunicorn.conf.py) with warm-up on and off and
+reports the time until /api/health answers plus the latency of the first
+requests on the hot routes compared to the same routes once warm.
+
+    python benchmarks/cold_start.py --email admin@fastlogistics.com --password admin123
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+import httpx
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def wait_until_up(client, deadline):
+    while time.monotonic() < deadline:
+        try:
+            if client.get("/api/health").status_code == 200:
+                return
+        except httpx.TransportError:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError("server did not come up")
+
+
+def timed(client, method, path, **kwargs):
+    started = time.perf_counter()
+    response = client.request(method, path, **kwargs)
+    return (time.perf_counter() - started) * 1000, response
+
+
+def measure(warmup, args):
+    env = dict(os.environ, WARMUP="1" if warmup else "0", WEB_CONCURRENCY=str(args.workers))
+    command = [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "--bind", f"127.0.0.1:{args.port}", "wsgi:app"]
+    started = time.monotonic()
+    server = subprocess.Popen(command, cwd=BACKEND_DIR, env=env, stderr=subprocess.DEVNULL)
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{args.port}", timeout=30) as client:
+            wait_until_up(client, started + 60)
+            up = (time.monotonic() - started) * 1000
+            print(f"warmup={'on ' if warmup else 'off'} workers={args.workers}  first response after {up:7.0f} ms")
+            if not args.email:
+                return
+
+            login_ms, response = timed(client, "POST", "/api/auth/login",
+                                       json={"email": args.email, "password": args.password})
+            response.raise_for_status()
+            headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+            print(f"    {'POST /api/auth/login':<36} first {login_ms:7.1f} ms")
+            for path in args.path or ["/api/shipment/search?q=a", "/api/client/search?q=a", "/api/shipment/1"]:
+                first, _ = timed(client, "GET", path, headers=headers)
+                steady = statistics.median(timed(client, "GET", path, headers=headers)[0] for _ in range(20))
+                print(f"    GET {path:<32} first {first:7.1f} ms   warm median {steady:7.1f} ms")
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--email")
+    parser.add_argument("--password")
+    parser.add_argument("--path", action="append", help="GET path to time (repeatable)")
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--port", type=int, default=8123)
+    args = parser.parse_args()
+
+    for warmup in (False, True):
+        measure(warmup, args)
+
+
+if __name__ == "__main__":
+    main()
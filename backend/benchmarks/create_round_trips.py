@@ -0,0 +1,114 @@
+#!/usr/bin/env python
+"""
+Database round trips per POST /api/shipment
+
+Creates shipments through the Flask test client as an employee and as a
+client and counts the statements each create sends to the database, split
+into the shipment write itself and the derived tables maintained in the same
+transaction (client counters, throughput buckets, search index).
+
+Runs against a temporary SQLite database unless DATABASE_URL is set; it adds
+its own company, office, employee and clients, so do not point it at production.
+
+    python benchmarks/create_round_trips.py [--creates N]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+import uuid
+from collections import Counter
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+if not os.getenv("DATABASE_URL"):
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(), "round_trips.db")
+
+from sqlalchemy import event
+
+from app import app
+from extensions import db
+from models import Company, Office, User, Employee, Client
+
+DERIVED_TABLES = ("client_shipment_stats", "shipment_throughput", "shipments_fts")
+
+
+def seed(tag):
+    """Company, office, employee and two clients; returns (client ids, employee id)"""
+    db.create_all()
+    company = Company(name=f"Bench {tag}", registration_number=tag[:20], address="a", phone="p", email="e")
+    db.session.add(company)
+    db.session.flush()
+    office = Office(name="Bench", company_id=company.id, address="a", phone="p", email="e", city="Sofia", country="Bulgaria")
+    db.session.add(office)
+    db.session.flush()
+    user = User(email=f"employee-{tag}@bench", role="EMPLOYEE")
+    user.set_password("bench-password")
+    db.session.add(user)
+    db.session.flush()
+    employee = Employee(user_id=user.id, company_id=company.id, office_id=office.id, first_name="B", last_name="E", phone="1")
+    db.session.add(employee)
+    clients = []
+    for i in range(2):
+        user = User(email=f"client{i}-{tag}@bench", role="CLIENT")
+        user.set_password("bench-password")
+        db.session.add(user)
+        db.session.flush()
+        client = Client(user_id=user.id, company_name=f"Bench {i}", first_name="B", last_name=f"C{i}", phone="1", address="a", city="Sofia", country="BG")
+        db.session.add(client)
+        clients.append(client)
+    db.session.commit()
+    return [client.id for client in clients], employee.id
+
+
+def login(client, email):
+    response = client.post("/api/auth/login", json={"email": email, "password": "bench-password"})
+    assert response.status_code == 200, response.get_json()
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def classify(statement):
+    words = statement.split()
+    table = next((word.strip('"`') for word in words if word.strip('"`') in DERIVED_TABLES), None)
+    return "derived" if table else "shipment"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--creates", type=int, default=200)
+    args = parser.parse_args()
+
+    tag = uuid.uuid4().hex[:12]
+    with app.app_context():
+        (sender_id, receiver_id), employee_id = seed(tag)
+        engine = db.engine
+
+    client = app.test_client()
+    roles = {
+        "employee": (login(client, f"employee-{tag}@bench"), {"registered_by_employee_id": employee_id}),
+        "client": (login(client, f"client0-{tag}@bench"), {}),
+    }
+    counts = Counter()
+    event.listen(engine, "before_cursor_execute", lambda conn, cursor, statement, *rest: counts.update([classify(statement)]))
+    event.listen(engine, "commit", lambda conn: counts.update(["commit"]))
+
+    for role, (headers, extra) in roles.items():
+        counts.clear()
+        started = time.perf_counter()
+        for i in range(args.creates):
+            response = client.post("/api/shipment", headers=headers, json=dict(
+                extra, sender_id=sender_id, receiver_id=receiver_id, tracking_number=f"{tag}-{role}-{i}",
+                weight=2, dimensions="30x20x10", description="bench", price=10,
+                origin_address="Sofia", destination_address="Varna",
+            ))
+            assert response.status_code == 201, response.get_json()
+        elapsed = (time.perf_counter() - started) * 1000 / args.creates
+        per_create = {name: counts[name] / args.creates for name in ("shipment", "derived", "commit")}
+        print(f"{role:<9} shipment statements {per_create['shipment']:4.1f}  derived tables {per_create['derived']:4.1f}  "
+              f"commits {per_create['commit']:3.1f}  round trips {sum(per_create.values()):4.1f}  {elapsed:6.2f} ms/create")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+"""
+Load test for the hot read routes: threaded (WSGI) vs ASGI serving mode
+
+Start each server against the same database, then point the test at it:
+
+    # threaded mode
+    flask --app app run --with-threads --port 5000
+    # ASGI mode
+    uvicorn asgi:app --port 8000 --workers 1
+
+    python benchmarks/load_test.py --url http://127.0.0.1:5000 --url http://127.0.0.1:8000 \\
+        --email admin@fastlogistics.com --password admin123 --concurrency 1000
+"""
+import argparse
+import asyncio
+import statistics
+import time
+
+import httpx
+
+
+async def run(url, token, paths, concurrency, requests_total):
+    latencies = []
+    errors = 0
+    counter = iter(range(requests_total))
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    headers = {"Authorization": f"Bearer {token}"}
+
+    async with httpx.AsyncClient(base_url=url, headers=headers, limits=limits, timeout=60) as client:
+        async def worker():
+            nonlocal errors
+            for i in counter:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(paths[i % len(paths)])
+                    if response.status_code >= 400:
+                        errors += 1
+                except httpx.HTTPError:
+                    errors += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    pct = lambda p: latencies[min(int(len(latencies) * p), len(latencies) - 1)] * 1000
+    print(f"{url:<28} concurrency={concurrency:<5} requests={requests_total:<6} "
+          f"{requests_total / elapsed:8.1f} req/s  p50={pct(0.50):7.1f}ms  p95={pct(0.95):7.1f}ms  "
+          f"p99={pct(0.99):7.1f}ms  mean={statistics.fmean(latencies) * 1000:7.1f}ms  errors={errors}")
+
+
+async def login(url, email, password):
+    async with httpx.AsyncClient(base_url=url, timeout=60) as client:
+        response = await client.post("/api/auth/login", json={"email": email, "password": password})
+        response.raise_for_status()
+        return response.json()["access_token"]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", action="append", required=True, help="server base URL (repeatable)")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--path", action="append", help="GET path to hit (repeatable)")
+    parser.add_argument("--concurrency", type=int, default=1000)
+    parser.add_argument("--requests", type=int, default=10000)
+    args = parser.parse_args()
+
+    paths = args.path or ["/api/shipment/1", "/api/client/1", "/api/shipment/track/CLN-1"]
+    for url in args.url:
+        token = await login(url, args.email, args.password)
+        # Warm up connections and caches
+        await run(url, token, paths, min(args.concurrency, 50), 200)
+        await run(url, token, paths, args.concurrency, args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
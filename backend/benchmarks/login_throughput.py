@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+"""
+Benchmark password verification throughput (logins per second per core)
+
+Usage:
+    python benchmarks/login_throughput.py [--methods scrypt bcrypt ...] [--workers N] [--logins N]
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from flask import Flask
+from services.passwords import PasswordHasher, PasswordHasherBusy
+
+
+def run(method, rounds, workers, logins, concurrency):
+    app = Flask(__name__)
+    app.config.update(
+        PASSWORD_HASH_METHOD=method,
+        BCRYPT_ROUNDS=rounds,
+        PASSWORD_HASH_WORKERS=workers,
+        PASSWORD_HASH_QUEUE_LIMIT=max(concurrency, workers * 8),
+        PASSWORD_HASH_TIMEOUT=60,
+    )
+    hasher = PasswordHasher(app)
+    password_hash = hasher.hash("benchmark-password")
+    # Warm the pool so process start-up is not measured
+    hasher.verify(password_hash, "benchmark-password")
+
+    rejected = 0
+
+    def login(_):
+        nonlocal rejected
+        try:
+            assert hasher.verify(password_hash, "benchmark-password")
+        except PasswordHasherBusy:
+            rejected += 1
+
+    # Request threads, like a threaded WSGI server
+    with ThreadPoolExecutor(max_workers=concurrency) as request_threads:
+        started = time.perf_counter()
+        list(request_threads.map(login, range(logins)))
+        elapsed = time.perf_counter() - started
+
+    hasher.shutdown()
+    # Inline hashing can use every core through the request threads
+    cores = workers or os.cpu_count() or 1
+    per_second = (logins - rejected) / elapsed
+    print(f"{method:<24} workers={workers:<3} logins={logins:<5} "
+          f"{per_second:9.1f}/s  {per_second / cores:8.1f}/s/core  rejected={rejected}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--methods", nargs="+", default=["scrypt", "pbkdf2:sha256:600000", "bcrypt"])
+    parser.add_argument("--rounds", type=int, default=12, help="bcrypt cost")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=32, help="simulated request threads")
+    args = parser.parse_args()
+
+    print(f"CPU cores: {os.cpu_count()}")
+    for method in args.methods:
+        # Inline (0 workers) is the old behaviour: hashing on the request thread
+        run(method, args.rounds, 0, args.logins, args.concurrency)
+        run(method, args.rounds, args.workers, args.logins, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
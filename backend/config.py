@@ -3,9 +3,13 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# gunicorn worker processes; per-worker process pools share the CPUs between them
+_WEB_CONCURRENCY = int(os.getenv("WEB_CONCURRENCY", str((os.cpu_count() or 1) * 2 + 1)))
+
 class Config:
     SECRET_KEY = os.getenv("SECRET_KEY", "dev-secret")
-    SQLALCHEMY_DATABASE_URI = (
+    # DATABASE_URL overrides the MySQL settings, e.g. sqlite:///logistics.db locally
+    SQLALCHEMY_DATABASE_URI = os.getenv("DATABASE_URL") or (
         "mysql+pymysql://{user}:{pwd}@{host}:{port}/{db}?charset=utf8mb4"
     ).format(
         user=os.getenv("DB_USER", "root"),
@@ -17,3 +21,131 @@ class Config:
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
     JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "change-me")
+
+    # Password hashing: "scrypt", "pbkdf2:sha256:600000", "bcrypt", ...
+    PASSWORD_HASH_METHOD = os.getenv("PASSWORD_HASH_METHOD", "scrypt")
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
+    # Process pool size for hashing, per web worker (0 = hash inline in the request thread).
+    # The default splits the CPUs across the WEB_CONCURRENCY workers, at least 1 each
+    PASSWORD_HASH_WORKERS = int(os.getenv(
+        "PASSWORD_HASH_WORKERS", str(max((os.cpu_count() or 1) // _WEB_CONCURRENCY, 1))
+    ))
+    # Max queued + running hash jobs before requests get 503 (0 = workers * 8)
+    PASSWORD_HASH_QUEUE_LIMIT = int(os.getenv("PASSWORD_HASH_QUEUE_LIMIT", "0"))
+    PASSWORD_HASH_TIMEOUT = float(os.getenv("PASSWORD_HASH_TIMEOUT", "10"))
+
+    # In-memory prefix index for client typeahead (falls back to indexed LIKE queries)
+    CLIENT_SEARCH_INDEX = os.getenv("CLIENT_SEARCH_INDEX", "1") == "1"
+    CLIENT_SEARCH_INDEX_TTL = float(os.getenv("CLIENT_SEARCH_INDEX_TTL", "300"))
+
+    # Archival of DELIVERED/CANCELLED shipments to shipments_archive
+    ARCHIVE_RETENTION_DAYS = int(os.getenv("ARCHIVE_RETENTION_DAYS", "365"))
+    ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+    ARCHIVE_BATCH_PAUSE = float(os.getenv("ARCHIVE_BATCH_PAUSE", "0.5"))
+    # Seconds between background archival runs (0 = only via "flask archive-shipments")
+    ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "0"))
+    # First year with its own MySQL archive partition
+    ARCHIVE_FIRST_YEAR = int(os.getenv("ARCHIVE_FIRST_YEAR", "2015"))
+
+    # Asynchronous report jobs (results default to <instance>/reports)
+    REPORT_RESULTS_DIR = os.getenv("REPORT_RESULTS_DIR")
+    REPORT_WORKERS = int(os.getenv("REPORT_WORKERS", "2"))
+    REPORT_RESULT_TTL_HOURS = float(os.getenv("REPORT_RESULT_TTL_HOURS", "24"))
+    REPORT_JOB_TIMEOUT = float(os.getenv("REPORT_JOB_TIMEOUT", "3600"))
+
+    # Deleting companies, offices and clients (services/purge.py): rows per
+    # batch and seconds between batches; deletions of more rows than
+    # PURGE_SYNC_LIMIT run in the background, a job idle for PURGE_STALE_AFTER
+    # seconds counts as lost
+    PURGE_WORKERS = int(os.getenv("PURGE_WORKERS", "1"))
+    PURGE_BATCH_SIZE = int(os.getenv("PURGE_BATCH_SIZE", "500"))
+    PURGE_BATCH_PAUSE = float(os.getenv("PURGE_BATCH_PAUSE", "0.2"))
+    PURGE_SYNC_LIMIT = int(os.getenv("PURGE_SYNC_LIMIT", "1000"))
+    PURGE_STALE_AFTER = float(os.getenv("PURGE_STALE_AFTER", "300"))
+
+    # Sharding by company (services/sharding.py): SHARDS="name=<database URL>,...",
+    # SHARD_MAP="<company id>=<shard name>,..." (other companies stay in the main
+    # database), SHARD pins a CLI process to one shard, threads per fan-out report
+    SHARDS = os.getenv("SHARDS", "")
+    SHARD_MAP = os.getenv("SHARD_MAP", "")
+    SHARD = os.getenv("SHARD")
+    SHARD_FAN_OUT_WORKERS = int(os.getenv("SHARD_FAN_OUT_WORKERS", "4"))
+
+    # Static assets and pages (services/assets.py): "flask build-assets" output
+    # (default static/dist), seconds browsers keep fingerprinted assets and
+    # pages, and how long a stale page is shown while it revalidates
+    ASSETS_DIR = os.getenv("ASSETS_DIR")
+    ASSET_MAX_AGE = int(os.getenv("ASSET_MAX_AGE", "31536000"))
+    PAGE_MAX_AGE = int(os.getenv("PAGE_MAX_AGE", "300"))
+    PAGE_STALE_WHILE_REVALIDATE = int(os.getenv("PAGE_STALE_WHILE_REVALIDATE", "86400"))
+
+    # ASGI mode (asgi.py): async engine, defaults to SQLALCHEMY_DATABASE_URI with an async driver
+    ASYNC_DATABASE_URI = os.getenv("ASYNC_DATABASE_URI")
+    ASYNC_DB_POOL_SIZE = int(os.getenv("ASYNC_DB_POOL_SIZE", "20"))
+    ASYNC_DB_MAX_OVERFLOW = int(os.getenv("ASYNC_DB_MAX_OVERFLOW", "20"))
+
+    # Tariff engine: JSON tariff (defaults to services/tariff.py DEFAULT_TARIFF)
+    TARIFF_FILE = os.getenv("TARIFF_FILE")
+    QUOTE_BATCH_LIMIT = int(os.getenv("QUOTE_BATCH_LIMIT", "50000"))
+
+    # Load planning: default vehicle capacity (kg, cm3)
+    VEHICLE_MAX_WEIGHT = float(os.getenv("VEHICLE_MAX_WEIGHT", "1500"))
+    VEHICLE_MAX_VOLUME = float(os.getenv("VEHICLE_MAX_VOLUME", "12000000"))
+
+    # Offline geocoding: city gazetteer CSV (defaults to data/gazetteer.csv)
+    GAZETTEER_FILE = os.getenv("GAZETTEER_FILE")
+
+    # Seconds an in-process employee -> office map is trusted (services/office_analytics.py)
+    EMPLOYEE_DIRECTORY_TTL = float(os.getenv("EMPLOYEE_DIRECTORY_TTL", "60"))
+
+    # Idempotency-Key: stored responses kept this long, in-process LRU size,
+    # seconds a retry waits for the original request, seconds before an
+    # unfinished claim counts as abandoned, seconds between cleanups
+    IDEMPOTENCY_TTL_HOURS = float(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+    IDEMPOTENCY_CACHE_SIZE = int(os.getenv("IDEMPOTENCY_CACHE_SIZE", "10000"))
+    IDEMPOTENCY_WAIT_TIMEOUT = float(os.getenv("IDEMPOTENCY_WAIT_TIMEOUT", "30"))
+    IDEMPOTENCY_TAKEOVER_TIMEOUT = float(os.getenv("IDEMPOTENCY_TAKEOVER_TIMEOUT", "600"))
+    IDEMPOTENCY_CLEANUP_INTERVAL = float(os.getenv("IDEMPOTENCY_CLEANUP_INTERVAL", "600"))
+
+    # Most shipments in one batch status change (POST /api/shipment/status)
+    SHIPMENT_STATUS_BATCH_LIMIT = int(os.getenv("SHIPMENT_STATUS_BATCH_LIMIT", "1000"))
+
+    # Admission control (services/admission.py)
+    ADMISSION_ENABLED = os.getenv("ADMISSION_ENABLED", "1") == "1"
+    # Token bucket per identity and endpoint class: "<class>=<requests per second>/<burst>"
+    RATE_LIMITS = os.getenv("RATE_LIMITS", "read=20/100,write=5/50,report=0.5/10,auth=1/20")
+    # File shared by the workers on this host for the buckets (default: per-process memory)
+    RATE_LIMIT_STORE = os.getenv("RATE_LIMIT_STORE")
+    # Requests in flight per class and worker before shedding with 503
+    ADMISSION_CONCURRENCY = os.getenv("ADMISSION_CONCURRENCY", "report=2")
+    # Shed a class once this share of the DB pool is checked out
+    ADMISSION_POOL_RATIOS = os.getenv("ADMISSION_POOL_RATIOS", "report=0.5,read=0.9,auth=0.9,write=1")
+    # Shed requests that waited longer in the proxy queue (X-Request-Start; 0 = off)
+    ADMISSION_MAX_QUEUE_MS = float(os.getenv("ADMISSION_MAX_QUEUE_MS", "0"))
+    # Proxies in front of the app trusted for X-Forwarded-For/-Proto/-Host (0 = none)
+    PROXY_FIX_HOPS = int(os.getenv("PROXY_FIX_HOPS", "0"))
+
+    # Contact form: messages buffered in memory per worker, written in batches
+    CONTACT_BUFFER_SIZE = int(os.getenv("CONTACT_BUFFER_SIZE", "1000"))
+    CONTACT_FLUSH_BATCH = int(os.getenv("CONTACT_FLUSH_BATCH", "500"))
+    CONTACT_FLUSH_INTERVAL = float(os.getenv("CONTACT_FLUSH_INTERVAL", "1"))
+
+    # Bulk client import (flask import-clients, POST /api/client/import)
+    CLIENT_IMPORT_WORKERS = int(os.getenv("CLIENT_IMPORT_WORKERS", str(os.cpu_count() or 1)))
+    CLIENT_IMPORT_BATCH_SIZE = int(os.getenv("CLIENT_IMPORT_BATCH_SIZE", "1000"))
+    # Uploads hash inside a web request; larger files go through the CLI
+    CLIENT_IMPORT_MAX_ROWS = int(os.getenv("CLIENT_IMPORT_MAX_ROWS", "1000"))
+
+    # Throughput charts: most buckets per series in one request
+    THROUGHPUT_MAX_BUCKETS = int(os.getenv("THROUGHPUT_MAX_BUCKETS", "10000"))
+
+    # Courier route planning: seconds of 2-opt per plan (default / max per request)
+    ROUTE_TIME_BUDGET = float(os.getenv("ROUTE_TIME_BUDGET", "2"))
+    ROUTE_MAX_TIME_BUDGET = float(os.getenv("ROUTE_MAX_TIME_BUDGET", "30"))
+
+    # Pre-fork serving (gunicorn -c gunicorn.conf.py wsgi:app)
+    WEB_CONCURRENCY = _WEB_CONCURRENCY
+    WEB_THREADS = int(os.getenv("WEB_THREADS", "4"))
+    # Warm workers up (pool connections, caches, compiled SQL) before they accept traffic
+    WARMUP = os.getenv("WARMUP", "1") == "1"
+    WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "4"))
@@ -1,7 +1,13 @@
 from flask_sqlalchemy import SQLAlchemy
 from flask_migrate import Migrate
 from flask_jwt_extended import JWTManager
+from services.passwords import PasswordHasher
+from services.client_search import ClientSearchIndex
+from services.sharding import RoutingSession, ShardLocal
 
-db = SQLAlchemy()
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 migrate = Migrate()
 jwt = JWTManager()
+password_hasher = PasswordHasher()
+# One index per database shard (services/sharding.py)
+client_search_index = ShardLocal(ClientSearchIndex)
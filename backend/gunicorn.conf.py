@@ -0,0 +1,56 @@
+"""
+gunicorn settings (pre-fork, threaded workers)
+
+    gunicorn -c gunicorn.conf.py wsgi:app
+
+The app is imported once in the master (preload_app) and shared copy-on-write
+by the workers. Workers reset inherited connection/process pools after fork and
+warm up before accepting connections. Sized by WEB_CONCURRENCY and WEB_THREADS.
+
+Every worker starts its own password hashing pool of PASSWORD_HASH_WORKERS
+processes, so the machine runs WEB_CONCURRENCY * PASSWORD_HASH_WORKERS hashers.
+The default gives each worker cpu_count // WEB_CONCURRENCY (at least 1); set
+PASSWORD_HASH_WORKERS=0 to hash in the request threads instead.
+"""
+import os
+import time
+
+from config import Config
+
+_master_started = time.monotonic()
+
+bind = os.getenv("WEB_BIND", "0.0.0.0:8000")
+workers = Config.WEB_CONCURRENCY
+threads = Config.WEB_THREADS
+worker_class = "gthread"
+preload_app = True
+timeout = int(os.getenv("WEB_TIMEOUT", "30"))
+graceful_timeout = 30
+keepalive = 5
+accesslog = os.getenv("WEB_ACCESS_LOG")
+
+
+def when_ready(server):
+    server.log.info("Master ready in %.0f ms", (time.monotonic() - _master_started) * 1000)
+
+
+def post_fork(server, worker):
+    from services.prefork import after_fork
+
+    worker.forked_at = time.monotonic()
+    after_fork(server.app.wsgi())
+
+
+def post_worker_init(worker):
+    # Runs before the worker's accept loop: traffic only reaches warm workers
+    if Config.WARMUP:
+        from services.prefork import warm_up
+
+        timings = warm_up(worker.wsgi)
+        worker.log.info("Worker %s warm-up %s", worker.pid, timings)
+    worker.log.info(
+        "Worker %s ready in %.0f ms after fork, %.0f ms after master start",
+        worker.pid,
+        (time.monotonic() - worker.forked_at) * 1000,
+        (time.monotonic() - _master_started) * 1000,
+    )
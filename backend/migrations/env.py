@@ -96,6 +96,12 @@ def run_migrations_online():
     connectable = get_engine()
 
     with connectable.connect() as connection:
+        if connection.dialect.name == "sqlite":
+            # The app turns SQLite foreign keys on; batch mode recreates tables, and
+            # dropping the old copy would run its ON DELETE actions. Must precede BEGIN.
+            connection.exec_driver_sql("PRAGMA foreign_keys=OFF")
+            # End the implicit transaction, or alembic would leave the migration uncommitted
+            connection.commit()
         context.configure(
             connection=connection,
             target_metadata=get_metadata(),
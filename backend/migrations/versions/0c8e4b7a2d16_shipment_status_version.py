@@ -0,0 +1,29 @@
+"""shipment status version
+
+Revision ID: 0c8e4b7a2d16
+Revises: f1b6d8a3c527
+Create Date: 2026-10-19 23:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c8e4b7a2d16'
+down_revision = 'f1b6d8a3c527'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # The server default fills existing rows without a backfill
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('previous_status', sa.String(length=20), nullable=True))
+        batch_op.add_column(sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.drop_column('version')
+        batch_op.drop_column('previous_status')
@@ -0,0 +1,78 @@
+"""shipment dimension columns
+
+Revision ID: 3f6b8d2c1e47
+Revises: 7a4d2e91b3c0
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+import re
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f6b8d2c1e47'
+down_revision = '7a4d2e91b3c0'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+# Same format as services/parcel_size.py (kept here so the migration does not change with the app)
+DIMENSIONS_RE = re.compile(
+    r"^\s*(\d+(?:[.,]\d+)?)\s*[x×хX*]\s*(\d+(?:[.,]\d+)?)\s*[x×хX*]\s*(\d+(?:[.,]\d+)?)\s*(?:cm|см)?\s*$"
+)
+
+
+def _backfill(table):
+    """Parse dimensions into the numeric columns, BATCH_SIZE rows at a time by id"""
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        rows = connection.execute(
+            sa.text(f"SELECT id, dimensions FROM {table} WHERE id > :last_id ORDER BY id LIMIT :limit"),
+            {"last_id": last_id, "limit": BATCH_SIZE},
+        ).all()
+        if not rows:
+            break
+        updates = []
+        for row_id, dimensions in rows:
+            match = DIMENSIONS_RE.match(dimensions or "")
+            if match:
+                length, width, height = (float(part.replace(",", ".")) for part in match.groups())
+                updates.append({"id": row_id, "length": length, "width": width, "height": height,
+                                "volume": length * width * height})
+        if updates:
+            connection.execute(
+                sa.text(f"UPDATE {table} SET length = :length, width = :width, height = :height, "
+                        f"volume = :volume WHERE id = :id"),
+                updates,
+            )
+        last_id = rows[-1][0]
+
+
+def upgrade():
+    for table in ('shipments', 'shipments_archive'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('length', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('width', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('height', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('volume', sa.Float(), nullable=True))
+        _backfill(table)
+
+    # Built after the backfill instead of maintained row by row during it
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.create_index('ix_shipments_volume', ['volume'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.drop_index('ix_shipments_volume')
+
+    for table in ('shipments_archive', 'shipments'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('volume')
+            batch_op.drop_column('height')
+            batch_op.drop_column('width')
+            batch_op.drop_column('length')
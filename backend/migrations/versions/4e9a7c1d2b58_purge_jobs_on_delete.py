@@ -0,0 +1,81 @@
+"""purge jobs, ON DELETE rules
+
+Revision ID: 4e9a7c1d2b58
+Revises: 2b7e5c9d4a61
+Create Date: 2026-10-20 02:00:00.000000
+
+Shipment keys to clients and employees stay without ON DELETE: purge jobs
+remove shipments together with their counters (services/purge.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4e9a7c1d2b58'
+down_revision = '2b7e5c9d4a61'
+branch_labels = None
+depends_on = None
+
+# Names the unnamed foreign keys SQLite reflects, so batch mode can drop them
+NAMING_CONVENTION = {'fk': 'fk_%(table_name)s_%(column_0_name)s'}
+# table -> [(column, referred table, ON DELETE)]
+FOREIGN_KEYS = {
+    'offices': [('company_id', 'companies', 'CASCADE')],
+    'employees': [('company_id', 'companies', 'CASCADE'), ('office_id', 'offices', 'CASCADE')],
+    'shipments': [('office_id', 'offices', 'SET NULL')],
+    'client_shipment_stats': [('client_id', 'clients', 'CASCADE')],
+}
+
+
+def _foreign_key_names(table):
+    """{column: constraint name} of the single-column foreign keys (MySQL names them <table>_ibfk_<n>)"""
+    names = {}
+    for foreign_key in sa.inspect(op.get_bind()).get_foreign_keys(table):
+        if len(foreign_key['constrained_columns']) == 1:
+            column = foreign_key['constrained_columns'][0]
+            names[column] = foreign_key['name'] or f'fk_{table}_{column}'
+    return names
+
+
+def _replace_foreign_keys(restore=False):
+    for table, keys in FOREIGN_KEYS.items():
+        names = _foreign_key_names(table)
+        with op.batch_alter_table(table, schema=None, naming_convention=NAMING_CONVENTION) as batch_op:
+            for column, referred, ondelete in keys:
+                if column in names:
+                    batch_op.drop_constraint(names[column], type_='foreignkey')
+                batch_op.create_foreign_key(f'fk_{table}_{column}', referred, [column], ['id'],
+                                            ondelete=None if restore else ondelete)
+
+
+def upgrade():
+    op.create_table('purge_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('target', sa.String(length=20), nullable=False),
+    sa.Column('target_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('requested_by_user_id', sa.Integer(), nullable=False),
+    sa.Column('total_rows', sa.Integer(), nullable=True),
+    sa.Column('deleted_rows', sa.Integer(), nullable=False),
+    sa.Column('progress', sa.Text(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['requested_by_user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.create_index('ix_purge_jobs_target', ['target', 'target_id'], unique=False)
+
+    _replace_foreign_keys()
+
+
+def downgrade():
+    _replace_foreign_keys(restore=True)
+
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.drop_index('ix_purge_jobs_target')
+    op.drop_table('purge_jobs')
@@ -0,0 +1,42 @@
+"""shipment full-text search
+
+Revision ID: 5e1f0c9a7d28
+Revises: c2b15a844f5c
+Create Date: 2026-10-19 17:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e1f0c9a7d28'
+down_revision = 'c2b15a844f5c'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.execute(
+            'CREATE FULLTEXT INDEX ix_shipments_fulltext '
+            'ON shipments (description, origin_address, destination_address)'
+        )
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS shipments_fts "
+            "USING fts5(description, origin_address, destination_address, tokenize='unicode61')"
+        )
+        op.execute(
+            'INSERT INTO shipments_fts (rowid, description, origin_address, destination_address) '
+            'SELECT id, description, origin_address, destination_address FROM shipments'
+        )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'mysql':
+        op.drop_index('ix_shipments_fulltext', table_name='shipments')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS shipments_fts')
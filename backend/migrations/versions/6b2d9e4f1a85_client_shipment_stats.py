@@ -0,0 +1,36 @@
+"""client shipment stats
+
+Revision ID: 6b2d9e4f1a85
+Revises: d4a8f2b6c913
+Create Date: 2026-10-19 20:30:00.000000
+
+Filled afterwards with "flask reconcile-client-stats".
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6b2d9e4f1a85'
+down_revision = 'd4a8f2b6c913'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('client_shipment_stats',
+    sa.Column('client_id', sa.Integer(), nullable=False),
+    sa.Column('sent_count', sa.Integer(), nullable=False),
+    sa.Column('received_count', sa.Integer(), nullable=False),
+    sa.Column('pending_count', sa.Integer(), nullable=False),
+    sa.Column('in_transit_count', sa.Integer(), nullable=False),
+    sa.Column('delivered_count', sa.Integer(), nullable=False),
+    sa.Column('total_spend', sa.Numeric(precision=12, scale=2), nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['client_id'], ['clients.id'], ),
+    sa.PrimaryKeyConstraint('client_id')
+    )
+
+
+def downgrade():
+    op.drop_table('client_shipment_stats')
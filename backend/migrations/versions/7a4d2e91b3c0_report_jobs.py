@@ -0,0 +1,48 @@
+"""report jobs
+
+Revision ID: 7a4d2e91b3c0
+Revises: be3c31dca4aa
+Create Date: 2026-10-19 18:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4d2e91b3c0'
+down_revision = 'be3c31dca4aa'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('report_jobs',
+    sa.Column('id', sa.String(length=32), nullable=False),
+    sa.Column('report', sa.String(length=50), nullable=False),
+    sa.Column('params', sa.Text(), nullable=False),
+    sa.Column('format', sa.String(length=10), nullable=False),
+    sa.Column('dedupe_key', sa.String(length=64), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('requested_by_user_id', sa.Integer(), nullable=False),
+    sa.Column('row_count', sa.Integer(), nullable=True),
+    sa.Column('result_size', sa.Integer(), nullable=True),
+    sa.Column('error', sa.Text(), nullable=True),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('started_at', sa.DateTime(), nullable=True),
+    sa.Column('finished_at', sa.DateTime(), nullable=True),
+    sa.Column('expires_at', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['requested_by_user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('report_jobs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_report_jobs_dedupe_key'), ['dedupe_key'], unique=False)
+        batch_op.create_index(batch_op.f('ix_report_jobs_expires_at'), ['expires_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('report_jobs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_report_jobs_expires_at'))
+        batch_op.drop_index(batch_op.f('ix_report_jobs_dedupe_key'))
+
+    op.drop_table('report_jobs')
@@ -0,0 +1,26 @@
+"""purge job shard
+
+Revision ID: 7c2d9e4b1f35
+Revises: 4e9a7c1d2b58
+Create Date: 2026-10-20 03:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7c2d9e4b1f35'
+down_revision = '4e9a7c1d2b58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('shard', sa.String(length=50), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('purge_jobs', schema=None) as batch_op:
+        batch_op.drop_column('shard')
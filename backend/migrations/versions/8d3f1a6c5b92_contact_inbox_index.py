@@ -0,0 +1,30 @@
+"""contact inbox index
+
+Revision ID: 8d3f1a6c5b92
+Revises: 0c8e4b7a2d16
+Create Date: 2026-10-20 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8d3f1a6c5b92'
+down_revision = '0c8e4b7a2d16'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # NULL never matched "unread"; those messages were never read either
+    op.execute(sa.text("UPDATE contacts SET is_read = :unread WHERE is_read IS NULL").bindparams(unread=False))
+    with op.batch_alter_table('contacts', schema=None) as batch_op:
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=False)
+        batch_op.create_index('ix_contacts_is_read_created_at', ['is_read', 'created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('contacts', schema=None) as batch_op:
+        batch_op.drop_index('ix_contacts_is_read_created_at')
+        batch_op.alter_column('is_read', existing_type=sa.Boolean(), nullable=True)
@@ -0,0 +1,34 @@
+"""geocoded addresses
+
+Revision ID: 9c1e5a7b3d20
+Revises: 3f6b8d2c1e47
+Create Date: 2026-10-19 19:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c1e5a7b3d20'
+down_revision = '3f6b8d2c1e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('geocoded_addresses',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('address_key', sa.String(length=255), nullable=False),
+    sa.Column('address', sa.String(length=255), nullable=False),
+    sa.Column('latitude', sa.Float(), nullable=False),
+    sa.Column('longitude', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('address_key')
+    )
+
+
+def downgrade():
+    op.drop_table('geocoded_addresses')
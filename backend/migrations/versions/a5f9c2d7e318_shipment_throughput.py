@@ -0,0 +1,34 @@
+"""shipment throughput buckets
+
+Revision ID: a5f9c2d7e318
+Revises: e7c3a1f5b942
+Create Date: 2026-10-19 21:30:00.000000
+
+Filled afterwards with "flask rebuild-throughput".
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a5f9c2d7e318'
+down_revision = 'e7c3a1f5b942'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('shipment_throughput',
+    sa.Column('resolution', sa.String(length=10), nullable=False),
+    sa.Column('bucket_start', sa.BigInteger(), autoincrement=False, nullable=False),
+    sa.Column('office_id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('created_count', sa.Integer(), nullable=False),
+    sa.Column('sent_count', sa.Integer(), nullable=False),
+    sa.Column('delivered_count', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('resolution', 'bucket_start', 'office_id', 'status')
+    )
+
+
+def downgrade():
+    op.drop_table('shipment_throughput')
@@ -0,0 +1,70 @@
+"""shipment archive
+
+Revision ID: be3c31dca4aa
+Revises: 5e1f0c9a7d28
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from datetime import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'be3c31dca4aa'
+down_revision = '5e1f0c9a7d28'
+branch_labels = None
+depends_on = None
+
+FIRST_PARTITION_YEAR = 2015
+
+
+def upgrade():
+    op.create_table('shipments_archive',
+    sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('sent_date', sa.DateTime(), nullable=False),
+    sa.Column('sender_id', sa.Integer(), nullable=False),
+    sa.Column('receiver_id', sa.Integer(), nullable=False),
+    sa.Column('registered_by_employee_id', sa.Integer(), nullable=False),
+    sa.Column('tracking_number', sa.String(length=50), nullable=False),
+    sa.Column('archived_at', sa.DateTime(), nullable=True),
+    sa.Column('weight', sa.Float(), nullable=False),
+    sa.Column('dimensions', sa.String(length=100), nullable=False),
+    sa.Column('description', sa.Text(), nullable=False),
+    sa.Column('price', sa.Numeric(precision=10, scale=2), nullable=False),
+    sa.Column('received_date', sa.DateTime(), nullable=True),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('origin_address', sa.String(length=255), nullable=False),
+    sa.Column('destination_address', sa.String(length=255), nullable=False),
+    sa.Column('created_at', sa.DateTime(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('id', 'sent_date')
+    )
+    with op.batch_alter_table('shipments_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_shipments_archive_sent_date', ['sent_date'], unique=False)
+        batch_op.create_index(batch_op.f('ix_shipments_archive_sender_id'), ['sender_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_shipments_archive_receiver_id'), ['receiver_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_shipments_archive_registered_by_employee_id'), ['registered_by_employee_id'], unique=False)
+        batch_op.create_index(batch_op.f('ix_shipments_archive_tracking_number'), ['tracking_number'], unique=False)
+
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.create_index('ix_shipments_status_sent_date', ['status', 'sent_date'], unique=False)
+
+    if op.get_bind().dialect.name == 'mysql':
+        partitions = [
+            f'PARTITION p{year} VALUES LESS THAN ({year + 1})'
+            for year in range(FIRST_PARTITION_YEAR, datetime.utcnow().year + 2)
+        ]
+        partitions.append('PARTITION pmax VALUES LESS THAN MAXVALUE')
+        op.execute(
+            'ALTER TABLE shipments_archive PARTITION BY RANGE (YEAR(sent_date)) '
+            f'({", ".join(partitions)})'
+        )
+
+
+def downgrade():
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.drop_index('ix_shipments_status_sent_date')
+
+    op.drop_table('shipments_archive')
@@ -0,0 +1,32 @@
+"""client search indexes
+
+Revision ID: c2b15a844f5c
+Revises: 
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c2b15a844f5c'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_clients_company_name'), ['company_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_clients_first_name'), ['first_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_clients_last_name'), ['last_name'], unique=False)
+        batch_op.create_index(batch_op.f('ix_clients_city'), ['city'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('clients', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_clients_city'))
+        batch_op.drop_index(batch_op.f('ix_clients_last_name'))
+        batch_op.drop_index(batch_op.f('ix_clients_first_name'))
+        batch_op.drop_index(batch_op.f('ix_clients_company_name'))
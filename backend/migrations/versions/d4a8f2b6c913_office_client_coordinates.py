@@ -0,0 +1,31 @@
+"""office and client coordinates
+
+Revision ID: d4a8f2b6c913
+Revises: 9c1e5a7b3d20
+Create Date: 2026-10-19 20:00:00.000000
+
+Existing rows are geocoded afterwards with "flask geocode-locations".
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8f2b6c913'
+down_revision = '9c1e5a7b3d20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    for table in ('offices', 'clients'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.add_column(sa.Column('latitude', sa.Float(), nullable=True))
+            batch_op.add_column(sa.Column('longitude', sa.Float(), nullable=True))
+
+
+def downgrade():
+    for table in ('clients', 'offices'):
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            batch_op.drop_column('longitude')
+            batch_op.drop_column('latitude')
@@ -0,0 +1,59 @@
+"""shipment office_id and analytics indexes
+
+Revision ID: e7c3a1f5b942
+Revises: 6b2d9e4f1a85
+Create Date: 2026-10-19 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7c3a1f5b942'
+down_revision = '6b2d9e4f1a85'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 5000
+ANALYTICS_COLUMNS = ['sent_date', 'office_id', 'registered_by_employee_id', 'status', 'price']
+
+
+def _backfill(table):
+    """Copy the registering employee's office, BATCH_SIZE ids at a time"""
+    connection = op.get_bind()
+    max_id = connection.execute(sa.text(f"SELECT MAX(id) FROM {table}")).scalar() or 0
+    for start in range(0, max_id, BATCH_SIZE):
+        connection.execute(
+            sa.text(f"UPDATE {table} SET office_id = (SELECT employees.office_id FROM employees "
+                    f"WHERE employees.id = {table}.registered_by_employee_id) "
+                    f"WHERE id > :start AND id <= :end"),
+            {"start": start, "end": start + BATCH_SIZE},
+        )
+
+
+def upgrade():
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('office_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_shipments_office_id', 'offices', ['office_id'], ['id'])
+    with op.batch_alter_table('shipments_archive', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('office_id', sa.Integer(), nullable=True))
+
+    for table in ('shipments', 'shipments_archive'):
+        _backfill(table)
+
+    # Built after the backfill instead of maintained row by row during it
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.create_index('ix_shipments_analytics', ANALYTICS_COLUMNS, unique=False)
+    with op.batch_alter_table('shipments_archive', schema=None) as batch_op:
+        batch_op.create_index('ix_shipments_archive_analytics', ANALYTICS_COLUMNS, unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('shipments_archive', schema=None) as batch_op:
+        batch_op.drop_index('ix_shipments_archive_analytics')
+        batch_op.drop_column('office_id')
+    with op.batch_alter_table('shipments', schema=None) as batch_op:
+        batch_op.drop_index('ix_shipments_analytics')
+        batch_op.drop_constraint('fk_shipments_office_id', type_='foreignkey')
+        batch_op.drop_column('office_id')
@@ -3,5 +3,12 @@ from .company import Company
 from .office import Office
 from .employee import Employee
 from .client import Client
-from .shipment import Shipment
+from .shipment import Shipment, ShipmentArchive
 from .contact import Contact
+from .report_job import ReportJob
+from .geocoded_address import GeocodedAddress
+from .client_shipment_stats import ClientShipmentStats
+from .shipment_throughput import ShipmentThroughput
+from .idempotency_record import IdempotencyRecord
+from .cache_version import CacheVersion
+from .purge_job import PurgeJob
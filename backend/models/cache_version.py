@@ -0,0 +1,9 @@
+from extensions import db
+
+# Version counters of cached read models, bumped in the same transaction as
+# the writes they cover, so every worker sees a change as soon as it commits
+class CacheVersion(db.Model):
+    __tablename__ = "cache_versions"
+
+    name = db.Column(db.String(50), primary_key=True)
+    version = db.Column(db.BigInteger, default=0, nullable=False)
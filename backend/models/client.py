@@ -8,13 +8,17 @@ class Client(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    company_name = db.Column(db.String(150), nullable=False)
-    first_name = db.Column(db.String(100), nullable=False)
-    last_name = db.Column(db.String(100), nullable=False)
+    # Name/company/city are indexed for recipient prefix search
+    company_name = db.Column(db.String(150), nullable=False, index=True)
+    first_name = db.Column(db.String(100), nullable=False, index=True)
+    last_name = db.Column(db.String(100), nullable=False, index=True)
     phone = db.Column(db.String(20), nullable=False)
     address = db.Column(db.String(255), nullable=False)
-    city = db.Column(db.String(100), nullable=False)
+    city = db.Column(db.String(100), nullable=False, index=True)
     country = db.Column(db.String(100), nullable=False)
+    # Filled from the address or city on write (services/geocoding.py)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
     is_active = db.Column(db.Boolean, default=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
@@ -22,9 +26,9 @@ class Client(db.Model):
     # Relations
     user = db.relationship("User", backref="client_profile")
     # Clients can send shipments
-    shipments_sent = db.relationship("Shipment", backref="sender", foreign_keys="Shipment.sender_id")
+    shipments_sent = db.relationship("Shipment", backref="sender", foreign_keys="Shipment.sender_id", passive_deletes="all")
     # Clients can receive shipments and view them
-    shipments_received = db.relationship("Shipment", backref="receiver", foreign_keys="Shipment.receiver_id")
+    shipments_received = db.relationship("Shipment", backref="receiver", foreign_keys="Shipment.receiver_id", passive_deletes="all")
 
     def to_dict(self):
         return {
@@ -37,6 +41,8 @@ class Client(db.Model):
             "address": self.address,
             "city": self.city,
             "country": self.country,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
             "is_active": self.is_active,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
@@ -0,0 +1,36 @@
+from extensions import db
+from datetime import datetime
+
+# Per-client shipment counters, maintained with the shipment writes
+# (services/client_stats.py) and rebuilt by "flask reconcile-client-stats"
+class ClientShipmentStats(db.Model):
+    __tablename__ = "client_shipment_stats"
+
+    client_id = db.Column(db.Integer, db.ForeignKey("clients.id", ondelete="CASCADE"), primary_key=True)
+    sent_count = db.Column(db.Integer, default=0, nullable=False)
+    received_count = db.Column(db.Integer, default=0, nullable=False)
+    # By status, over shipments the client sent or received
+    pending_count = db.Column(db.Integer, default=0, nullable=False)
+    in_transit_count = db.Column(db.Integer, default=0, nullable=False)
+    delivered_count = db.Column(db.Integer, default=0, nullable=False)
+    # Price of sent shipments that were not cancelled
+    total_spend = db.Column(db.Numeric(12, 2), default=0, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    # Relations
+    client = db.relationship("Client", backref=db.backref("shipment_stats", uselist=False, cascade="all, delete-orphan", passive_deletes=True))
+
+    @staticmethod
+    def empty():
+        """Counters of a client without shipments"""
+        return {"sent": 0, "received": 0, "pending": 0, "in_transit": 0, "delivered": 0, "total_spend": "0.00"}
+
+    def to_dict(self):
+        return {
+            "sent": self.sent_count,
+            "received": self.received_count,
+            "pending": self.pending_count,
+            "in_transit": self.in_transit_count,
+            "delivered": self.delivered_count,
+            "total_spend": str(self.total_spend),
+        }
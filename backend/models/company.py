@@ -14,8 +14,9 @@ class Company(db.Model):
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relations
-    offices = db.relationship("Office", backref="company", cascade="all, delete-orphan")
-    employees = db.relationship("Employee", backref="company", cascade="all, delete-orphan")
+    # Deleted by the database (ON DELETE CASCADE); big companies go through services/purge.py
+    offices = db.relationship("Office", backref="company", cascade="all, delete-orphan", passive_deletes=True)
+    employees = db.relationship("Employee", backref="company", cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -3,12 +3,16 @@ from datetime import datetime
 
 class Contact(db.Model):
     __tablename__ = "contacts"
+    __table_args__ = (
+        # Inbox: unread counts and keyset pages by (created_at, id) within read/unread
+        db.Index("ix_contacts_is_read_created_at", "is_read", "created_at"),
+    )
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(100), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     message = db.Column(db.Text, nullable=False)
-    is_read = db.Column(db.Boolean, default=False)
+    is_read = db.Column(db.Boolean, default=False, nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def to_dict(self):
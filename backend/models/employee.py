@@ -8,8 +8,8 @@ class Employee(db.Model):
 
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
-    company_id = db.Column(db.Integer, db.ForeignKey("companies.id"), nullable=False)
-    office_id = db.Column(db.Integer, db.ForeignKey("offices.id"), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
+    office_id = db.Column(db.Integer, db.ForeignKey("offices.id", ondelete="CASCADE"), nullable=False)
     first_name = db.Column(db.String(100), nullable=False)
     last_name = db.Column(db.String(100), nullable=False)
     phone = db.Column(db.String(20), nullable=False)
@@ -21,7 +21,7 @@ class Employee(db.Model):
     # Relations
     user = db.relationship("User", backref="employee_profile")
     #  Employees register shipments
-    shipments_registered = db.relationship("Shipment", backref="registered_by_employee", foreign_keys="Shipment.registered_by_employee_id")
+    shipments_registered = db.relationship("Shipment", backref="registered_by_employee", foreign_keys="Shipment.registered_by_employee_id", passive_deletes="all")
 
     def to_dict(self):
         return {
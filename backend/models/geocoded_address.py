@@ -0,0 +1,23 @@
+from extensions import db
+from datetime import datetime
+
+# Local geocoding table: normalized address -> coordinates
+# Loaded with "flask import-geocodes" (see services/geocoding.py)
+class GeocodedAddress(db.Model):
+    __tablename__ = "geocoded_addresses"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # Lowercased, whitespace-collapsed address (services.geocoding.address_key)
+    address_key = db.Column(db.String(255), unique=True, nullable=False)
+    address = db.Column(db.String(255), nullable=False)
+    latitude = db.Column(db.Float, nullable=False)
+    longitude = db.Column(db.Float, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    def to_dict(self):
+        return {
+            "address": self.address,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
+        }
@@ -0,0 +1,17 @@
+from extensions import db
+from datetime import datetime
+
+# Responses of write requests sent with an Idempotency-Key (services/idempotency.py)
+# A row without status_code is a request still in progress
+class IdempotencyRecord(db.Model):
+    __tablename__ = "idempotency_keys"
+
+    # sha256 of identity + method + path + Idempotency-Key
+    key_hash = db.Column(db.String(64), primary_key=True)
+    # sha256 of the request body, to reject a key reused for another request
+    request_hash = db.Column(db.String(64), nullable=False)
+    status_code = db.Column(db.Integer, nullable=True)
+    headers = db.Column(db.Text, nullable=True)  # JSON [[name, value]]
+    body = db.Column(db.LargeBinary, nullable=True)  # zlib-compressed
+    created_at = db.Column(db.DateTime, default=datetime.utcnow, nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
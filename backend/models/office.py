@@ -5,18 +5,21 @@ class Office(db.Model):
     __tablename__ = "offices"
 
     id = db.Column(db.Integer, primary_key=True)
-    company_id = db.Column(db.Integer, db.ForeignKey("companies.id"), nullable=False)
+    company_id = db.Column(db.Integer, db.ForeignKey("companies.id", ondelete="CASCADE"), nullable=False)
     name = db.Column(db.String(150), nullable=False)
     address = db.Column(db.String(255), nullable=False)
     phone = db.Column(db.String(20), nullable=False)
     email = db.Column(db.String(120), nullable=False)
     city = db.Column(db.String(100), nullable=False)
     country = db.Column(db.String(100), nullable=False)
+    # Filled from the address or city on write (services/geocoding.py)
+    latitude = db.Column(db.Float, nullable=True)
+    longitude = db.Column(db.Float, nullable=True)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
     # Relations
-    employees = db.relationship("Employee", backref="office", cascade="all, delete-orphan")
+    employees = db.relationship("Employee", backref="office", cascade="all, delete-orphan", passive_deletes=True)
 
     def to_dict(self):
         return {
@@ -28,5 +31,7 @@ class Office(db.Model):
             "email": self.email,
             "city": self.city,
             "country": self.country,
+            "latitude": self.latitude,
+            "longitude": self.longitude,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
@@ -0,0 +1,52 @@
+from extensions import db
+from datetime import datetime
+import json
+
+# Background deletion of a company, office or client with its dependent rows
+# (services/purge.py). Status: QUEUED, RUNNING, DONE, FAILED
+class PurgeJob(db.Model):
+    __tablename__ = "purge_jobs"
+    __table_args__ = (
+        db.Index("ix_purge_jobs_target", "target", "target_id"),
+    )
+
+    id = db.Column(db.String(32), primary_key=True)
+    target = db.Column(db.String(20), nullable=False)  # company, office or client
+    target_id = db.Column(db.Integer, nullable=False)
+    # Database shard the target lives on (services/sharding.py); NULL = main database
+    shard = db.Column(db.String(50), nullable=True)
+    status = db.Column(db.String(20), default="QUEUED", nullable=False)
+    requested_by_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    # Rows to delete, counted when the job starts, and rows deleted so far
+    total_rows = db.Column(db.Integer, nullable=True)
+    deleted_rows = db.Column(db.Integer, default=0, nullable=False)
+    # JSON {table: rows deleted}, committed with every batch
+    progress = db.Column(db.Text, nullable=True)
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    # Touched by every batch; a running job that stops updating was lost with its worker
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    def to_dict(self):
+        percent = None
+        if self.status == "DONE":
+            percent = 100.0
+        elif self.total_rows:
+            percent = round(min(100.0 * self.deleted_rows / self.total_rows, 100.0), 1)
+        return {
+            "id": self.id,
+            "target": self.target,
+            "target_id": self.target_id,
+            "status": self.status,
+            "total_rows": self.total_rows,
+            "deleted_rows": self.deleted_rows,
+            "percent": percent,
+            "deleted": json.loads(self.progress) if self.progress else {},
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "updated_at": self.updated_at.isoformat() if self.updated_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+        }
@@ -0,0 +1,39 @@
+from extensions import db
+from datetime import datetime
+
+# Asynchronous report jobs
+# Status: QUEUED, RUNNING, DONE, FAILED
+class ReportJob(db.Model):
+    __tablename__ = "report_jobs"
+
+    id = db.Column(db.String(32), primary_key=True)
+    report = db.Column(db.String(50), nullable=False)
+    params = db.Column(db.Text, nullable=False)  # JSON
+    format = db.Column(db.String(10), nullable=False)  # ndjson or csv
+    # Hash of report + params + format used to deduplicate identical requests
+    dedupe_key = db.Column(db.String(64), nullable=False, index=True)
+    status = db.Column(db.String(20), default="QUEUED", nullable=False)
+    requested_by_user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    row_count = db.Column(db.Integer, nullable=True)
+    result_size = db.Column(db.Integer, nullable=True)  # compressed bytes
+    error = db.Column(db.Text, nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+    # Result file and row are removed after this time
+    expires_at = db.Column(db.DateTime, nullable=True, index=True)
+
+    def to_dict(self):
+        return {
+            "id": self.id,
+            "report": self.report,
+            "format": self.format,
+            "status": self.status,
+            "row_count": self.row_count,
+            "result_size": self.result_size,
+            "error": self.error,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+            "started_at": self.started_at.isoformat() if self.started_at else None,
+            "finished_at": self.finished_at.isoformat() if self.finished_at else None,
+            "expires_at": self.expires_at.isoformat() if self.expires_at else None,
+        }
@@ -1,57 +1,65 @@
 from extensions import db
 from datetime import datetime
 from decimal import Decimal
+from sqlalchemy.orm import validates
+from services.parcel_size import parse_dimensions
 
-# Shipment data management (CRUD operations)
-# Employees register sent and received shipments
-# Shipment tracking and reporting for various queries
-# Employees can see all shipments
-# Clients can see their shipments (sent or received)
-class Shipment(db.Model):
-    __tablename__ = "shipments"
 
-    id = db.Column(db.Integer, primary_key=True)
-    # Track sender (client)
-    sender_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
-    # Track receiver (client)
-    receiver_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
-    # Track which employee registered the shipment
-    registered_by_employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"), nullable=False)
-    
+class ShipmentFields:
+    """Columns shared by live shipments and the shipment archive"""
+
     # Shipment details
-    tracking_number = db.Column(db.String(50), unique=True, nullable=False)
     weight = db.Column(db.Float, nullable=False)  # kg
     dimensions = db.Column(db.String(100), nullable=False)  # e.g., "30x40x50"
+    # Parsed from dimensions on write (NULL when it is not LxWxH)
+    length = db.Column(db.Float, nullable=True)  # cm
+    width = db.Column(db.Float, nullable=True)  # cm
+    height = db.Column(db.Float, nullable=True)  # cm
+    volume = db.Column(db.Float, nullable=True)  # cm3
     description = db.Column(db.Text, nullable=False)
     # Track price for revenue calculation
     price = db.Column(db.Numeric(10, 2), nullable=False)
-    
+
     # Dates
     # Track sent date for undelivered shipments
     sent_date = db.Column(db.DateTime, nullable=False)
     # Track received date for delivery status
     received_date = db.Column(db.DateTime, nullable=True)
-    
+
     # Status: PENDING, IN_TRANSIT, DELIVERED, CANCELLED
     # Status for tracking undelivered shipments
     status = db.Column(db.String(20), default="PENDING", nullable=False)
-    
+
     # Origin and destination
     origin_address = db.Column(db.String(255), nullable=False)
     destination_address = db.Column(db.String(255), nullable=False)
-    
+
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
 
+    @validates("dimensions")
+    def _set_size(self, key, value):
+        try:
+            self.length, self.width, self.height = parse_dimensions(value)
+            self.volume = self.length * self.width * self.height
+        except ValueError:
+            self.length = self.width = self.height = self.volume = None
+        return value
+
     def to_dict(self):
         return {
             "id": self.id,
             "sender_id": self.sender_id,
             "receiver_id": self.receiver_id,
             "registered_by_employee_id": self.registered_by_employee_id,
+            "office_id": self.office_id,
             "tracking_number": self.tracking_number,
             "weight": self.weight,
             "dimensions": self.dimensions,
+            "length": self.length,
+            "width": self.width,
+            "height": self.height,
+            "volume": self.volume,
             "description": self.description,
             "price": str(self.price),
             "sent_date": self.sent_date.isoformat() if self.sent_date else None,
@@ -61,3 +69,64 @@ class Shipment(db.Model):
             "destination_address": self.destination_address,
             "created_at": self.created_at.isoformat() if self.created_at else None,
         }
+
+
+# Shipment data management (CRUD operations)
+# Employees register sent and received shipments
+# Shipment tracking and reporting for various queries
+# Employees can see all shipments
+# Clients can see their shipments (sent or received)
+class Shipment(ShipmentFields, db.Model):
+    __tablename__ = "shipments"
+    __table_args__ = (
+        # Archival scans and status reports filter on status + sent date
+        db.Index("ix_shipments_status_sent_date", "status", "sent_date"),
+        # Size queries (oversized parcels, volumetric billing, loading)
+        db.Index("ix_shipments_volume", "volume"),
+        # Covers the office analytics query (date range -> office, employee, status, price)
+        db.Index("ix_shipments_analytics", "sent_date", "office_id", "registered_by_employee_id", "status", "price"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    # No ON DELETE CASCADE on the client/employee keys: shipments carry counters and
+    # search entries, so they are removed by purge jobs (services/purge.py), never implicitly
+    # Track sender (client)
+    sender_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
+    # Track receiver (client)
+    receiver_id = db.Column(db.Integer, db.ForeignKey("clients.id"), nullable=False)
+    # Track which employee registered the shipment
+    registered_by_employee_id = db.Column(db.Integer, db.ForeignKey("employees.id"), nullable=False)
+    # Office of the registering employee, copied on write (services/office_analytics.py)
+    office_id = db.Column(db.Integer, db.ForeignKey("offices.id", ondelete="SET NULL"), nullable=True)
+
+    tracking_number = db.Column(db.String(50), unique=True, nullable=False)
+
+    # Status before the last transition (services/shipment_status.py)
+    previous_status = db.Column(db.String(20), nullable=True)
+    # Bumped on every update; updates are conditional on the version they read
+    version = db.Column(db.Integer, nullable=False, default=1, server_default="1")
+
+    __mapper_args__ = {"version_id_col": version}
+
+    def to_dict(self):
+        return dict(super().to_dict(), version=self.version)
+
+
+# Cold storage for old DELIVERED/CANCELLED shipments
+# No foreign keys and sent_date in the primary key, so MySQL can
+# RANGE-partition the table by year (see services/archival.py)
+class ShipmentArchive(ShipmentFields, db.Model):
+    __tablename__ = "shipments_archive"
+    __table_args__ = (
+        db.Index("ix_shipments_archive_sent_date", "sent_date"),
+        db.Index("ix_shipments_archive_analytics", "sent_date", "office_id", "registered_by_employee_id", "status", "price"),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    sent_date = db.Column(db.DateTime, primary_key=True)
+    sender_id = db.Column(db.Integer, nullable=False, index=True)
+    receiver_id = db.Column(db.Integer, nullable=False, index=True)
+    registered_by_employee_id = db.Column(db.Integer, nullable=False, index=True)
+    office_id = db.Column(db.Integer, nullable=True)
+    tracking_number = db.Column(db.String(50), nullable=False, index=True)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
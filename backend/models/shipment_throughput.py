@@ -0,0 +1,31 @@
+from extensions import db
+from datetime import datetime, timezone
+
+# Shipment event counts per time bucket, maintained with the shipment writes
+# (services/throughput.py) and rebuilt by "flask rebuild-throughput"
+class ShipmentThroughput(db.Model):
+    __tablename__ = "shipment_throughput"
+
+    # minute, hour or day
+    resolution = db.Column(db.String(10), primary_key=True)
+    # Bucket start in Unix seconds (UTC), so charts resample without parsing dates
+    bucket_start = db.Column(db.BigInteger, primary_key=True, autoincrement=False)
+    # Office of the shipment, 0 when it has none
+    office_id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    # Current status of the counted shipments
+    status = db.Column(db.String(20), primary_key=True)
+    # Shipments created, sent and delivered in the bucket
+    created_count = db.Column(db.Integer, default=0, nullable=False)
+    sent_count = db.Column(db.Integer, default=0, nullable=False)
+    delivered_count = db.Column(db.Integer, default=0, nullable=False)
+
+    def to_dict(self):
+        return {
+            "resolution": self.resolution,
+            "bucket_start": datetime.fromtimestamp(self.bucket_start, timezone.utc).replace(tzinfo=None).isoformat(),
+            "office_id": self.office_id,
+            "status": self.status,
+            "created": self.created_count,
+            "sent": self.sent_count,
+            "delivered": self.delivered_count,
+        }
@@ -1,5 +1,4 @@
-from extensions import db
-from werkzeug.security import generate_password_hash, check_password_hash
+from extensions import db, password_hasher
 from datetime import datetime
 
 # User registration and login
@@ -15,10 +14,14 @@ class User(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
     def set_password(self, password):
-        # Secure password hashing for registration
-        self.password_hash = generate_password_hash(password)
+        # Secure password hashing for registration (runs in the hashing pool)
+        self.password_hash = password_hasher.hash(password)
 
     def check_password(self, password):
-        # Password verification during login
-        return check_password_hash(self.password_hash, password)
+        # Password verification during login (runs in the hashing pool)
+        return password_hasher.verify(self.password_hash, password)
+
+    def password_needs_rehash(self):
+        # Hash was created with an older algorithm or cost
+        return password_hasher.needs_rehash(self.password_hash)
 
@@ -5,6 +5,12 @@ from .office import office_bp
 from .employee import employee_bp
 from .client import client_bp
 from .shipment import shipment_bp
+from .report import report_bp
+from .quote import quote_bp
+from .planning import planning_bp
+from .analytics import analytics_bp
+from .org import org_bp
+from .purge import purge_bp
 
 def register_routes(app):
     app.register_blueprint(contact_bp)
@@ -14,3 +20,9 @@ def register_routes(app):
     app.register_blueprint(employee_bp)
     app.register_blueprint(client_bp)
     app.register_blueprint(shipment_bp)
+    app.register_blueprint(report_bp)
+    app.register_blueprint(quote_bp)
+    app.register_blueprint(planning_bp)
+    app.register_blueprint(analytics_bp)
+    app.register_blueprint(org_bp)
+    app.register_blueprint(purge_bp)
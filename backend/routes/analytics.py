@@ -0,0 +1,88 @@
+from flask import Blueprint, request, jsonify, current_app
+from services.office_analytics import office_rollup
+from services import throughput
+from routes.args import parse_date_arg
+from flask_jwt_extended import jwt_required, get_jwt
+from datetime import datetime, timedelta
+
+analytics_bp = Blueprint("analytics", __name__, url_prefix="/api/analytics")
+
+
+def _int_arg(name):
+    value = request.args.get(name)
+    if value is None or value == "":
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+
+
+def _list_arg(name, allowed=None):
+    values = [value.strip() for value in request.args.get(name, "").split(",") if value.strip()]
+    if allowed is not None and any(value not in allowed for value in values):
+        raise ValueError(f"{name} must be among: {', '.join(allowed)}")
+    return values
+
+@analytics_bp.get("/offices")
+@jwt_required()
+def office_analytics():
+    """
+    Shipments and revenue by company -> office -> employee for a sent_date range
+    Every level carries its subtotal; only employees can view this report
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        start_date = parse_date_arg("start_date")
+        end_date = parse_date_arg("end_date")
+        company_id = _int_arg("company_id")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    report = office_rollup(start_date, end_date, company_id)
+    report["period"] = {
+        "start_date": request.args.get("start_date"),
+        "end_date": request.args.get("end_date")
+    }
+    return jsonify(report), 200
+
+@analytics_bp.get("/throughput")
+@jwt_required()
+def shipment_throughput():
+    """
+    Shipments created, sent and delivered per time bucket
+    resolution: minute, hour, day or multiples (15m, 6h, 7d); default hour
+    Optional events, office_id and group_by (office, status) as comma lists;
+    the range defaults to the last 168 buckets
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        seconds = throughput.parse_resolution(request.args.get("resolution", "hour"))
+        end_date = parse_date_arg("end_date") or datetime.utcnow()
+        start_date = parse_date_arg("start_date") or end_date - timedelta(seconds=seconds * 168)
+        if start_date >= end_date:
+            raise ValueError("start_date must be before end_date")
+        events = _list_arg("events", throughput.EVENTS)
+        group_by = list(dict.fromkeys(_list_arg("group_by", throughput.GROUPS)))
+        try:
+            office_ids = [int(value) for value in _list_arg("office_id")]
+        except ValueError:
+            raise ValueError("office_id must be a list of numbers")
+        buckets, series = throughput.series(
+            start_date, end_date, seconds, events, office_ids, group_by,
+            current_app.config.get("THROUGHPUT_MAX_BUCKETS", 10000),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify({
+        "resolution_seconds": seconds,
+        "buckets": buckets,
+        "series": [dict(group, counts=counts) for group, counts in series]
+    }), 200
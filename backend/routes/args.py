@@ -0,0 +1,23 @@
+from datetime import datetime, timezone
+from flask import request
+
+# Request argument parsing shared by the blueprints
+
+
+def parse_datetime(value):
+    """datetime from an ISO string; aware ones (the UI sends ...Z) become naive UTC like the stored dates"""
+    parsed = datetime.fromisoformat(value)
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_date_arg(name):
+    """Query argument as a datetime (None when absent); ValueError when it is not an ISO date"""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return parse_datetime(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date")
@@ -3,13 +3,25 @@ from extensions import db
 from models.user import User
 from models.employee import Employee
 from models.client import Client
+from services.passwords import PasswordHasherBusy
+from services.access import client_id_for_user
+from services.sharding import shards
+from services.idempotency import idempotent
 from flask_jwt_extended import create_access_token
+from sqlalchemy import select
 
 auth_bp = Blueprint("auth", __name__, url_prefix="/api/auth")
 
+
+def _hasher_busy_response():
+    # Fast rejection while the hashing pool is saturated
+    return jsonify({"error": "Server is busy, please try again"}), 503, {"Retry-After": "1"}
+
+
 # User registration and login system
 # Role assignment (CLIENT or EMPLOYEE)
 @auth_bp.post("/register")
+@idempotent
 def register():
     """
     Register new users with email and password
@@ -33,57 +45,63 @@ def register():
 
     # Create user with secure password hashing
     user = User(email=email, role=role)
-    user.set_password(password)
-
     try:
-        db.session.add(user)
-        db.session.flush()
-
-        # Create additional profile based on role
-        if role == "CLIENT":
-            # Client data input (company, contact information)
-            client = Client(
-                user_id=user.id,
-                company_name=data.get("company_name", ""),
-                first_name=data.get("first_name", ""),
-                last_name=data.get("last_name", ""),
-                phone=data.get("phone", ""),
-                address=data.get("address", ""),
-                city=data.get("city", ""),
-                country=data.get("country", ""),
-            )
-            db.session.add(client)
-        elif role == "EMPLOYEE":
-            # Employee data input (company and office assignment)
-            company_id = data.get("company_id")
-            office_id = data.get("office_id")
-            
-            # If both are provided, validate they exist
-            if company_id and office_id:
-                from models.company import Company
-                from models.office import Office
-                if not Company.query.get(company_id):
-                    return jsonify({"error": "Company not found"}), 404
-                if not Office.query.get(office_id):
-                    return jsonify({"error": "Office not found"}), 404
-                
-                employee = Employee(
+        user.set_password(password)
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
+
+    # An employee's profile goes to the shard of their company (services/sharding.py)
+    shard = shards.for_company(data.get("company_id")) if role == "EMPLOYEE" else None
+    with shards.use(shard):
+        try:
+            db.session.add(user)
+            db.session.flush()
+
+            # Create additional profile based on role
+            if role == "CLIENT":
+                # Client data input (company, contact information)
+                client = Client(
                     user_id=user.id,
-                    company_id=company_id,
-                    office_id=office_id,
+                    company_name=data.get("company_name", ""),
                     first_name=data.get("first_name", ""),
                     last_name=data.get("last_name", ""),
                     phone=data.get("phone", ""),
+                    address=data.get("address", ""),
+                    city=data.get("city", ""),
+                    country=data.get("country", ""),
                 )
-                db.session.add(employee)
-            # If not provided, just create the user with EMPLOYEE role
-            # They can complete their profile later
-
-        db.session.commit()
-        return jsonify({"message": "Registration successful", "user_id": user.id}), 201
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+                db.session.add(client)
+            elif role == "EMPLOYEE":
+                # Employee data input (company and office assignment)
+                company_id = data.get("company_id")
+                office_id = data.get("office_id")
+            
+                # If both are provided, validate they exist
+                if company_id and office_id:
+                    from models.company import Company
+                    from models.office import Office
+                    if not Company.query.get(company_id):
+                        return jsonify({"error": "Company not found"}), 404
+                    if not Office.query.get(office_id):
+                        return jsonify({"error": "Office not found"}), 404
+                
+                    employee = Employee(
+                        user_id=user.id,
+                        company_id=company_id,
+                        office_id=office_id,
+                        first_name=data.get("first_name", ""),
+                        last_name=data.get("last_name", ""),
+                        phone=data.get("phone", ""),
+                    )
+                    db.session.add(employee)
+                # If not provided, just create the user with EMPLOYEE role
+                # They can complete their profile later
+
+            db.session.commit()
+            return jsonify({"message": "Registration successful", "user_id": user.id}), 201
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
 
 
 # User login system
@@ -101,13 +119,39 @@ def login():
     # Authenticate user
     user = User.query.filter_by(email=email).first()
 
-    if not user or not user.check_password(password):
-        return jsonify({"error": "Invalid credentials"}), 401
+    try:
+        if not user or not user.check_password(password):
+            return jsonify({"error": "Invalid credentials"}), 401
+    except PasswordHasherBusy:
+        return _hasher_busy_response()
+
+    # Transparently upgrade hashes made with an older algorithm or cost
+    if user.password_needs_rehash():
+        try:
+            user.set_password(password)
+            db.session.commit()
+        except PasswordHasherBusy:
+            # Keep the old hash; the upgrade is retried on the next login
+            db.session.rollback()
 
     # Include role in JWT token for authorization
+    claims = {"role": user.role}
+    if user.role == "CLIENT":
+        # Lets shipment creation check the sender without looking the profile up
+        shard, client_id = shards.locate(client_id_for_user(user.id))
+        if client_id is not None:
+            claims["client_id"] = client_id
+        if shard is not None:
+            # Clients created by an employee live on that employee's shard
+            claims["shard"] = shard
+    elif shards.shards:
+        # Requests are routed to the shard of this company (services/sharding.py)
+        _, company_id = shards.locate(select(Employee.company_id).where(Employee.user_id == user.id))
+        if company_id is not None:
+            claims["company_id"] = company_id
     token = create_access_token(
         identity=str(user.id),
-        additional_claims={"role": user.role}
+        additional_claims=claims
     )
 
     return jsonify({"access_token": token, "user_id": user.id, "role": user.role}), 200
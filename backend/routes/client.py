@@ -1,8 +1,16 @@
-from flask import Blueprint, request, jsonify
-from extensions import db
+import io
+
+from flask import Blueprint, current_app, request, jsonify
+from extensions import db, client_search_index
 from models.client import Client
 from models.user import User
+from models.client_shipment_stats import ClientShipmentStats
+from services.client_search import tokenize, client_projection
+from services.idempotency import idempotent
+from services.client_import import import_clients
+from routes.purge import delete_target
 from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy import or_
 
 client_bp = Blueprint("client", __name__, url_prefix="/api/client")
 
@@ -38,10 +46,55 @@ def get_clients():
     
     return jsonify([c.to_dict() for c in clients]), 200
 
+@client_bp.get("/search")
+@jwt_required()
+def search_clients():
+    """
+    Typeahead search for recipients by name, company or city prefix
+    Returns a compact projection, clients never see themselves
+    """
+    claims = get_jwt()
+    role = claims.get("role")
+    user_id = claims.get("sub")
+
+    words = tokenize(request.args.get("q"))
+    try:
+        limit = min(max(int(request.args.get("limit", 20)), 1), 50)
+    except (TypeError, ValueError):
+        return jsonify({"error": "limit must be a number"}), 400
+
+    exclude_user_id = None
+    if role != "EMPLOYEE":
+        try:
+            exclude_user_id = int(user_id) if user_id else None
+        except (ValueError, TypeError):
+            exclude_user_id = None
+        if not exclude_user_id:
+            return jsonify([]), 200
+
+    if words and client_search_index.enabled:
+        return jsonify(client_search_index.search(" ".join(words), limit, exclude_user_id)), 200
+
+    # Indexed column-prefix LIKE queries (no in-memory index, or empty query)
+    query = db.session.query(Client.id, Client.first_name, Client.last_name, Client.company_name, Client.city)
+    if exclude_user_id:
+        query = query.filter(Client.user_id != exclude_user_id)
+    for word in words:
+        # Words are \w+ tokens, so "_" is the only LIKE wildcard to escape
+        pattern = word.replace("_", "\\_") + "%"
+        query = query.filter(or_(
+            Client.first_name.like(pattern, escape="\\"),
+            Client.last_name.like(pattern, escape="\\"),
+            Client.company_name.like(pattern, escape="\\"),
+            Client.city.like(pattern, escape="\\"),
+        ))
+    clients = query.order_by(Client.last_name, Client.first_name, Client.id).limit(limit).all()
+    return jsonify([client_projection(c) for c in clients]), 200
+
 @client_bp.get("/me")
 @jwt_required()
 def get_current_client():
-    """Get current logged-in client's profile"""
+    """Get current logged-in client's profile with shipment counters"""
     claims = get_jwt()
     role = claims.get("role")
     user_id = claims.get("sub")
@@ -57,8 +110,12 @@ def get_current_client():
         client = Client.query.filter_by(user_id=user_id_int).first()
         if not client:
             return jsonify({"error": "Client profile not found"}), 404
-        
-        return jsonify(client.to_dict()), 200
+
+        # Maintained counters (one primary key lookup, no shipment scan)
+        data = client.to_dict()
+        stats = client.shipment_stats
+        data["stats"] = stats.to_dict() if stats else ClientShipmentStats.empty()
+        return jsonify(data), 200
     except (ValueError, TypeError):
         return jsonify({"error": "Invalid user ID"}), 400
 
@@ -76,6 +133,7 @@ def get_client(client_id):
 
 @client_bp.post("")
 @jwt_required()
+@idempotent
 def create_client():
     """
     Create new client (CRUD - Create)
@@ -116,6 +174,44 @@ def create_client():
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
+@client_bp.post("/import")
+@jwt_required()
+@idempotent
+def import_client_csv():
+    """
+    Create client users from an uploaded CSV (multipart "file" or a text/csv body)
+    Columns as for "flask import-clients"; returns per-row errors for rejected rows
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    upload = request.files.get("file")
+    if upload is not None:
+        stream = upload.stream
+    elif request.mimetype == "text/csv":
+        stream = request.stream
+    else:
+        return jsonify({"error": "Upload a CSV as multipart field 'file' or as a text/csv body"}), 400
+
+    config = current_app.config
+    try:
+        result = import_clients(
+            io.TextIOWrapper(stream, encoding="utf-8-sig", newline=""),
+            int(config.get("CLIENT_IMPORT_WORKERS", 1)),
+            int(config.get("CLIENT_IMPORT_BATCH_SIZE", 1000)),
+            int(config.get("CLIENT_IMPORT_MAX_ROWS", 1000)),
+        )
+    except UnicodeDecodeError:
+        db.session.rollback()
+        return jsonify({"error": "The CSV must be UTF-8 encoded"}), 400
+    return jsonify({
+        "imported": result.imported,
+        "rejected": len(result.errors),
+        "truncated": result.truncated,
+        "errors": result.errors,
+    }), 200
+
 @client_bp.put("/<int:client_id>")
 @jwt_required()
 def update_client(client_id):
@@ -174,10 +270,5 @@ def delete_client(client_id):
     if not client:
         return jsonify({"error": "Client not found"}), 404
     
-    try:
-        db.session.delete(client)
-        db.session.commit()
-        return jsonify({"message": "Client deleted"}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+    # With its shipments; large ones continue as a background purge job
+    return delete_target("client", client_id, int(claims.get("sub")), "Client deleted")
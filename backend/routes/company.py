@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.company import Company
+from routes.purge import delete_target
 from flask_jwt_extended import jwt_required, get_jwt
 
 company_bp = Blueprint("company", __name__, url_prefix="/api/company")
@@ -113,10 +114,5 @@ def delete_company(company_id):
     if not company:
         return jsonify({"error": "Company not found"}), 404
     
-    try:
-        db.session.delete(company)
-        db.session.commit()
-        return jsonify({"message": "Company deleted"}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+    # With its shipments; large ones continue as a background purge job
+    return delete_target("company", company_id, int(claims.get("sub")), "Company deleted")
@@ -1,9 +1,20 @@
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.contact import Contact
+from services.contact_buffer import contact_buffer
+from flask_jwt_extended import jwt_required, get_jwt
+from datetime import datetime
+from sqlalchemy import and_, func, or_, update
 
 bp = Blueprint("contact", __name__)
 
+INBOX_PAGE_SIZE = 50
+INBOX_MAX_PAGE_SIZE = 200
+# Column sizes of Contact.name and Contact.email
+MAX_NAME_LENGTH = 100
+MAX_EMAIL_LENGTH = 120
+
+
 @bp.post("/api/contact")
 def contact():
     data = request.get_json(silent=True) or {}
@@ -14,17 +25,115 @@ def contact():
 
     if not name or not email or not message:
         return jsonify({"error": "Моля попълнете име, имейл и съобщение."}), 400
+    if len(name) > MAX_NAME_LENGTH or len(email) > MAX_EMAIL_LENGTH:
+        return jsonify({"error": f"Името може да е до {MAX_NAME_LENGTH}, а имейлът до {MAX_EMAIL_LENGTH} знака."}), 400
+
+    # Written to the database in batches by the background writer
+    if not contact_buffer.submit(name, email, message):
+        return jsonify({"error": "Опитайте отново след малко."}), 503, {"Retry-After": "1"}
+    return jsonify({"message": "Съобщението беше получено. Благодарим!"}), 200
+
+
+def _parse_cursor(value):
+    """(created_at, id) of the last message on the previous page, from "<ISO date>,<id>" """
+    created_at, _, message_id = (value or "").rpartition(",")
+    try:
+        return datetime.fromisoformat(created_at), int(message_id)
+    except ValueError:
+        raise ValueError("cursor must be the next_cursor of a previous page")
+
+
+def _unread_count():
+    # "= false", not "IS false": MySQL only uses ix_contacts_is_read_created_at for equality
+    return db.session.query(func.count(Contact.id)).filter(Contact.is_read == False).scalar()  # noqa: E712
+
+
+@bp.get("/api/contact/messages")
+@jwt_required()
+def list_messages():
+    """
+    Employee inbox, newest first
+    Optional status (unread, read), limit and cursor (next_cursor of the previous page)
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    status = request.args.get("status")
+    if status not in (None, "unread", "read"):
+        return jsonify({"error": "status must be unread or read"}), 400
+    try:
+        limit = min(max(int(request.args.get("limit", INBOX_PAGE_SIZE)), 1), INBOX_MAX_PAGE_SIZE)
+    except ValueError:
+        return jsonify({"error": "limit must be a number"}), 400
+    try:
+        cursor = _parse_cursor(request.args.get("cursor")) if request.args.get("cursor") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    # Keyset pagination on (created_at, id): every page is an index range scan
+    query = Contact.query
+    if status:
+        query = query.filter(Contact.is_read == (status == "read"))
+    if cursor:
+        created_at, message_id = cursor
+        query = query.filter(or_(
+            Contact.created_at < created_at,
+            and_(Contact.created_at == created_at, Contact.id < message_id),
+        ))
+    messages = query.order_by(Contact.created_at.desc(), Contact.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(messages) > limit:
+        messages = messages[:limit]
+        last = messages[-1]
+        next_cursor = f"{last.created_at.isoformat()},{last.id}"
+    return jsonify({
+        "messages": [message.to_dict() for message in messages],
+        "next_cursor": next_cursor,
+        "unread_count": _unread_count(),
+    }), 200
+
+
+@bp.get("/api/contact/messages/unread-count")
+@jwt_required()
+def unread_count():
+    """Number of unread messages (inbox badge)"""
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+    return jsonify({"unread_count": _unread_count()}), 200
+
+
+@bp.post("/api/contact/messages/read")
+@jwt_required()
+def mark_messages_read():
+    """
+    Mark messages as read in one UPDATE
+    Body: ids, or all=true for every message received so far
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    stmt = update(Contact).where(Contact.is_read == False).values(is_read=True)  # noqa: E712
+    if data.get("all") is True:
+        stmt = stmt.where(Contact.created_at <= datetime.utcnow())
+    else:
+        ids = data.get("ids")
+        if not isinstance(ids, list) or not ids:
+            return jsonify({"error": "ids must be a non-empty list (or all=true)"}), 400
+        try:
+            ids = [int(message_id) for message_id in ids]
+        except (TypeError, ValueError):
+            return jsonify({"error": "ids must be numbers"}), 400
+        stmt = stmt.where(Contact.id.in_(ids))
 
-    contact_msg = Contact(
-        name=name,
-        email=email,
-        message=message
-    )
-    
     try:
-        db.session.add(contact_msg)
+        updated = db.session.execute(stmt.execution_options(synchronize_session=False)).rowcount
         db.session.commit()
-        return jsonify({"message": "Съобщението беше получено. Благодарим!"}), 200
+        return jsonify({"message": "Messages marked as read", "updated": updated}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
@@ -2,7 +2,9 @@ from flask import Blueprint, request, jsonify
 from extensions import db
 from models.employee import Employee
 from models.user import User
+from services.sharding import shards
 from flask_jwt_extended import jwt_required, get_jwt
+from sqlalchemy.exc import IntegrityError
 
 employee_bp = Blueprint("employee", __name__, url_prefix="/api/employee")
 
@@ -23,8 +25,9 @@ def get_employees():
     
     company_id = request.args.get("company_id")
     if company_id:
-        # Filter by company
-        employees = Employee.query.filter_by(company_id=company_id).all()
+        # Filter by company, on the company's shard
+        with shards.use(shards.for_company(company_id)):
+            employees = Employee.query.filter_by(company_id=company_id).all()
     else:
         employees = Employee.query.all()
     
@@ -74,13 +77,15 @@ def create_employee():
         phone=data.get("phone"),
     )
     
-    try:
-        db.session.add(employee)
-        db.session.commit()
-        return jsonify({"message": "Employee created", "employee_id": employee.id}), 201
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+    # Stored on the shard of its company (services/sharding.py)
+    with shards.use(shards.for_company(employee.company_id)):
+        try:
+            db.session.add(employee)
+            db.session.commit()
+            return jsonify({"message": "Employee created", "employee_id": employee.id}), 201
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
 
 @employee_bp.put("/<int:employee_id>")
 @jwt_required()
@@ -132,6 +137,10 @@ def delete_employee(employee_id):
         db.session.delete(employee)
         db.session.commit()
         return jsonify({"message": "Employee deleted"}), 200
+    except IntegrityError:
+        # Shipments keep their registering employee (no ON DELETE on that key)
+        db.session.rollback()
+        return jsonify({"error": "Employee has registered shipments; deactivate them instead"}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
@@ -1,6 +1,12 @@
+import math
 from flask import Blueprint, request, jsonify
 from extensions import db
 from models.office import Office
+from services.geocoding import locate
+from services.office_locator import office_locator
+from routes.purge import delete_target
+from services.purge import office_shipment_count
+from services.sharding import shards
 from flask_jwt_extended import jwt_required, get_jwt
 
 office_bp = Blueprint("office", __name__, url_prefix="/api/office")
@@ -20,13 +26,52 @@ def get_offices():
     
     company_id = request.args.get("company_id")
     if company_id:
-        # Filter offices by company
-        offices = Office.query.filter_by(company_id=company_id).all()
+        # Filter offices by company, on the company's shard
+        with shards.use(shards.for_company(company_id)):
+            offices = Office.query.filter_by(company_id=company_id).all()
     else:
         offices = Office.query.all()
     
     return jsonify([o.to_dict() for o in offices]), 200
 
+@office_bp.get("/nearest")
+@jwt_required()
+def get_nearest_offices():
+    """
+    Closest offices to a point (lat, lon) or to an address and/or city
+    Optional n (1-20) and company_id
+    """
+    try:
+        n = min(max(int(request.args.get("n", 1)), 1), 20)
+        company_id = int(request.args["company_id"]) if request.args.get("company_id") else None
+    except ValueError:
+        return jsonify({"error": "n and company_id must be numbers"}), 400
+
+    if request.args.get("lat") or request.args.get("lon"):
+        try:
+            point = (float(request.args.get("lat")), float(request.args.get("lon")))
+        except (TypeError, ValueError):
+            return jsonify({"error": "lat and lon must be numbers"}), 400
+        if not all(math.isfinite(value) for value in point) or abs(point[0]) > 90 or abs(point[1]) > 180:
+            return jsonify({"error": "lat must be within -90..90 and lon within -180..180"}), 400
+    elif request.args.get("address") or request.args.get("city"):
+        point = locate(request.args.get("address"), request.args.get("city"))
+        if point is None:
+            return jsonify({"error": "Location not found"}), 404
+    else:
+        return jsonify({"error": "lat and lon, or address/city required"}), 400
+
+    nearest = office_locator.nearest(point[0], point[1], n, company_id)
+    offices = {o.id: o for o in Office.query.filter(Office.id.in_([office_id for office_id, _ in nearest]))}
+    return jsonify({
+        "latitude": point[0],
+        "longitude": point[1],
+        "offices": [
+            dict(offices[office_id].to_dict(), distance_km=round(km, 3))
+            for office_id, km in nearest if office_id in offices
+        ],
+    }), 200
+
 @office_bp.get("/<int:office_id>")
 @jwt_required()
 def get_office(office_id):
@@ -66,13 +111,15 @@ def create_office():
         country=data.get("country"),
     )
     
-    try:
-        db.session.add(office)
-        db.session.commit()
-        return jsonify({"message": "Office created", "office_id": office.id}), 201
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+    # Stored on the shard of its company (services/sharding.py)
+    with shards.use(shards.for_company(office.company_id)):
+        try:
+            db.session.add(office)
+            db.session.commit()
+            return jsonify({"message": "Office created", "office_id": office.id}), 201
+        except Exception as e:
+            db.session.rollback()
+            return jsonify({"error": str(e)}), 400
 
 @office_bp.put("/<int:office_id>")
 @jwt_required()
@@ -120,10 +167,9 @@ def delete_office(office_id):
     if not office:
         return jsonify({"error": "Office not found"}), 404
     
-    try:
-        db.session.delete(office)
-        db.session.commit()
-        return jsonify({"message": "Office deleted"}), 200
-    except Exception as e:
-        db.session.rollback()
-        return jsonify({"error": str(e)}), 400
+    # Shipment history stays: its employees must not have registered any
+    if office_shipment_count(office_id):
+        return jsonify({"error": "Office employees have registered shipments; move them to another office first"}), 409
+
+    # With its employees; large ones continue as a background purge job
+    return delete_target("office", office_id, int(claims.get("sub")), "Office deleted")
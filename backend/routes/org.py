@@ -0,0 +1,35 @@
+from flask import Blueprint, current_app, request, jsonify
+from extensions import db
+from services.org_tree import org_tree
+from flask_jwt_extended import jwt_required, get_jwt
+
+org_bp = Blueprint("org", __name__, url_prefix="/api/org")
+
+
+def _etag(version):
+    return f"org-tree-{version}"
+
+
+@org_bp.get("/tree")
+@jwt_required()
+def get_tree():
+    """
+    Companies with their offices and employees, in one response
+    Carries an ETag; a request with a matching If-None-Match gets 304
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    # Revalidation costs one counter read (two with shards), without touching the cached tree
+    version = org_tree.version(db.session)
+    if request.if_none_match.contains(_etag(version)):
+        response = current_app.response_class(status=304)
+    else:
+        version, body = org_tree.get(db.session, version)
+        response = current_app.response_class(body, mimetype="application/json")
+    response.set_etag(_etag(version))
+    # The browser may keep it, but must revalidate before every use
+    response.headers["Cache-Control"] = "private, no-cache"
+    response.vary.add("Authorization")
+    return response
@@ -0,0 +1,92 @@
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from extensions import db
+from models.office import Office
+from models.employee import Employee
+from services.load_planner import undelivered_parcels, plan_loads
+from services.route_planner import plan_office_routes
+from flask_jwt_extended import jwt_required, get_jwt
+from datetime import date
+import json
+
+planning_bp = Blueprint("planning", __name__, url_prefix="/api/planning")
+
+# Dispatch planning for employees
+
+def _positive_float_arg(name, default):
+    value = request.args.get(name)
+    if value in (None, ""):
+        return float(default)
+    try:
+        parsed = float(value)
+    except ValueError:
+        raise ValueError(f"{name} must be a number")
+    if not parsed > 0:
+        raise ValueError(f"{name} must be positive")
+    return parsed
+
+@planning_bp.get("/loads")
+@jwt_required()
+def plan_vehicle_loads():
+    """
+    Pack undelivered shipments into vehicle loads per origin -> destination lane
+    Vehicle capacity: max_weight (kg) and max_volume (cm3), defaults from config
+    format=ndjson (or Accept: application/x-ndjson) streams one load per line
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    try:
+        max_weight = _positive_float_arg("max_weight", current_app.config.get("VEHICLE_MAX_WEIGHT", 1500))
+        max_volume = _positive_float_arg("max_volume", current_app.config.get("VEHICLE_MAX_VOLUME", 12000000))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    manifests = plan_loads(undelivered_parcels(), max_weight, max_volume)
+    capacity = {"max_weight": max_weight, "max_volume": max_volume}
+
+    if request.args.get("format") == "ndjson" or request.accept_mimetypes.best == "application/x-ndjson":
+        def generate():
+            yield json.dumps({"vehicle_capacity": capacity}) + "\n"
+            for manifest in manifests:
+                yield json.dumps(manifest, ensure_ascii=False) + "\n"
+
+        return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+    loads = list(manifests)
+    unassigned = loads.pop()["unassigned"]
+    return jsonify({"vehicle_capacity": capacity, "load_count": len(loads), "loads": loads, "unassigned": unassigned}), 200
+
+@planning_bp.get("/routes/<int:office_id>")
+@jwt_required()
+def plan_courier_routes(office_id):
+    """
+    Stop sequences per courier for the office's IN_TRANSIT deliveries of a date
+    (default today): shipments sent by the end of that day
+    couriers defaults to the office's active employees, time_budget (s) to config
+    Distances are cached per office and date
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    office = db.session.get(Office, office_id)
+    if not office:
+        return jsonify({"error": "Office not found"}), 404
+
+    try:
+        day = date.fromisoformat(request.args["date"]) if request.args.get("date") else date.today()
+    except ValueError:
+        return jsonify({"error": "date must be an ISO date"}), 400
+    try:
+        default_couriers = Employee.query.filter_by(office_id=office.id, is_active=True).count() or 1
+        couriers = int(_positive_float_arg("couriers", default_couriers))
+        time_budget = min(_positive_float_arg("time_budget", current_app.config.get("ROUTE_TIME_BUDGET", 2)),
+                          current_app.config.get("ROUTE_MAX_TIME_BUDGET", 30))
+        if couriers < 1:
+            raise ValueError("couriers must be at least 1")
+        plan = plan_office_routes(office, day, couriers, time_budget)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(plan), 200
@@ -0,0 +1,41 @@
+from flask import Blueprint, jsonify, url_for
+from extensions import db
+from models.purge_job import PurgeJob
+from services.purge import purge_jobs
+from flask_jwt_extended import jwt_required, get_jwt
+
+purge_bp = Blueprint("purge", __name__, url_prefix="/api/purge-jobs")
+
+# Deletions of companies, offices and clients (services/purge.py)
+# Small ones finish inside the DELETE request; large ones answer 202 with a job to poll
+
+
+def delete_target(target, target_id, user_id, message):
+    """Response of a DELETE endpoint: 200 when done inline, 202 + Location for a background job"""
+    try:
+        job, created = purge_jobs.submit(target, target_id, user_id)
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"error": str(e)}), 400
+
+    if job.status == "DONE":
+        return jsonify({"message": message, "job": job.to_dict()}), 200
+    if job.status == "FAILED":
+        return jsonify({"error": job.error, "job": job.to_dict()}), 400
+    location = url_for("purge.get_purge_job", job_id=job.id)
+    return jsonify(job.to_dict()), 202 if created else 200, {"Location": location}
+
+
+@purge_bp.get("/<job_id>")
+@jwt_required()
+def get_purge_job(job_id):
+    """Poll purge job progress"""
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    job = db.session.get(PurgeJob, job_id)
+    if not job:
+        return jsonify({"error": "Purge job not found"}), 404
+
+    return jsonify(job.to_dict()), 200
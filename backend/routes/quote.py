@@ -0,0 +1,39 @@
+from flask import Blueprint, request, jsonify, current_app
+from services.tariff import tariff_engine
+from flask_jwt_extended import jwt_required
+
+quote_bp = Blueprint("quote", __name__, url_prefix="/api/quote")
+
+# Shipment price quotes from the tariff engine
+
+@quote_bp.post("/batch")
+@jwt_required()
+def quote_batch():
+    """
+    Price a batch of parcels
+    Body: {"service": "STANDARD", "parcels": [{"weight", "dimensions", "origin", "destination", "service"}]}
+    Origin and destination are city names or addresses; invalid parcels get an error entry
+    """
+    data = request.get_json(silent=True) or {}
+    parcels = data.get("parcels")
+    if not isinstance(parcels, list) or not parcels:
+        return jsonify({"error": "parcels must be a non-empty list"}), 400
+
+    limit = current_app.config.get("QUOTE_BATCH_LIMIT", 50000)
+    if len(parcels) > limit:
+        return jsonify({"error": f"At most {limit} parcels per batch"}), 400
+
+    try:
+        # Validate the batch-wide default service up front
+        if data.get("service") is not None:
+            tariff_engine.service_index(data.get("service"))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    quotes = tariff_engine.quote_parcels(parcels, data.get("service"))
+    return jsonify({
+        "currency": tariff_engine.currency,
+        "count": len(quotes),
+        "errors": sum(1 for quote in quotes if "error" in quote),
+        "quotes": quotes,
+    }), 200
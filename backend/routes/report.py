@@ -0,0 +1,89 @@
+from flask import Blueprint, request, jsonify, send_file, url_for
+from extensions import db
+from models.report_job import ReportJob
+from services.report_jobs import report_jobs
+from services.idempotency import idempotent
+from flask_jwt_extended import jwt_required, get_jwt
+import os
+
+report_bp = Blueprint("report", __name__, url_prefix="/api/reports")
+
+# Asynchronous report jobs
+# Queue a report, poll its status and download the compressed result
+
+def _job_response(job):
+    data = job.to_dict()
+    if job.status == "DONE":
+        data["result_url"] = url_for("report.download_report_job_result", job_id=job.id)
+    return data
+
+@report_bp.post("/jobs")
+@jwt_required()
+@idempotent
+def create_report_job():
+    """
+    Queue a report (all_shipments, by_employee, by_sender, by_receiver, undelivered, revenue)
+    Identical requests that are still running return the existing job
+    Only employees can run reports
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    try:
+        job, created = report_jobs.submit(
+            data.get("report"),
+            data.get("params") or {},
+            data.get("format", "ndjson"),
+            int(claims.get("sub")),
+        )
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    location = url_for("report.get_report_job", job_id=job.id)
+    return jsonify(_job_response(job)), 202 if created else 200, {"Location": location}
+
+@report_bp.get("/jobs/<job_id>")
+@jwt_required()
+def get_report_job(job_id):
+    """Poll report job status"""
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    job = db.session.get(ReportJob, job_id)
+    if not job:
+        return jsonify({"error": "Report job not found"}), 404
+
+    return jsonify(_job_response(job)), 200
+
+@report_bp.get("/jobs/<job_id>/result")
+@jwt_required()
+def download_report_job_result(job_id):
+    """
+    Download the gzip-compressed report result
+    Supports Range requests for resumable downloads
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    job = db.session.get(ReportJob, job_id)
+    if not job:
+        return jsonify({"error": "Report job not found"}), 404
+    if job.status != "DONE":
+        return jsonify({"error": f"Report job is {job.status}"}), 409
+
+    path = report_jobs.result_path(job)
+    if not os.path.exists(path):
+        return jsonify({"error": "Report result has expired"}), 410
+
+    return send_file(
+        path,
+        mimetype="application/gzip",
+        as_attachment=True,
+        download_name=f"{job.report}-{job.id}.{job.format}.gz",
+        conditional=True,
+        max_age=0,
+    )
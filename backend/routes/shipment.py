@@ -1,11 +1,23 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, current_app, request, jsonify
 from extensions import db
 from models.shipment import Shipment
 from models.client import Client
 from models.employee import Employee
+from services.shipment_search import matching_ids
+from services.archival import report_models
+from services.tariff import tariff_engine
+from services.parcel_size import size_filters
+from services.office_analytics import employee_directory
+from services.sharding import shards, current as current_shard
+from services.idempotency import idempotent
+from services.shipment_status import STATUSES, NOT_FOUND, StatusConflict, can_transition, transition
+from routes.args import parse_date_arg, parse_datetime
+from services.access import identity_from_claims, client_id_for_user, visible_shipments, can_view_shipment, tracking_view
 from flask_jwt_extended import jwt_required, get_jwt
 from datetime import datetime
-from sqlalchemy import and_, or_, func
+from sqlalchemy import and_, or_, func, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm.exc import StaleDataError
 from decimal import Decimal, InvalidOperation
 
 shipment_bp = Blueprint("shipment", __name__, url_prefix="/api/shipment")
@@ -43,6 +55,104 @@ def _parse_non_negative_decimal(value, field_name):
         raise ValueError(f"{field_name} cannot be negative")
     return parsed
 
+def _parse_page_args(default_per_page=20, max_per_page=100):
+    try:
+        page = max(int(request.args.get("page", 1)), 1)
+        per_page = min(max(int(request.args.get("per_page", default_per_page)), 1), max_per_page)
+    except (TypeError, ValueError):
+        raise ValueError("page and per_page must be numbers")
+    return page, per_page
+
+
+def _parse_version(value):
+    if value is None:
+        return None
+    try:
+        version = int(value)
+    except (TypeError, ValueError):
+        raise ValueError("version must be a number")
+    if version < 1:
+        raise ValueError("version must be positive")
+    return version
+
+
+def _create_conflict(tracking_number, sender_id, receiver_id, employee_id, error):
+    """Message for a shipment INSERT rejected by a constraint (only runs on failure)"""
+    if db.session.query(Shipment.query.filter_by(tracking_number=tracking_number).exists()).scalar():
+        return "Tracking number already exists"
+    if db.session.query(Client.id).filter(Client.id.in_([sender_id, receiver_id])).count() < len({sender_id, receiver_id}):
+        return "Sender or receiver not found"
+    if db.session.get(Employee, employee_id) is None:
+        return "Registering employee not found"
+    return str(error.orig)
+
+
+def _report_rows(filters, start_date=None, end_date=None, databases=None, hot_only=False):
+    """
+    Run a report over hot shipments, plus the archive when the sent date
+    range reaches back into it. filters(model) returns the criteria.
+    Like the revenue report it covers every database (default); ids repeat
+    across shards, so rows then say where they are from.
+    """
+    rows = []
+    for shard in shards.all() if databases is None else databases:
+        with shards.use(shard):
+            for model in (Shipment,) if hot_only else report_models(start_date):
+                query = model.query.filter(*filters(model))
+                if start_date:
+                    query = query.filter(model.sent_date >= start_date)
+                if end_date:
+                    query = query.filter(model.sent_date <= end_date)
+                # populate_existing: an id already loaded from another shard is not the same row
+                for shipment in query.populate_existing().all():
+                    row = shipment.to_dict()
+                    if shards.shards:
+                        row["shard"] = shard
+                    rows.append(row)
+    rows.sort(key=lambda row: (row["id"], row.get("shard") or ""))
+    return rows
+
+
+def _client_report_databases(claims, client_id):
+    """
+    (databases, error response) for a report on one client's shipments
+    Employees get every database (None); a client only its own.
+    """
+    role, user_id = identity_from_claims(claims)
+    if role == "EMPLOYEE":
+        _, found = shards.locate(select(Client.id).where(Client.id == client_id))
+        if found is None:
+            return None, (jsonify({"error": "Client not found"}), 404)
+        return None, None
+
+    client = Client.query.get(client_id)
+    if not client:
+        return None, (jsonify({"error": "Client not found"}), 404)
+    if client.user_id != user_id:
+        return None, (jsonify({"error": "Unauthorized"}), 403)
+    return [current_shard()], None
+
+
+def _revenue_totals(start_date=None, end_date=None):
+    """
+    (count, revenue) of DELIVERED shipments in one database
+    Archived shipments are included when the period reaches back into the archive.
+    """
+    shipment_count = 0
+    total_revenue = Decimal("0")
+    for model in report_models(start_date):
+        query = db.session.query(func.count(model.id), func.coalesce(func.sum(model.price), 0)).filter(
+            model.status == "DELIVERED"
+        )
+        if start_date:
+            query = query.filter(model.sent_date >= start_date)
+        if end_date:
+            query = query.filter(model.sent_date <= end_date)
+        count, revenue = query.one()
+        shipment_count += count
+        total_revenue += Decimal(str(revenue))
+    return shipment_count, total_revenue
+
 # Shipment CRUD operations (Create, Read, Update, Delete)
 # Employees register shipments (sent and received)
 # Employees see all shipments
@@ -54,25 +164,86 @@ def get_shipments():
     """
     Employees can view all shipments
     Clients can only view their own shipments (sent or received)
+    Optional size ranges: min_/max_ weight, length, width, height, volume
+    """
+    role, user_id = identity_from_claims(get_jwt())
+
+    try:
+        filters = size_filters(request.args, Shipment)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    client_id = None
+    if role != "EMPLOYEE":
+        # Clients see only their own shipments (sender or receiver)
+        client_id = db.session.execute(client_id_for_user(user_id)).scalar()
+        if not client_id:
+            return jsonify({"error": "Client profile not found"}), 404
+
+    shipments = db.session.execute(visible_shipments(role, client_id).where(*filters)).scalars().all()
+    return jsonify([s.to_dict() for s in shipments]), 200
+
+@shipment_bp.get("/track/<tracking_number>")
+def track_shipment(tracking_number):
+    """
+    Public shipment tracking by tracking number
+    Returns only status and dates
+    """
+    # No JWT to pick a shard: look in every database
+    shard, shipment = shards.locate(select(Shipment).filter_by(tracking_number=tracking_number))
+    if not shipment:
+        return jsonify({"error": "Shipment not found"}), 404
+
+    with shards.use(shard):
+        return jsonify(tracking_view(shipment)), 200
+
+@shipment_bp.get("/search")
+@jwt_required()
+def search_shipments():
+    """
+    Full-text search over description and addresses, prefix search over tracking number
+    Combines with status, sent date and size (min_/max_volume, ...) filters, paginated newest first
+    Employees search all shipments, clients only their own
     """
     claims = get_jwt()
     user_id = claims.get("sub")
     role = claims.get("role")
-    
-    if role == "EMPLOYEE":
-        # Employees see all shipments
-        shipments = Shipment.query.all()
-    else:  # CLIENT
-        # Clients see only their own shipments (sender or receiver)
+
+    try:
+        start_date = parse_date_arg("start_date")
+        end_date = parse_date_arg("end_date")
+        page, per_page = _parse_page_args()
+        filters = size_filters(request.args, Shipment)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    query = Shipment.query.filter(*filters)
+    q = (request.args.get("q") or "").strip()
+    if q:
+        query = query.filter(Shipment.id.in_(matching_ids(q)))
+
+    if role != "EMPLOYEE":
         client = Client.query.filter_by(user_id=user_id).first()
         if not client:
             return jsonify({"error": "Client profile not found"}), 404
-        
-        shipments = Shipment.query.filter(
-            or_(Shipment.sender_id == client.id, Shipment.receiver_id == client.id)
-        ).all()
-    
-    return jsonify([s.to_dict() for s in shipments]), 200
+        query = query.filter(or_(Shipment.sender_id == client.id, Shipment.receiver_id == client.id))
+
+    status = request.args.get("status")
+    if status:
+        query = query.filter(Shipment.status == status)
+    if start_date:
+        query = query.filter(Shipment.sent_date >= start_date)
+    if end_date:
+        query = query.filter(Shipment.sent_date <= end_date)
+
+    # Fetch one extra row instead of a COUNT(*) to know if there is a next page
+    shipments = query.order_by(Shipment.id.desc()).offset((page - 1) * per_page).limit(per_page + 1).all()
+    return jsonify({
+        "items": [s.to_dict() for s in shipments[:per_page]],
+        "page": page,
+        "per_page": per_page,
+        "has_more": len(shipments) > per_page,
+    }), 200
 
 @shipment_bp.get("/<int:shipment_id>")
 @jwt_required()
@@ -82,28 +253,29 @@ def get_shipment(shipment_id):
     Employees can view any shipment
     Clients can only view their own shipments
     """
-    claims = get_jwt()
-    user_id = claims.get("sub")
-    role = claims.get("role")
+    role, user_id = identity_from_claims(get_jwt())
     
     shipment = Shipment.query.get(shipment_id)
     if not shipment:
         return jsonify({"error": "Shipment not found"}), 404
     
+    client_id = None
     if role == "CLIENT":
         # Clients can only view their own shipments
-        client = Client.query.filter_by(user_id=user_id).first()
-        if client.id != shipment.sender_id and client.id != shipment.receiver_id:
-            return jsonify({"error": "Unauthorized"}), 403
+        client_id = db.session.execute(client_id_for_user(user_id)).scalar()
+    if not can_view_shipment(role, client_id, shipment):
+        return jsonify({"error": "Unauthorized"}), 403
     
     return jsonify(shipment.to_dict()), 200
 
 @shipment_bp.post("")
 @jwt_required()
+@idempotent
 def create_shipment():
     """
     Create new shipment (CRUD - Create)
     Employees and clients can create shipments
+    Without a price the tariff engine prices it (optional service_level)
     """
     claims = get_jwt()
     user_id = claims.get("sub")
@@ -112,7 +284,7 @@ def create_shipment():
     data = request.get_json() or {}
     
     required_fields = ["sender_id", "receiver_id", "tracking_number", 
-                      "weight", "dimensions", "description", "price", "origin_address", "destination_address"]
+                      "weight", "dimensions", "description", "origin_address", "destination_address"]
     missing = _missing_required_fields(data, required_fields)
     if missing:
         return jsonify({"error": f"Required fields: {', '.join(missing)}"}), 400
@@ -120,49 +292,77 @@ def create_shipment():
     # Validate numeric fields (prevents negative weight/price)
     try:
         weight = _parse_non_negative_float(data.get("weight"), "weight")
-        price = _parse_non_negative_decimal(data.get("price"), "price")
+        if _missing_required_fields(data, ["price"]):
+            price = tariff_engine.price(
+                weight,
+                data.get("dimensions"),
+                data.get("origin_address"),
+                data.get("destination_address"),
+                data.get("service_level"),
+            )
+        else:
+            price = _parse_non_negative_decimal(data.get("price"), "price")
     except ValueError as e:
         return jsonify({"error": str(e)}), 400
+    status = data.get("status", "PENDING")
+    if status not in STATUSES:
+        return jsonify({"error": f"status must be one of {', '.join(STATUSES)}"}), 400
     
-    if Shipment.query.filter_by(tracking_number=data.get("tracking_number")).first():
-        return jsonify({"error": "Tracking number already exists"}), 400
-    
+    # No existence pre-checks: the unique tracking number and the foreign keys
+    # are enforced by the INSERT, and failures are explained afterwards
+    try:
+        sender_id = int(data.get("sender_id"))
+        receiver_id = int(data.get("receiver_id"))
+    except (TypeError, ValueError):
+        return jsonify({"error": "sender_id and receiver_id must be numbers"}), 400
+
     # If client, verify they are the sender
     if role == "CLIENT":
-        client = Client.query.filter_by(user_id=user_id).first()
-        if not client or client.id != int(data.get("sender_id")):
+        client_id = claims.get("client_id")
+        if client_id is None:
+            # Tokens issued before the client_id claim
+            client_id = db.session.execute(client_id_for_user(user_id)).scalar()
+        if client_id != sender_id:
             return jsonify({"error": "Clients can only send shipments as themselves"}), 403
         # For clients, find an employee to register the shipment
-        employee = Employee.query.first()
-        if not employee:
+        registered_by_employee_id = employee_directory.intake_employee(db.session.connection())
+        if registered_by_employee_id is None:
             return jsonify({"error": "No employee available to register shipment"}), 400
-        registered_by_employee_id = employee.id
     else:
         # Employees must provide registered_by_employee_id
         if not data.get("registered_by_employee_id"):
             return jsonify({"error": "registered_by_employee_id required for employees"}), 400
-        registered_by_employee_id = data.get("registered_by_employee_id")
+        try:
+            registered_by_employee_id = int(data.get("registered_by_employee_id"))
+        except (TypeError, ValueError):
+            return jsonify({"error": "registered_by_employee_id must be a number"}), 400
     
     # Create shipment with tracking information
     shipment = Shipment(
-        sender_id=data.get("sender_id"),
-        receiver_id=data.get("receiver_id"),
+        sender_id=sender_id,
+        receiver_id=receiver_id,
         registered_by_employee_id=registered_by_employee_id,
         tracking_number=data.get("tracking_number"),
         weight=weight,
         dimensions=data.get("dimensions"),
         description=data.get("description"),
         price=price,
-        sent_date=datetime.fromisoformat(data.get("sent_date")) if data.get("sent_date") else datetime.utcnow(),
-        status=data.get("status", "PENDING"),
+        sent_date=parse_datetime(data.get("sent_date")) if data.get("sent_date") else datetime.utcnow(),
+        status=status,
         origin_address=data.get("origin_address"),
         destination_address=data.get("destination_address"),
     )
     
     try:
         db.session.add(shipment)
+        db.session.flush()
+        # Read before commit: the id comes from the INSERT, afterwards it would be reloaded
+        shipment_id = shipment.id
         db.session.commit()
-        return jsonify({"message": "Shipment created", "shipment_id": shipment.id}), 201
+        return jsonify({"message": "Shipment created", "shipment_id": shipment_id}), 201
+    except IntegrityError as e:
+        db.session.rollback()
+        return jsonify({"error": _create_conflict(data.get("tracking_number"), sender_id, receiver_id, registered_by_employee_id, e)}), 400
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
@@ -173,23 +373,49 @@ def update_shipment(shipment_id):
     """
     Update shipment details (CRUD - Update)
     Employees can update shipment status and received date
+    Status follows PENDING -> IN_TRANSIT -> DELIVERED/CANCELLED; with a version
+    the update fails (409) if the shipment changed since that version was read
     """
     claims = get_jwt()
     if claims.get("role") != "EMPLOYEE":
         return jsonify({"error": "Unauthorized"}), 403
     
+    data = request.get_json() or {}
+    try:
+        version = _parse_version(data.get("version"))
+        received_date = parse_datetime(data.get("received_date")) if data.get("received_date") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    status = data.get("status")
+    if status and not set(data) - {"status", "received_date", "version"}:
+        # Status change only: one conditional UPDATE, no SELECT first
+        try:
+            versions = transition({shipment_id: version}, status, received_date)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        except StatusConflict as e:
+            conflict = e.conflicts[0] if e.conflicts else {"id": shipment_id, "error": str(e)}
+            return jsonify(conflict), 404 if conflict["error"] == NOT_FOUND else 409
+        return jsonify({"message": "Shipment updated", "version": versions[shipment_id]}), 200
+
     shipment = Shipment.query.get(shipment_id)
     if not shipment:
         return jsonify({"error": "Shipment not found"}), 404
-    
-    data = request.get_json() or {}
+    if version is not None and version != shipment.version:
+        return jsonify({"error": "Shipment was modified by another request", "version": shipment.version}), 409
     
     # Update delivery status
-    if data.get("status"):
-        shipment.status = data.get("status")
-    # Mark shipment as received with date
-    if data.get("received_date") and data.get("status") == "DELIVERED":
-        shipment.received_date = datetime.fromisoformat(data.get("received_date"))
+    if status and status != shipment.status:
+        if status not in STATUSES:
+            return jsonify({"error": f"status must be one of {', '.join(STATUSES)}"}), 400
+        if not can_transition(shipment.status, status):
+            return jsonify({"error": f"Cannot change status from {shipment.status} to {status}"}), 409
+        shipment.previous_status = shipment.status
+        shipment.status = status
+        if status == "DELIVERED":
+            # Mark shipment as received with date
+            shipment.received_date = received_date or datetime.utcnow()
 
     if "weight" in data:
         try:
@@ -201,12 +427,63 @@ def update_shipment(shipment_id):
     shipment.description = data.get("description", shipment.description)
     
     try:
+        # The UPDATE is conditional on the version loaded above (version_id_col)
+        db.session.flush()
+        version = shipment.version
         db.session.commit()
-        return jsonify({"message": "Shipment updated"}), 200
+        return jsonify({"message": "Shipment updated", "version": version}), 200
+    except StaleDataError:
+        db.session.rollback()
+        return jsonify({"error": "Shipment was modified by another request"}), 409
     except Exception as e:
         db.session.rollback()
         return jsonify({"error": str(e)}), 400
 
+@shipment_bp.post("/status")
+@jwt_required()
+@idempotent
+def change_shipment_status():
+    """
+    Change the status of many shipments in one statement
+    shipments: ids, or {"id", "version"} objects to fail on concurrent changes
+    All of them change or none do; 409 lists the shipments that did not match
+    """
+    claims = get_jwt()
+    if claims.get("role") != "EMPLOYEE":
+        return jsonify({"error": "Unauthorized"}), 403
+
+    data = request.get_json() or {}
+    items = data.get("shipments")
+    if not isinstance(items, list) or not items:
+        return jsonify({"error": "shipments must be a non-empty list"}), 400
+    limit = current_app.config.get("SHIPMENT_STATUS_BATCH_LIMIT", 1000)
+    if len(items) > limit:
+        return jsonify({"error": f"At most {limit} shipments per request"}), 400
+
+    shipments = {}
+    try:
+        for item in items:
+            item = item if isinstance(item, dict) else {"id": item}
+            try:
+                shipment_id = int(item.get("id"))
+            except (TypeError, ValueError):
+                raise ValueError("shipments must be ids or objects with id and version")
+            shipments[shipment_id] = _parse_version(item.get("version"))
+        received_date = parse_datetime(data.get("received_date")) if data.get("received_date") else None
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    try:
+        versions = transition(shipments, data.get("status"), received_date)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except StatusConflict as e:
+        return jsonify({"error": "No shipments were updated", "conflicts": e.conflicts}), 409
+    return jsonify({
+        "message": f"{len(versions)} shipments updated",
+        "versions": {str(shipment_id): version for shipment_id, version in versions.items()},
+    }), 200
+
 @shipment_bp.delete("/<int:shipment_id>")
 @jwt_required()
 def delete_shipment(shipment_id):
@@ -243,8 +520,13 @@ def report_all_shipments():
     if claims.get("role") != "EMPLOYEE":
         return jsonify({"error": "Unauthorized"}), 403
     
-    shipments = Shipment.query.all()
-    return jsonify([s.to_dict() for s in shipments]), 200
+    try:
+        start_date = parse_date_arg("start_date")
+        end_date = parse_date_arg("end_date")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    return jsonify(_report_rows(lambda model: [], start_date, end_date)), 200
 
 @shipment_bp.get("/reports/by-employee/<int:employee_id>")
 @jwt_required()
@@ -257,8 +539,14 @@ def report_shipments_by_employee(employee_id):
     if claims.get("role") != "EMPLOYEE":
         return jsonify({"error": "Unauthorized"}), 403
     
-    shipments = Shipment.query.filter_by(registered_by_employee_id=employee_id).all()
-    return jsonify([s.to_dict() for s in shipments]), 200
+    try:
+        start_date = parse_date_arg("start_date")
+        end_date = parse_date_arg("end_date")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    rows = _report_rows(lambda model: [model.registered_by_employee_id == employee_id], start_date, end_date)
+    return jsonify(rows), 200
 
 @shipment_bp.get("/reports/undelivered")
 @jwt_required()
@@ -272,12 +560,10 @@ def report_undelivered_shipments():
         return jsonify({"error": "Unauthorized"}), 403
     
     # Sent but not received (exclude cancelled)
-    shipments = Shipment.query.filter(
-        Shipment.sent_date.isnot(None),
-        Shipment.received_date.is_(None),
-        Shipment.status != "CANCELLED",
-    ).all()
-    return jsonify([s.to_dict() for s in shipments]), 200
+    rows = _report_rows(lambda model: [
+        model.sent_date.isnot(None), model.received_date.is_(None), model.status != "CANCELLED"
+    ], hot_only=True)
+    return jsonify(rows), 200
 
 @shipment_bp.get("/reports/by-sender/<int:client_id>")
 @jwt_required()
@@ -286,20 +572,19 @@ def report_shipments_by_sender(client_id):
     Report all shipments sent by specific client
     Employees can view all, clients can only view their own
     """
-    claims = get_jwt()
-    user_id = claims.get("sub")
-    role = claims.get("role")
-    
-    client = Client.query.get(client_id)
-    if not client:
-        return jsonify({"error": "Client not found"}), 404
-    
-    if role != "EMPLOYEE" and client.user_id != user_id:
-        return jsonify({"error": "Unauthorized"}), 403
+    databases, error = _client_report_databases(get_jwt(), client_id)
+    if error:
+        return error
     
+    try:
+        start_date = parse_date_arg("start_date")
+        end_date = parse_date_arg("end_date")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Filter by sender (client who sent the shipment)
-    shipments = Shipment.query.filter_by(sender_id=client_id).all()
-    return jsonify([s.to_dict() for s in shipments]), 200
+    rows = _report_rows(lambda model: [model.sender_id == client_id], start_date, end_date, databases)
+    return jsonify(rows), 200
 
 @shipment_bp.get("/reports/by-receiver/<int:client_id>")
 @jwt_required()
@@ -308,20 +593,19 @@ def report_shipments_by_receiver(client_id):
     Report all shipments received by specific client
     Employees can view all, clients can only view their own
     """
-    claims = get_jwt()
-    user_id = claims.get("sub")
-    role = claims.get("role")
-    
-    client = Client.query.get(client_id)
-    if not client:
-        return jsonify({"error": "Client not found"}), 404
-    
-    if role != "EMPLOYEE" and client.user_id != user_id:
-        return jsonify({"error": "Unauthorized"}), 403
+    databases, error = _client_report_databases(get_jwt(), client_id)
+    if error:
+        return error
     
+    try:
+        start_date = parse_date_arg("start_date")
+        end_date = parse_date_arg("end_date")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     # Filter by receiver (client who received the shipment)
-    shipments = Shipment.query.filter_by(receiver_id=client_id).all()
-    return jsonify([s.to_dict() for s in shipments]), 200
+    rows = _report_rows(lambda model: [model.receiver_id == client_id], start_date, end_date, databases)
+    return jsonify(rows), 200
 
 @shipment_bp.get("/reports/revenue")
 @jwt_required()
@@ -336,27 +620,21 @@ def report_company_revenue():
         return jsonify({"error": "Unauthorized"}), 403
     
     # Filter by date range
-    start_date = request.args.get("start_date")
-    end_date = request.args.get("end_date")
-    
-    # Revenue is based on completed (DELIVERED) shipments.
-    query = Shipment.query.filter(Shipment.status == "DELIVERED")
-    if start_date:
-        query = query.filter(Shipment.sent_date >= datetime.fromisoformat(start_date))
-    if end_date:
-        query = query.filter(Shipment.sent_date <= datetime.fromisoformat(end_date))
+    try:
+        start_date = parse_date_arg("start_date")
+        end_date = parse_date_arg("end_date")
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
 
-    shipment_count = query.count()
-    total_revenue = db.session.query(func.coalesce(func.sum(Shipment.price), 0)).filter(
-        Shipment.status == "DELIVERED",
-        *( [Shipment.sent_date >= datetime.fromisoformat(start_date)] if start_date else [] ),
-        *( [Shipment.sent_date <= datetime.fromisoformat(end_date)] if end_date else [] ),
-    ).scalar()
+    # Every company's shipments: with shards, summed over all of them in parallel
+    totals = shards.fan_out(_revenue_totals, start_date, end_date)
+    shipment_count = sum(count for count, _ in totals)
+    total_revenue = sum((revenue for _, revenue in totals), Decimal("0"))
 
     return jsonify({
         "period": {
-            "start_date": start_date,
-            "end_date": end_date
+            "start_date": request.args.get("start_date"),
+            "end_date": request.args.get("end_date")
         },
         "total_revenue": str(total_revenue),
         "shipment_count": shipment_count
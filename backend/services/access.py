@@ -0,0 +1,45 @@
+from sqlalchemy import select, or_
+
+from models.client import Client
+from models.shipment import Shipment
+
+# Authorization rules shared by the Flask routes and the async (ASGI) read routes
+# Employees see all shipments, clients only those they sent or received
+
+
+def identity_from_claims(claims):
+    """(role, user_id) from JWT claims; user_id is None when it is not a number"""
+    try:
+        user_id = int(claims.get("sub")) if claims.get("sub") else None
+    except (TypeError, ValueError):
+        user_id = None
+    return claims.get("role"), user_id
+
+
+def client_id_for_user(user_id):
+    """Statement selecting the client profile id of a user"""
+    return select(Client.id).where(Client.user_id == user_id)
+
+
+def visible_shipments(role, client_id):
+    """Statement selecting the shipments this identity may list"""
+    stmt = select(Shipment)
+    if role != "EMPLOYEE":
+        stmt = stmt.where(or_(Shipment.sender_id == client_id, Shipment.receiver_id == client_id))
+    return stmt
+
+
+def can_view_shipment(role, client_id, shipment):
+    if role == "EMPLOYEE":
+        return True
+    return client_id is not None and client_id in (shipment.sender_id, shipment.receiver_id)
+
+
+def tracking_view(shipment):
+    """Public tracking projection (no client or address details)"""
+    return {
+        "tracking_number": shipment.tracking_number,
+        "status": shipment.status,
+        "sent_date": shipment.sent_date.isoformat() if shipment.sent_date else None,
+        "received_date": shipment.received_date.isoformat() if shipment.received_date else None,
+    }
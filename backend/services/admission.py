@@ -0,0 +1,272 @@
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+import time
+from collections import OrderedDict
+
+from flask import g, jsonify, request
+from flask_jwt_extended import get_jwt_identity, verify_jwt_in_request
+
+try:
+    import fcntl
+except ImportError:  # Windows: no shared store, buckets stay per process
+    fcntl = None
+
+# Admission control: per-identity rate limits and load shedding
+# Every API request is classed as auth, report, write or read. Each identity
+# (JWT subject, else client address) has a token bucket per class; an empty
+# bucket answers 429 with Retry-After. Before that, a worker that is saturated
+# sheds the request with 503 + Retry-After: it waited too long in the proxy
+# queue, its class already has too many requests in flight here, or the DB pool
+# is checked out past the class's share. Reports give way first, writes last.
+# Buckets live in process memory, or with RATE_LIMIT_STORE in a file mapped by
+# every worker on the host, so a limit holds across gunicorn workers.
+# Behind PROXY_FIX_HOPS proxies the client address is read from
+# X-Forwarded-For (ProxyFix in app.py), so clients do not share the proxy's
+# bucket. The async routes of ASGI mode run the same check as middleware.
+
+CLASSES = ("auth", "report", "write", "read")
+# Blueprints whose endpoints are all expensive
+REPORT_BLUEPRINTS = {"analytics", "report", "planning"}
+REPORT_ENDPOINTS = {"quote.quote_batch"}
+# Never limited, so load balancers can still tell the worker is alive
+EXEMPT_ENDPOINTS = {"health", "static", "assets"}
+MAX_MEMORY_KEYS = 100000
+SHED = ({"error": "Server is busy, please try again"}, 503, {"Retry-After": "1"})
+
+
+def parse_classes(value, parse):
+    """{class: parse(setting)} from "read=20/100,report=0.5/10" """
+    settings = {}
+    for part in (value or "").split(","):
+        if not part.strip():
+            continue
+        name, _, setting = part.partition("=")
+        name = name.strip()
+        if name not in CLASSES:
+            raise ValueError(f"Unknown endpoint class {name!r} (expected one of {', '.join(CLASSES)})")
+        settings[name] = parse(setting.strip())
+    return settings
+
+
+def _parse_rate(setting):
+    rate, _, burst = setting.partition("/")
+    rate = float(rate)
+    if rate <= 0:
+        raise ValueError("Rates must be positive requests per second")
+    return rate, float(burst) if burst else max(rate, 1.0)
+
+
+def endpoint_class(endpoint, blueprint, method):
+    if blueprint == "auth":
+        return "auth"
+    if blueprint in REPORT_BLUEPRINTS or endpoint in REPORT_ENDPOINTS or ".report_" in (endpoint or ""):
+        return "report"
+    if method not in ("GET", "HEAD"):
+        return "write"
+    return "read"
+
+
+def _refill(tokens, updated, now, rate, burst):
+    return min(burst, tokens + max(now - updated, 0) * rate)
+
+
+class MemoryBuckets:
+    """Token buckets in this process (least recently used keys dropped past MAX_MEMORY_KEYS)"""
+
+    def __init__(self, max_keys=MAX_MEMORY_KEYS):
+        self.max_keys = max_keys
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, rate, burst, now):
+        """Take one token; returns seconds until one is available (0 when taken)"""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (burst, now))
+            tokens = _refill(tokens, updated, now, rate, burst)
+            wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+            self._buckets[key] = (tokens - 1 if wait == 0 else tokens, now)
+            if len(self._buckets) > self.max_keys:
+                # A dropped bucket comes back full, as an idle one would be
+                self._buckets.popitem(last=False)
+            return wait
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+
+
+class FileBuckets:
+    """
+    Token buckets in a memory-mapped file shared by the processes on this host
+    Fixed slots of (key hash, tokens, updated) addressed by key hash, each
+    guarded by a byte-range lock; a key that lands on a slot held by another
+    key starts over with a full bucket.
+    """
+
+    SLOT = struct.Struct("<Qdd")
+
+    def __init__(self, path, slots=65536):
+        self.path = path
+        self.slots = slots
+        self._lock = threading.Lock()
+        self._open()
+
+    def _open(self):
+        size = self.SLOT.size * self.slots
+        self._fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        if os.fstat(self._fd).st_size < size:
+            os.ftruncate(self._fd, size)
+        self._map = mmap.mmap(self._fd, size, mmap.MAP_SHARED, mmap.PROT_READ | mmap.PROT_WRITE)
+
+    def take(self, key, rate, burst, now):
+        digest = int.from_bytes(hashlib.blake2b(key.encode("utf-8"), digest_size=8).digest(), "little") or 1
+        offset = digest % self.slots * self.SLOT.size
+        # fcntl locks belong to the process, so threads also need the in-process lock
+        with self._lock:
+            fcntl.lockf(self._fd, fcntl.LOCK_EX, self.SLOT.size, offset)
+            try:
+                owner, tokens, updated = self.SLOT.unpack_from(self._map, offset)
+                if owner != digest:
+                    tokens, updated = burst, now
+                tokens = _refill(tokens, updated, now, rate, burst)
+                wait = 0.0 if tokens >= 1 else (1 - tokens) / rate
+                self.SLOT.pack_into(self._map, offset, digest, tokens - 1 if wait == 0 else tokens, now)
+            finally:
+                fcntl.lockf(self._fd, fcntl.LOCK_UN, self.SLOT.size, offset)
+        return wait
+
+    def after_fork(self):
+        # The mapping is shared with the master; locks are per process anyway
+        self._lock = threading.Lock()
+
+
+class AdmissionControl:
+    """Rate limits per identity and endpoint class, load shedding per worker"""
+
+    def __init__(self, app=None):
+        self.enabled = True
+        self.rates = {}
+        self.concurrency = {}
+        self.pool_ratios = {}
+        self.max_queue_ms = 0.0
+        self.proxy_hops = 0
+        self.buckets = MemoryBuckets()
+        self._in_flight = dict.fromkeys(CLASSES, 0)
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("ADMISSION_ENABLED", True))
+        self.rates = parse_classes(app.config.get("RATE_LIMITS"), _parse_rate)
+        self.concurrency = parse_classes(app.config.get("ADMISSION_CONCURRENCY"), int)
+        self.pool_ratios = parse_classes(app.config.get("ADMISSION_POOL_RATIOS"), float)
+        self.max_queue_ms = float(app.config.get("ADMISSION_MAX_QUEUE_MS", 0))
+        self.proxy_hops = int(app.config.get("PROXY_FIX_HOPS", 0))
+        store = app.config.get("RATE_LIMIT_STORE")
+        self.buckets = FileBuckets(store) if store and fcntl is not None else MemoryBuckets()
+        app.extensions["admission"] = self
+        app.before_request(self._admit)
+        app.teardown_request(self._release)
+
+    def after_fork(self):
+        self._lock = threading.Lock()
+        self._in_flight = dict.fromkeys(CLASSES, 0)
+        self.buckets.after_fork()
+
+    def in_flight(self):
+        with self._lock:
+            return dict(self._in_flight)
+
+    def _admit(self):
+        if not self.enabled or request.method == "OPTIONS" or not request.path.startswith("/api/"):
+            return None
+        if request.endpoint is None or request.endpoint in EXEMPT_ENDPOINTS:
+            return None
+        from extensions import db
+
+        kind = endpoint_class(request.endpoint, request.blueprint, request.method)
+        error = self.admit(kind, _identity(), request.headers.get("X-Request-Start"), db.engine.pool)
+        if error is not None:
+            body, status, headers = error
+            return jsonify(body), status, headers
+        g.admission_class = kind
+        return None
+
+    def admit(self, kind, identity, request_start, pool):
+        """
+        None when the request may run (call release(kind) once it is done),
+        else (body, status, headers) of the 503 or 429 answer
+        Shared by the Flask app and the async routes (async_routes/admission.py).
+        """
+        if self._queued_too_long(request_start) or self._pool_saturated(kind, pool):
+            return SHED
+        with self._lock:
+            limit = self.concurrency.get(kind, 0)
+            if limit and self._in_flight[kind] >= limit:
+                return SHED
+            self._in_flight[kind] += 1
+
+        if kind in self.rates:
+            rate, burst = self.rates[kind]
+            wait = self.buckets.take(f"{kind}|{identity}", rate, burst, time.monotonic())
+            if wait > 0:
+                self.release(kind)
+                return {"error": "Too many requests"}, 429, {"Retry-After": str(math.ceil(wait))}
+        return None
+
+    def release(self, kind):
+        with self._lock:
+            self._in_flight[kind] -= 1
+
+    def _release(self, error=None):
+        kind = g.pop("admission_class", None)
+        if kind is not None:
+            self.release(kind)
+
+    def _queued_too_long(self, header):
+        # Set by the proxy as "t=<time since the epoch>" in seconds (nginx ${msec}), ms or µs
+        if not self.max_queue_ms or not header:
+            return False
+        try:
+            started = float(header.strip().removeprefix("t="))
+        except ValueError:
+            return False
+        if started > 1e14:
+            started /= 1e6
+        elif started > 1e11:
+            started /= 1e3
+        return (time.time() - started) * 1000 > self.max_queue_ms
+
+    def _pool_saturated(self, kind, pool):
+        ratio = self.pool_ratios.get(kind)
+        if ratio is None or not hasattr(pool, "checkedout"):
+            # Only QueuePool has a bounded number of checkouts
+            return False
+        capacity = pool.size() + max(getattr(pool, "_max_overflow", 0), 0)
+        return pool.checkedout() >= ratio * capacity
+
+
+def client_address(remote_addr, forwarded_for, hops):
+    """Client address as ProxyFix(x_for=hops) sees it: hops proxies back in X-Forwarded-For"""
+    values = [value.strip() for value in (forwarded_for or "").split(",") if value.strip()]
+    if hops and len(values) >= hops:
+        return values[-hops]
+    return remote_addr
+
+
+def _identity():
+    try:
+        verify_jwt_in_request(optional=True)
+        identity = get_jwt_identity()
+    except Exception:
+        # Invalid or expired tokens are rejected by the view; count them by address
+        identity = None
+    # remote_addr is the client's once ProxyFix (PROXY_FIX_HOPS) has read X-Forwarded-For
+    return f"user:{identity}" if identity is not None else f"ip:{request.remote_addr}"
+
+
+admission = AdmissionControl()
@@ -0,0 +1,199 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, insert, literal, select, text
+
+from extensions import db
+from services.sharding import shards
+
+# Hot/cold archival of finished shipments
+# DELIVERED and CANCELLED shipments older than the retention window are moved
+# from "shipments" to "shipments_archive" in small batches with a pause in
+# between, so operational queries never wait on long locks. On MySQL the
+# archive is RANGE-partitioned by year of sent_date.
+
+ARCHIVABLE_STATUSES = ("DELIVERED", "CANCELLED")
+
+logger = logging.getLogger(__name__)
+
+
+def _partition_clause(years):
+    parts = [f"PARTITION p{year} VALUES LESS THAN ({year + 1})" for year in years]
+    parts.append("PARTITION pmax VALUES LESS THAN MAXVALUE")
+    return ", ".join(parts)
+
+
+def _partition_years(first_year):
+    return range(first_year, datetime.utcnow().year + 2)
+
+
+def _partition_archive(target, connection, **kw):
+    if connection.dialect.name != "mysql":
+        return
+    first_year = int(current_app.config.get("ARCHIVE_FIRST_YEAR", 2015))
+    connection.execute(text(
+        f"ALTER TABLE {target.name} PARTITION BY RANGE (YEAR(sent_date)) "
+        f"({_partition_clause(_partition_years(first_year))})"
+    ))
+
+
+def ensure_partitions(first_year):
+    """Split the MAXVALUE partition so every year up to next year has its own partition"""
+    connection = db.session.connection()
+    if connection.dialect.name != "mysql":
+        return
+    existing = {
+        row[0] for row in connection.execute(text(
+            "SELECT PARTITION_NAME FROM information_schema.PARTITIONS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'shipments_archive'"
+        ))
+    }
+    missing = [year for year in _partition_years(first_year) if f"p{year}" not in existing]
+    if not missing or "pmax" not in existing:
+        return
+    newest = max(int(name[1:]) for name in existing if name and name[1:].isdigit())
+    missing = [year for year in missing if year > newest]
+    if missing:
+        connection.execute(text(
+            f"ALTER TABLE shipments_archive REORGANIZE PARTITION pmax INTO ({_partition_clause(missing)})"
+        ))
+
+
+def archive_batch(cutoff, batch_size):
+    """Move one batch of finished shipments sent before cutoff; returns the number moved"""
+    from models.shipment import Shipment, ShipmentArchive
+    from services.shipment_search import remove_from_search_index
+
+    ids = db.session.execute(
+        select(Shipment.id)
+        .where(Shipment.status.in_(ARCHIVABLE_STATUSES), Shipment.sent_date < cutoff)
+        .order_by(Shipment.id)
+        .limit(batch_size)
+        .with_for_update(skip_locked=True)
+    ).scalars().all()
+    if not ids:
+        db.session.rollback()
+        return 0
+
+    hot = Shipment.__table__
+    columns = [column.name for column in ShipmentArchive.__table__.columns if column.name != "archived_at"]
+    db.session.execute(
+        insert(ShipmentArchive.__table__).from_select(
+            columns + ["archived_at"],
+            select(*(hot.c[name] for name in columns), literal(datetime.utcnow())).where(hot.c.id.in_(ids)),
+        )
+    )
+    remove_from_search_index(ids)
+    db.session.execute(delete(hot).where(hot.c.id.in_(ids)))
+    db.session.commit()
+    return len(ids)
+
+
+def archive_shipments(retention_days, batch_size=500, pause=0.5, max_batches=None):
+    """Archive everything past the retention window, batch by batch; returns the total moved"""
+    cutoff = datetime.utcnow() - timedelta(days=retention_days)
+    total = batches = 0
+    while max_batches is None or batches < max_batches:
+        moved = archive_batch(cutoff, batch_size)
+        total += moved
+        batches += 1
+        if moved < batch_size:
+            break
+        # Throttle so replicas and concurrent writers keep up
+        time.sleep(pause)
+    return total
+
+
+def archive_horizon():
+    """Newest sent_date present in the archive, or None when it is empty"""
+    from models.shipment import ShipmentArchive
+
+    return db.session.query(func.max(ShipmentArchive.sent_date)).scalar()
+
+
+def report_models(start_date=None):
+    """
+    Models a report must read for a sent_date range starting at start_date
+    The archive is only included when the range reaches back into it
+    """
+    from models.shipment import Shipment, ShipmentArchive
+
+    horizon = archive_horizon()
+    if horizon is None or (start_date is not None and start_date > horizon):
+        return (Shipment,)
+    return (Shipment, ShipmentArchive)
+
+
+class ShipmentArchiver:
+    """Optional background thread that archives every ARCHIVE_INTERVAL seconds"""
+
+    def __init__(self, app=None):
+        self._thread = None
+        self._stop = threading.Event()
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions["shipment_archiver"] = self
+        app.cli.add_command(archive_shipments_command)
+        if not self._listening:
+            from models.shipment import ShipmentArchive
+
+            event.listen(ShipmentArchive.__table__, "after_create", _partition_archive)
+            self._listening = True
+
+        interval = float(app.config.get("ARCHIVE_INTERVAL", 0))
+        if interval > 0 and self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run, args=(app, interval), name="shipment-archiver", daemon=True
+            )
+            self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self, app, interval):
+        while not self._stop.wait(interval):
+            # Every database in turn (just the main one without shards)
+            for shard in shards.all():
+                with app.app_context(), shards.use(shard):
+                    try:
+                        ensure_partitions(int(app.config.get("ARCHIVE_FIRST_YEAR", 2015)))
+                        moved = archive_shipments(
+                            int(app.config.get("ARCHIVE_RETENTION_DAYS", 365)),
+                            int(app.config.get("ARCHIVE_BATCH_SIZE", 500)),
+                            float(app.config.get("ARCHIVE_BATCH_PAUSE", 0.5)),
+                        )
+                        if moved:
+                            logger.info("Archived %s shipments (shard %s)", moved, shard or "main")
+                    except Exception:
+                        db.session.rollback()
+                        logger.exception("Shipment archival failed (shard %s)", shard or "main")
+                    finally:
+                        db.session.remove()
+
+
+@click.command("archive-shipments")
+@with_appcontext
+@click.option("--retention-days", type=int, default=None, help="Keep shipments sent within this many days")
+@click.option("--batch-size", type=int, default=None)
+@click.option("--pause", type=float, default=None, help="Seconds to sleep between batches")
+def archive_shipments_command(retention_days, batch_size, pause):
+    """Move old DELIVERED/CANCELLED shipments to the archive table"""
+    config = current_app.config
+    ensure_partitions(int(config.get("ARCHIVE_FIRST_YEAR", 2015)))
+    moved = archive_shipments(
+        retention_days if retention_days is not None else int(config.get("ARCHIVE_RETENTION_DAYS", 365)),
+        batch_size or int(config.get("ARCHIVE_BATCH_SIZE", 500)),
+        pause if pause is not None else float(config.get("ARCHIVE_BATCH_PAUSE", 0.5)),
+    )
+    click.echo(f"Archived {moved} shipments")
+
+
+shipment_archiver = ShipmentArchiver()
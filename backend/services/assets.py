@@ -0,0 +1,193 @@
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import threading
+
+import click
+from flask import abort, current_app, render_template, request, send_from_directory
+from flask.cli import with_appcontext
+
+try:
+    import brotli
+except ImportError:  # .br siblings are skipped; browsers get gzip
+    brotli = None
+
+# Static assets and pages
+# "flask build-assets" copies every file under static/css and static/js to
+# ASSETS_DIR with a hash of its content in the name (css/login.3f2a9c1b0d4e.css),
+# writes .br and .gz siblings next to it and a manifest.json of source path ->
+# fingerprinted path. Templates link assets through asset(), which resolves
+# the manifest (plain /static URLs without a build, or in debug). A
+# fingerprinted file never changes, so /assets/ serves it as immutable for a
+# year, using the precompressed sibling the browser accepts. Older builds are
+# left in place for pages still cached with their names.
+# Pages are rendered once per process (warm-up renders them before traffic)
+# and kept compressed in memory with an ETag. Browsers reuse a page for
+# PAGE_MAX_AGE seconds and after that show it at once while revalidating in
+# the background, so a repeat visit waits on no round trip. The manifest is
+# read at startup: build, then restart the workers.
+
+SOURCE_DIRS = ("css", "js")
+MANIFEST = "manifest.json"
+# (Content-Encoding, file suffix), preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def _compress(data):
+    """{encoding: bytes} of the encodings that make data smaller"""
+    encoded = {"gzip": gzip.compress(data, 9, mtime=0)}
+    if brotli is not None:
+        encoded["br"] = brotli.compress(data, quality=11)
+    return {encoding: body for encoding, body in encoded.items() if len(body) < len(data)}
+
+
+def _write(path, data):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_dir, out_dir):
+    """Fingerprint and precompress the static assets; returns the manifest"""
+    manifest = {}
+    for source_dir in SOURCE_DIRS:
+        for root, _, files in os.walk(os.path.join(static_dir, source_dir)):
+            for filename in sorted(files):
+                path = os.path.join(root, filename)
+                source = os.path.relpath(path, static_dir).replace(os.sep, "/")
+                with open(path, "rb") as f:
+                    data = f.read()
+                stem, ext = os.path.splitext(source)
+                name = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+                target = os.path.join(out_dir, *name.split("/"))
+                if not os.path.exists(target):
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    for encoding, body in _compress(data).items():
+                        _write(target + dict(ENCODINGS)[encoding], body)
+                    # The plain file last: once it exists the build of this name is complete
+                    _write(target, data)
+                manifest[source] = name
+    os.makedirs(out_dir, exist_ok=True)
+    _write(os.path.join(out_dir, MANIFEST), json.dumps(manifest, indent=2, sort_keys=True).encode("utf-8"))
+    return manifest
+
+
+def _accepted(encodings):
+    """Encodings from ENCODINGS the request accepts, preferred first"""
+    return [(encoding, suffix) for encoding, suffix in ENCODINGS
+            if encoding in encodings and request.accept_encodings[encoding] > 0]
+
+
+class AssetPipeline:
+    """Fingerprinted static assets and pages cached in memory"""
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.asset_max_age = 31536000
+        self.page_max_age = 300
+        self.page_stale = 86400
+        self.manifest = {}
+        self._encodings = {}  # fingerprinted name -> encodings with a sibling on disk
+        self._pages = {}  # template -> (digest, {encoding or None: body})
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.directory = app.config.get("ASSETS_DIR") or os.path.join(app.static_folder, "dist")
+        self.asset_max_age = int(app.config.get("ASSET_MAX_AGE", 31536000))
+        self.page_max_age = int(app.config.get("PAGE_MAX_AGE", 300))
+        self.page_stale = int(app.config.get("PAGE_STALE_WHILE_REVALIDATE", 86400))
+        self.load()
+        app.add_template_global(self.url, "asset")
+        app.add_url_rule("/assets/<path:filename>", "assets", self.serve)
+        app.extensions["assets"] = self
+        app.cli.add_command(build_assets_command)
+
+    def load(self):
+        """Read the manifest of the last build (none: templates link /static)"""
+        try:
+            with open(os.path.join(self.directory, MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            manifest = {}
+        encodings = {
+            name: {encoding for encoding, suffix in ENCODINGS
+                   if os.path.exists(os.path.join(self.directory, *name.split("/")) + suffix)}
+            for name in manifest.values()
+        }
+        with self._lock:
+            self.manifest, self._encodings, self._pages = manifest, encodings, {}
+
+    def url(self, path):
+        """URL of a static asset, e.g. asset("css/login.css")"""
+        name = self.manifest.get(path)
+        if name is None or current_app.debug:
+            return f"/static/{path}"
+        return f"/assets/{name}"
+
+    def serve(self, filename):
+        encodings = self._encodings.get(filename)
+        if encodings is None:
+            # Only names from the manifest: they are the ones that never change
+            abort(404)
+        accepted = _accepted(encodings)
+        encoding, suffix = accepted[0] if accepted else (None, "")
+        response = send_from_directory(
+            self.directory, filename + suffix,
+            mimetype=mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            max_age=self.asset_max_age,
+        )
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        response.vary.add("Accept-Encoding")
+        response.cache_control.immutable = True
+        return response
+
+    def _render(self, template):
+        body = render_template(template).encode("utf-8")
+        bodies = {None: body}
+        bodies.update(_compress(body))
+        return hashlib.sha256(body).hexdigest()[:16], bodies
+
+    def page(self, template):
+        """Response for a template without context, rendered once per process"""
+        if current_app.debug:
+            return render_template(template)
+        cached = self._pages.get(template)
+        if cached is None:
+            cached = self._render(template)
+            with self._lock:
+                self._pages[template] = cached
+        digest, bodies = cached
+        accepted = _accepted(bodies)
+        encoding = accepted[0][0] if accepted else None
+
+        response = current_app.response_class(bodies[encoding], mimetype="text/html")
+        if encoding:
+            response.headers["Content-Encoding"] = encoding
+        # One ETag per representation, as the bytes differ
+        response.set_etag(f"{digest}-{encoding}" if encoding else digest)
+        response.vary.add("Accept-Encoding")
+        response.cache_control.public = True
+        response.cache_control.max_age = self.page_max_age
+        if self.page_stale:
+            response.cache_control.stale_while_revalidate = self.page_stale
+        return response.make_conditional(request)
+
+
+@click.command("build-assets")
+@with_appcontext
+def build_assets_command():
+    """Fingerprint and precompress static/css and static/js into ASSETS_DIR"""
+    pipeline = current_app.extensions["assets"]
+    manifest = build_assets(current_app.static_folder, pipeline.directory)
+    click.echo(f"Built {len(manifest)} assets in {pipeline.directory}")
+    for source, name in sorted(manifest.items()):
+        click.echo(f"  {source} -> {name}")
+
+
+assets = AssetPipeline()
@@ -0,0 +1,34 @@
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+# Async database access for the ASGI serving mode
+# Same database and models as the Flask app, through an async driver:
+# aiomysql for MySQL, aiosqlite for local SQLite.
+
+ASYNC_DRIVERS = {
+    "mysql": "mysql+aiomysql",
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def async_database_uri(uri):
+    """Rewrite a sync SQLAlchemy URI (mysql+pymysql://...) to its async driver"""
+    url = make_url(uri)
+    backend = url.get_backend_name()
+    if backend not in ASYNC_DRIVERS:
+        raise ValueError(f"No async driver configured for {backend}")
+    return url.set(drivername=ASYNC_DRIVERS[backend])
+
+
+def create_async_session_factory(config):
+    """Async engine + session factory from the Flask config"""
+    uri = config.get("ASYNC_DATABASE_URI") or async_database_uri(config["SQLALCHEMY_DATABASE_URI"])
+    # pool_recycle instead of pool_pre_ping: no extra round trip per checkout
+    options = {
+        "pool_size": int(config.get("ASYNC_DB_POOL_SIZE", 20)),
+        "max_overflow": int(config.get("ASYNC_DB_MAX_OVERFLOW", 20)),
+        "pool_recycle": 3600,
+    }
+    engine = create_async_engine(uri, **options)
+    return engine, async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
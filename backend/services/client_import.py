@@ -0,0 +1,241 @@
+import csv
+import itertools
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import insert, select
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db, client_search_index
+from services.geocoding import gazetteer, lookup
+from services.passwords import hash_password
+
+# Bulk client import from CSV
+# Rows are read from the stream a batch at a time; per batch, duplicate emails
+# are found with one set lookup against the file so far and one IN query
+# against users, passwords are hashed in a process pool, and users and clients
+# go in as two multi-row INSERTs committed together. Bad rows are reported by
+# line and skipped; the rest of the batch is imported. Coordinates and the
+# client search index are handled here, since bulk INSERTs skip the ORM events.
+
+# Header (lowercase) -> field; the Bulgarian labels follow CLIENTS_DATA.txt
+COLUMNS = {
+    "email": "email", "имейл": "email",
+    "password": "password", "парола": "password", "паролa": "password",
+    "name": "name", "име": "name",
+    "first_name": "first_name", "last_name": "last_name",
+    "company_name": "company_name", "company": "company_name", "компания": "company_name",
+    "phone": "phone", "телефон": "phone",
+    "address": "address", "адрес": "address",
+    "city": "city", "град": "city",
+    "country": "country", "страна": "country",
+}
+# Column sizes of users/clients
+MAX_LENGTHS = {
+    "email": 120, "first_name": 100, "last_name": 100, "company_name": 150,
+    "phone": 20, "address": 255, "city": 100, "country": 100,
+}
+CLIENT_FIELDS = ("company_name", "first_name", "last_name", "phone", "address", "city", "country")
+
+
+def _fields(raw):
+    row = {}
+    for header, value in raw.items():
+        # Extra cells land under the None header as a list
+        field = COLUMNS.get((header or "").strip().lower())
+        if field and isinstance(value, str):
+            row[field] = value.strip()
+    return row
+
+
+def _client_row(raw):
+    """Normalized fields of one CSV row; raises ValueError with the reason"""
+    row = _fields(raw)
+    if row.get("name") and not row.get("first_name"):
+        row["first_name"], _, row["last_name"] = row["name"].partition(" ")
+        row["last_name"] = row["last_name"].strip()
+    if not row.get("email") or "@" not in row["email"]:
+        raise ValueError("A valid email is required")
+    if not row.get("password"):
+        raise ValueError("Password is required")
+    if not row.get("first_name"):
+        raise ValueError("Name is required")
+    for field, limit in MAX_LENGTHS.items():
+        if len(row.get(field) or "") > limit:
+            raise ValueError(f"{field} is longer than {limit} characters")
+    return row
+
+
+def _coordinates(rows):
+    """(latitude, longitude) per row: exact geocoded address, else the city"""
+    found = lookup({row["address"] for row in rows if row.get("address")})
+    return [found.get(row.get("address")) or gazetteer.find(row.get("city"), row.get("address")) or (None, None) for row in rows]
+
+
+class ClientImport:
+    """One import run: feed it CSV rows, read the counts and errors afterwards"""
+
+    def __init__(self, workers=0, batch_size=1000, max_rows=None):
+        self.workers = workers
+        self.batch_size = batch_size
+        self.max_rows = max_rows
+        self.imported = 0
+        self.errors = []
+        self.truncated = False
+        self._seen = set()
+        self._executor = None
+
+    def run(self, reader):
+        """Import csv.DictReader rows; returns self"""
+        if self.workers > 0:
+            self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        try:
+            rows = enumerate(reader, start=2)
+            if self.max_rows is not None:
+                rows = itertools.islice(rows, self.max_rows + 1)
+            batch = []
+            try:
+                for line, raw in rows:
+                    if self.max_rows is not None and line - 1 > self.max_rows:
+                        self.truncated = True
+                        self._error(line, _fields(raw).get("email"), f"At most {self.max_rows} rows per import; the rest was not read")
+                        break
+                    batch.append((line, raw))
+                    if len(batch) >= self.batch_size:
+                        self._import_batch(batch)
+                        batch = []
+            except csv.Error as e:
+                # The rest of the file cannot be parsed; keep what was read
+                self.truncated = True
+                self._error(reader.line_num, None, f"Malformed CSV: {e}")
+            if batch:
+                self._import_batch(batch)
+        finally:
+            if self._executor is not None:
+                self._executor.shutdown()
+                self._executor = None
+        if self.imported:
+            client_search_index.invalidate()
+        self.errors.sort(key=lambda error: error["line"])
+        return self
+
+    def _error(self, line, email, message):
+        self.errors.append({"line": line, "email": email, "error": message})
+
+    def _import_batch(self, batch):
+        valid = []
+        for line, raw in batch:
+            try:
+                row = _client_row(raw)
+            except ValueError as e:
+                self._error(line, _fields(raw).get("email"), str(e))
+                continue
+            if row["email"] in self._seen:
+                self._error(line, row["email"], "Duplicate email in this file")
+                continue
+            self._seen.add(row["email"])
+            valid.append((line, row))
+        if not valid:
+            return
+
+        valid = self._without_registered(valid)
+        if not valid:
+            return
+        passwords = [row["password"] for _, row in valid]
+        method = current_app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+        rounds = int(current_app.config.get("BCRYPT_ROUNDS", 12))
+        if self._executor is not None:
+            chunksize = max(len(passwords) // (self.workers * 4), 1)
+            hashes = list(self._executor.map(
+                hash_password, passwords, itertools.repeat(method), itertools.repeat(rounds), chunksize=chunksize
+            ))
+        else:
+            hashes = [hash_password(password, method, rounds) for password in passwords]
+
+        try:
+            self._insert(valid, hashes)
+        except IntegrityError:
+            # Someone registered one of the emails since the check: report it and retry the rest once
+            db.session.rollback()
+            kept = self._without_registered(valid)
+            kept_lines = {line for line, _ in kept}
+            hashes = [hashed for (line, _), hashed in zip(valid, hashes) if line in kept_lines]
+            if kept:
+                self._insert(kept, hashes)
+            valid = kept
+        self.imported += len(valid)
+
+    def _without_registered(self, valid):
+        from models.user import User
+
+        emails = [row["email"] for _, row in valid]
+        registered = set(db.session.execute(select(User.email).where(User.email.in_(emails))).scalars())
+        kept = []
+        for line, row in valid:
+            if row["email"] in registered:
+                self._error(line, row["email"], "Email is already registered")
+            else:
+                kept.append((line, row))
+        return kept
+
+    def _insert(self, valid, hashes):
+        from models.client import Client
+        from models.user import User
+
+        now = datetime.utcnow()
+        rows = [row for _, row in valid]
+        db.session.execute(insert(User.__table__), [
+            {"email": row["email"], "password_hash": hashed, "role": "CLIENT", "created_at": now}
+            for row, hashed in zip(rows, hashes)
+        ])
+        # Emails are unique, so they map the new users back without RETURNING (MySQL has none)
+        user_ids = dict(db.session.execute(
+            select(User.email, User.id).where(User.email.in_([row["email"] for row in rows]))
+        ).all())
+        db.session.execute(insert(Client.__table__), [
+            dict({field: row.get(field) or "" for field in CLIENT_FIELDS},
+                 user_id=user_ids[row["email"]], latitude=latitude, longitude=longitude,
+                 is_active=True, created_at=now, updated_at=now)
+            for row, (latitude, longitude) in zip(rows, _coordinates(rows))
+        ])
+        db.session.commit()
+
+
+def import_clients(stream, workers=0, batch_size=1000, max_rows=None):
+    """Import clients from a CSV text stream; returns the finished ClientImport"""
+    return ClientImport(workers, batch_size, max_rows).run(csv.DictReader(stream))
+
+
+@click.command("import-clients")
+@with_appcontext
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--workers", type=int, default=None, help="Password hashing processes (0 = hash inline)")
+@click.option("--batch-size", type=int, default=None)
+@click.option("--errors", "errors_path", type=click.Path(dir_okay=False), help="Write every rejected row to this CSV")
+def import_clients_command(path, workers, batch_size, errors_path):
+    """Create client users from a CSV (email, password, name or first_name/last_name, company_name, phone, address, city, country)"""
+    config = current_app.config
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        result = import_clients(
+            f,
+            workers if workers is not None else int(config.get("CLIENT_IMPORT_WORKERS", 1)),
+            batch_size or int(config.get("CLIENT_IMPORT_BATCH_SIZE", 1000)),
+        )
+    click.echo(f"Imported {result.imported} clients, rejected {len(result.errors)} rows")
+    if errors_path:
+        with open(errors_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=("line", "email", "error"))
+            writer.writeheader()
+            writer.writerows(result.errors)
+    else:
+        for error in result.errors[:50]:
+            click.echo(f"  line {error['line']}: {error['email'] or '-'}: {error['error']}")
+        if len(result.errors) > 50:
+            click.echo(f"  ... {len(result.errors) - 50} more (use --errors to write them all)")
+
+
+def init_app(app):
+    app.cli.add_command(import_clients_command)
@@ -0,0 +1,165 @@
+import heapq
+import re
+import threading
+import time
+from bisect import bisect_left, insort
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from services.sharding import current as current_shard
+
+# Client/recipient typeahead search
+# Sorted (token, client_id) list answering prefix lookups with bisect.
+# Kept up to date from Client writes committed in this process and fully
+# rebuilt every CLIENT_SEARCH_INDEX_TTL seconds to pick up other workers.
+
+SEARCH_FIELDS = ("first_name", "last_name", "company_name", "city")
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def tokenize(text):
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def client_projection(client):
+    """Compact client representation used by the recipient picker"""
+    return {
+        "id": client.id,
+        "first_name": client.first_name,
+        "last_name": client.last_name,
+        "company_name": client.company_name,
+        "city": client.city,
+    }
+
+
+class ClientSearchIndex:
+    """In-memory prefix index over client name, company and city"""
+
+    def __init__(self, app=None):
+        self.enabled = False
+        self.ttl = 300
+        self._lock = threading.Lock()
+        self._keys = []
+        self._rows = {}
+        self._owners = {}
+        self._built_at = None
+        self._listening = False
+        self.shard = None  # set per database by ShardLocal
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.enabled = bool(app.config.get("CLIENT_SEARCH_INDEX", True))
+        self.ttl = float(app.config.get("CLIENT_SEARCH_INDEX_TTL", 300))
+        self.invalidate()
+        app.extensions["client_search_index"] = self
+        if not self._listening:
+            self._listen()
+
+    def invalidate(self):
+        with self._lock:
+            self._built_at = None
+
+    def _listen(self):
+        from models.client import Client
+
+        def remember(mapper, connection, target, deleted=False):
+            session = Session.object_session(target)
+            if session is not None:
+                pending = session.info.setdefault("client_search_changes", {})
+                pending[target.id] = None if deleted else (target.user_id, client_projection(target))
+
+        event.listen(Client, "after_insert", remember)
+        event.listen(Client, "after_update", remember)
+        event.listen(Client, "after_delete", lambda m, c, t: remember(m, c, t, deleted=True))
+
+        @event.listens_for(Session, "after_commit")
+        def apply_changes(session):
+            if current_shard() != self.shard:
+                return  # committed on another database, left to its own instance
+            changes = session.info.pop("client_search_changes", None)
+            if changes:
+                self._apply(changes)
+
+        @event.listens_for(Session, "after_rollback")
+        def discard_changes(session):
+            session.info.pop("client_search_changes", None)
+
+        self._listening = True
+
+    def _add(self, client_id, user_id, row):
+        self._rows[client_id] = row
+        self._owners[client_id] = user_id
+        for token in {t for field in SEARCH_FIELDS for t in tokenize(row[field])}:
+            insort(self._keys, (token, client_id))
+
+    def _remove(self, client_id):
+        row = self._rows.pop(client_id, None)
+        self._owners.pop(client_id, None)
+        if row is None:
+            return
+        for token in {t for field in SEARCH_FIELDS for t in tokenize(row[field])}:
+            pos = bisect_left(self._keys, (token, client_id))
+            if pos < len(self._keys) and self._keys[pos] == (token, client_id):
+                del self._keys[pos]
+
+    def _apply(self, changes):
+        with self._lock:
+            if self._built_at is None:
+                return
+            for client_id, change in changes.items():
+                self._remove(client_id)
+                if change is not None:
+                    self._add(client_id, *change)
+
+    def _rebuild(self):
+        from extensions import db
+        from models.client import Client
+
+        rows = db.session.query(
+            Client.id, Client.user_id, Client.first_name, Client.last_name, Client.company_name, Client.city
+        ).all()
+        keys, projections, owners = [], {}, {}
+        for row in rows:
+            projections[row.id] = client_projection(row)
+            owners[row.id] = row.user_id
+            for token in {t for field in SEARCH_FIELDS for t in tokenize(getattr(row, field))}:
+                keys.append((token, row.id))
+        keys.sort()
+        with self._lock:
+            self._keys, self._rows, self._owners = keys, projections, owners
+            self._built_at = time.monotonic()
+
+    def _ensure_fresh(self):
+        built_at = self._built_at
+        if built_at is None or time.monotonic() - built_at > self.ttl:
+            self._rebuild()
+
+    def _prefix_ids(self, prefix):
+        ids = set()
+        keys = self._keys
+        pos = bisect_left(keys, (prefix,))
+        while pos < len(keys) and keys[pos][0].startswith(prefix):
+            ids.add(keys[pos][1])
+            pos += 1
+        return ids
+
+    def search(self, query, limit, exclude_user_id=None):
+        """Clients where every query word prefixes a name, company or city word"""
+        words = tokenize(query)
+        if not words:
+            return []
+        self._ensure_fresh()
+        with self._lock:
+            ids = None
+            # Narrowest (longest) word first keeps the intersection small
+            for word in sorted(words, key=len, reverse=True):
+                matched = self._prefix_ids(word)
+                ids = matched if ids is None else ids & matched
+                if not ids:
+                    return []
+            rows = [self._rows[i] for i in ids if self._owners.get(i) != exclude_user_id]
+        return heapq.nsmallest(
+            limit, rows, key=lambda r: (r["last_name"].lower(), r["first_name"].lower(), r["id"])
+        )
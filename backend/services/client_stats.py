@@ -0,0 +1,178 @@
+from datetime import datetime
+from decimal import Decimal
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import case, delete, event, func, inspect
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+
+# Per-client shipment counters (client_shipment_stats)
+# Shipment inserts, updates and deletes through the ORM apply their deltas to
+# the counters on the same connection, i.e. in the same transaction. Bulk
+# statements bypass the events (status transitions apply their changes through
+# apply_status_changes); "flask reconcile-client-stats" rebuilds the
+# table from shipments and the archive. Archiving keeps the counters as they are.
+
+STATUS_COLUMNS = {"PENDING": "pending_count", "IN_TRANSIT": "in_transit_count", "DELIVERED": "delivered_count"}
+COUNTER_COLUMNS = ("sent_count", "received_count", "pending_count", "in_transit_count", "delivered_count", "total_spend")
+_listening = False
+
+
+def contributions(sender_id, receiver_id, status, price, sign=1):
+    """{client_id: {column: amount}} that one shipment adds to the counters (sign=-1 removes it)"""
+    deltas = {}
+
+    def add(client_id, column, amount):
+        if client_id is not None:
+            row = deltas.setdefault(client_id, {})
+            row[column] = row.get(column, 0) + sign * amount
+
+    add(sender_id, "sent_count", 1)
+    add(receiver_id, "received_count", 1)
+    if status != "CANCELLED":
+        add(sender_id, "total_spend", Decimal(str(price or 0)))
+    if status in STATUS_COLUMNS:
+        for client_id in {sender_id, receiver_id}:
+            add(client_id, STATUS_COLUMNS[status], 1)
+    return deltas
+
+
+def _merge(deltas, more):
+    for client_id, columns in more.items():
+        row = deltas.setdefault(client_id, {})
+        for column, amount in columns.items():
+            row[column] = row.get(column, 0) + amount
+    return deltas
+
+
+def apply_deltas(connection, deltas):
+    """Add the deltas to the counters, creating missing rows (one upsert statement)"""
+    from models.client_shipment_stats import ClientShipmentStats
+
+    now = datetime.utcnow()
+    rows = [
+        dict({column: columns.get(column, 0) for column in COUNTER_COLUMNS}, client_id=client_id, updated_at=now)
+        for client_id, columns in deltas.items() if any(columns.values())
+    ]
+    if not rows:
+        return
+    table = ClientShipmentStats.__table__
+    if connection.dialect.name == "mysql":
+        stmt = mysql_insert(table)
+        changes = {column: table.c[column] + stmt.inserted[column] for column in COUNTER_COLUMNS}
+        stmt = stmt.on_duplicate_key_update(updated_at=stmt.inserted.updated_at, **changes)
+    else:
+        stmt = sqlite_insert(table)
+        changes = {column: table.c[column] + stmt.excluded[column] for column in COUNTER_COLUMNS}
+        stmt = stmt.on_conflict_do_update(index_elements=["client_id"], set_=dict(changes, updated_at=stmt.excluded.updated_at))
+    connection.execute(stmt, rows)
+
+
+def _old_value(state, name):
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, name)
+
+
+def _shipment_values(target, old=False):
+    state = inspect(target)
+    names = ("sender_id", "receiver_id", "status", "price")
+    if old:
+        return tuple(_old_value(state, name) for name in names)
+    return tuple(getattr(target, name) for name in names)
+
+
+def _after_insert(mapper, connection, target):
+    apply_deltas(connection, contributions(*_shipment_values(target)))
+
+
+def _after_update(mapper, connection, target):
+    old, new = _shipment_values(target, old=True), _shipment_values(target)
+    if old == new:
+        return
+    apply_deltas(connection, _merge(contributions(*old, sign=-1), contributions(*new)))
+
+
+def _after_delete(mapper, connection, target):
+    apply_deltas(connection, contributions(*_shipment_values(target, old=True), sign=-1))
+
+
+def apply_status_changes(connection, shipments):
+    """Move shipments changed by a status UPDATE (rows with previous_status) to their new status"""
+    deltas = {}
+    for shipment in shipments:
+        _merge(deltas, contributions(shipment.sender_id, shipment.receiver_id, shipment.previous_status, shipment.price, sign=-1))
+        _merge(deltas, contributions(shipment.sender_id, shipment.receiver_id, shipment.status, shipment.price))
+    apply_deltas(connection, deltas)
+
+
+def apply_removals(connection, shipments):
+    """Take shipments deleted in bulk (rows with sender_id, receiver_id, status, price) off the counters"""
+    deltas = {}
+    for shipment in shipments:
+        _merge(deltas, contributions(shipment.sender_id, shipment.receiver_id, shipment.status, shipment.price, sign=-1))
+    apply_deltas(connection, deltas)
+
+
+def reconcile():
+    """Rebuild every client's counters from shipments and the archive; returns the number of clients"""
+    from models.client_shipment_stats import ClientShipmentStats
+    from models.shipment import Shipment, ShipmentArchive
+
+    totals = {}
+
+    def add(client_id, column, amount):
+        row = totals.setdefault(client_id, {column: 0 for column in COUNTER_COLUMNS})
+        row[column] += amount
+
+    for model in (Shipment, ShipmentArchive):
+        spend = func.coalesce(func.sum(case((model.status != "CANCELLED", model.price), else_=0)), 0)
+        for client_id, count, amount in db.session.query(model.sender_id, func.count(model.id), spend).group_by(model.sender_id):
+            add(client_id, "sent_count", count)
+            add(client_id, "total_spend", Decimal(str(amount)))
+        for client_id, count in db.session.query(model.receiver_id, func.count(model.id)).group_by(model.receiver_id):
+            add(client_id, "received_count", count)
+        by_status = model.status.in_(list(STATUS_COLUMNS))
+        for client_id, status, count in db.session.query(model.sender_id, model.status, func.count(model.id)).filter(
+            by_status
+        ).group_by(model.sender_id, model.status):
+            add(client_id, STATUS_COLUMNS[status], count)
+        for client_id, status, count in db.session.query(model.receiver_id, model.status, func.count(model.id)).filter(
+            by_status, model.receiver_id != model.sender_id
+        ).group_by(model.receiver_id, model.status):
+            add(client_id, STATUS_COLUMNS[status], count)
+
+    # Replace the table in one transaction; readers keep the old counters until commit
+    table = ClientShipmentStats.__table__
+    now = datetime.utcnow()
+    rows = [dict(columns, client_id=client_id, updated_at=now) for client_id, columns in totals.items()]
+    db.session.execute(delete(table))
+    for start in range(0, len(rows), 1000):
+        db.session.execute(table.insert(), rows[start:start + 1000])
+    db.session.commit()
+    return len(rows)
+
+
+@click.command("reconcile-client-stats")
+@with_appcontext
+def reconcile_client_stats_command():
+    """Rebuild client_shipment_stats from shipments and the archive"""
+    click.echo(f"Rebuilt shipment stats for {reconcile()} clients")
+
+
+def init_app(app):
+    global _listening
+    app.cli.add_command(reconcile_client_stats_command)
+    if _listening:
+        return
+    _listening = True
+
+    from models.shipment import Shipment
+
+    event.listen(Shipment, "after_insert", _after_insert)
+    event.listen(Shipment, "after_update", _after_update)
+    event.listen(Shipment, "after_delete", _after_delete)
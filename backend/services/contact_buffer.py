@@ -0,0 +1,142 @@
+import atexit
+import logging
+import threading
+from collections import deque
+from datetime import datetime
+
+from sqlalchemy.exc import OperationalError
+
+from extensions import db
+
+# Buffered contact-form ingestion
+# Public form posts are appended to a bounded in-memory buffer and answered
+# immediately; a background thread writes them in batches (one multi-row
+# INSERT per batch) every CONTACT_FLUSH_INTERVAL seconds or as soon as a batch
+# is full. A full buffer rejects new posts instead of queueing without bound.
+# When a batch fails its rows are retried one at a time: a row the database
+# rejects is logged and dropped, so it cannot block the rows behind it, and
+# when the database itself is unavailable the rest go back to the buffer.
+# Messages still buffered when a worker dies are lost; on a normal exit the
+# buffer is flushed.
+
+logger = logging.getLogger(__name__)
+
+
+class ContactBuffer:
+    """Bounded buffer of contact messages with a background batch writer"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.max_size = 1000
+        self.batch_size = 500
+        self.interval = 1.0
+        self._pending = deque()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.max_size = int(app.config.get("CONTACT_BUFFER_SIZE", 1000))
+        self.batch_size = int(app.config.get("CONTACT_FLUSH_BATCH", 500))
+        self.interval = float(app.config.get("CONTACT_FLUSH_INTERVAL", 1.0))
+        app.extensions["contact_buffer"] = self
+        atexit.register(self.flush)
+
+    def after_fork(self):
+        """The writer thread does not survive fork; messages buffered in the master are not ours"""
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._pending = deque()
+        self._thread = None
+
+    def submit(self, name, email, message):
+        """Queue a message; False when the buffer is full"""
+        with self._lock:
+            if len(self._pending) >= self.max_size:
+                return False
+            self._pending.append({
+                "name": name, "email": email, "message": message,
+                "is_read": False, "created_at": datetime.utcnow(),
+            })
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="contact-writer", daemon=True)
+                self._thread.start()
+            if len(self._pending) >= self.batch_size:
+                self._wake.set()
+        return True
+
+    def pending(self):
+        with self._lock:
+            return len(self._pending)
+
+    def _take(self):
+        with self._lock:
+            return [self._pending.popleft() for _ in range(min(self.batch_size, len(self._pending)))]
+
+    def _requeue(self, rows):
+        # Back to the front, as far as the buffer has room
+        with self._lock:
+            room = max(self.max_size - len(self._pending), 0)
+            if room < len(rows):
+                logger.error("Dropped %s contact messages after a failed write", len(rows) - room)
+            self._pending.extendleft(reversed(rows[:room]))
+
+    def _write(self, rows):
+        from models.contact import Contact
+
+        with self.app.app_context():
+            try:
+                db.session.execute(Contact.__table__.insert(), rows)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            finally:
+                db.session.remove()
+
+    def flush(self):
+        """Write everything buffered now; returns the number written"""
+        written = 0
+        while True:
+            rows = self._take()
+            if not rows:
+                return written
+            try:
+                self._write(rows)
+            except Exception:
+                logger.exception("Writing %s contact messages failed; retrying one at a time", len(rows))
+                count, unavailable = self._write_each(rows)
+                written += count
+                if unavailable:
+                    return written
+                continue
+            written += len(rows)
+
+    def _write_each(self, rows):
+        """(written, database unavailable) after writing rows one by one"""
+        written = 0
+        for index, row in enumerate(rows):
+            try:
+                self._write([row])
+            except OperationalError:
+                # The database, not the row: keep the rest for the next flush
+                logger.exception("Database unavailable; %s contact messages kept", len(rows) - index)
+                self._requeue(rows[index:])
+                return written, True
+            except Exception:
+                logger.exception("Dropped a contact message from %r the database rejects", row["email"])
+                continue
+            written += 1
+        return written, False
+
+    def _run(self):
+        while True:
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+
+
+contact_buffer = ContactBuffer()
@@ -0,0 +1,210 @@
+import csv
+import os
+import re
+import threading
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import event, inspect, select
+
+from extensions import db
+
+# Offline geocoding (no external service)
+# Exact addresses come from the geocoded_addresses table, everything else is
+# placed at its city from the bundled gazetteer (data/gazetteer.csv).
+# Offices and clients get latitude/longitude filled in on write.
+
+LOOKUP_CHUNK = 500
+DEFAULT_GAZETTEER = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "gazetteer.csv")
+
+
+def address_key(address):
+    """Normalized lookup key: lowercase, single spaces"""
+    return " ".join((address or "").lower().split())[:255]
+
+
+def place_key(text):
+    # "1000 София" -> "софия"
+    return " ".join(re.sub(r"[\d.]+", " ", text or "").split()).lower()
+
+
+class Gazetteer:
+    """City name (any spelling in the file) -> (latitude, longitude), loaded on first use"""
+
+    def __init__(self, path=DEFAULT_GAZETTEER):
+        self.path = path
+        self._places = None
+        self._lock = threading.Lock()
+
+    def _load(self):
+        places = {}
+        with open(self.path, newline="", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                coordinates = (float(row["latitude"]), float(row["longitude"]))
+                for name in [row["name"]] + (row.get("alt_names") or "").split("|"):
+                    if name.strip():
+                        places.setdefault(place_key(name), coordinates)
+        return places
+
+    def places(self):
+        if self._places is None:
+            with self._lock:
+                if self._places is None:
+                    self._places = self._load()
+        return self._places
+
+    def find(self, city=None, address=None):
+        """Coordinates of the city, or of the city named at the end of the address"""
+        places = self.places()
+        if city and place_key(city) in places:
+            return places[place_key(city)]
+        for part in reversed((address or "").split(",")):
+            if place_key(part) in places:
+                return places[place_key(part)]
+        return None
+
+
+gazetteer = Gazetteer()
+
+
+def locate(address, city=None, connection=None):
+    """(latitude, longitude) of an exact geocoded address, else of its city; None if unknown"""
+    from models.geocoded_address import GeocodedAddress
+
+    if address:
+        stmt = select(GeocodedAddress.latitude, GeocodedAddress.longitude).where(
+            GeocodedAddress.address_key == address_key(address)
+        )
+        row = (connection or db.session).execute(stmt).first()
+        if row:
+            return tuple(row)
+    return gazetteer.find(city, address)
+
+
+def _set_coordinates(mapper, connection, target):
+    state = inspect(target)
+    if state.attrs.latitude.history.added or state.attrs.longitude.history.added:
+        # Coordinates set explicitly
+        return
+    moved = state.attrs.address.history.has_changes() or state.attrs.city.history.has_changes()
+    if moved or target.latitude is None:
+        target.latitude, target.longitude = locate(target.address, target.city, connection) or (None, None)
+
+
+def lookup(addresses):
+    """{address: (latitude, longitude)} for the addresses found in the table"""
+    from models.geocoded_address import GeocodedAddress
+
+    keys = {}
+    for address in addresses:
+        keys.setdefault(address_key(address), []).append(address)
+    found = {}
+    key_list = [key for key in keys if key]
+    for start in range(0, len(key_list), LOOKUP_CHUNK):
+        rows = db.session.query(
+            GeocodedAddress.address_key, GeocodedAddress.latitude, GeocodedAddress.longitude
+        ).filter(GeocodedAddress.address_key.in_(key_list[start:start + LOOKUP_CHUNK]))
+        for key, latitude, longitude in rows:
+            for address in keys[key]:
+                found[address] = (latitude, longitude)
+    return found
+
+
+def import_geocodes(rows, batch_size=1000):
+    """Insert or update (address, latitude, longitude) rows; returns (imported, errors)"""
+    from models.geocoded_address import GeocodedAddress
+
+    imported = 0
+    errors = []
+    batch = {}
+
+    def flush():
+        existing = {
+            row.address_key: row
+            for row in GeocodedAddress.query.filter(GeocodedAddress.address_key.in_(list(batch)))
+        }
+        for key, (address, latitude, longitude) in batch.items():
+            row = existing.get(key)
+            if row is None:
+                db.session.add(GeocodedAddress(address_key=key, address=address, latitude=latitude, longitude=longitude))
+            else:
+                row.address, row.latitude, row.longitude = address, latitude, longitude
+        db.session.commit()
+        batch.clear()
+
+    for line, row in enumerate(rows, start=2):
+        try:
+            address = (row.get("address") or "").strip()
+            latitude, longitude = float(row.get("latitude")), float(row.get("longitude"))
+            if not address or not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+                raise ValueError
+        except (TypeError, ValueError):
+            errors.append(line)
+            continue
+        batch[address_key(address)] = (address[:255], latitude, longitude)
+        imported += 1
+        if len(batch) >= batch_size:
+            flush()
+    if batch:
+        flush()
+    return imported, errors
+
+
+@click.command("import-geocodes")
+@with_appcontext
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+def import_geocodes_command(path):
+    """Load a CSV with address, latitude, longitude columns into geocoded_addresses"""
+    with open(path, newline="", encoding="utf-8-sig") as f:
+        imported, errors = import_geocodes(csv.DictReader(f))
+    click.echo(f"Imported {imported} addresses")
+    if errors:
+        click.echo(f"Skipped invalid rows (line numbers): {', '.join(map(str, errors[:50]))}")
+
+
+@click.command("geocode-locations")
+@with_appcontext
+@click.option("--all", "everything", is_flag=True, help="Also re-geocode rows that already have coordinates")
+def geocode_locations_command(everything):
+    """Fill latitude/longitude of offices and clients from the address table and gazetteer"""
+    from models.office import Office
+    from models.client import Client
+
+    for model in (Office, Client):
+        query = model.query if everything else model.query.filter(model.latitude.is_(None))
+        updated = missing = 0
+        last_id = 0
+        while True:
+            rows = query.filter(model.id > last_id).order_by(model.id).limit(1000).all()
+            if not rows:
+                break
+            for row in rows:
+                coordinates = locate(row.address, row.city)
+                if coordinates:
+                    row.latitude, row.longitude = coordinates
+                    updated += 1
+                else:
+                    missing += 1
+            last_id = rows[-1].id
+            db.session.commit()
+        click.echo(f"{model.__tablename__}: geocoded {updated}, not found {missing}")
+
+
+_listening = False
+
+
+def init_app(app):
+    global _listening
+    gazetteer.path = app.config.get("GAZETTEER_FILE") or DEFAULT_GAZETTEER
+    app.cli.add_command(import_geocodes_command)
+    app.cli.add_command(geocode_locations_command)
+    if _listening:
+        return
+    _listening = True
+
+    from models.office import Office
+    from models.client import Client
+
+    for model in (Office, Client):
+        event.listen(model, "before_insert", _set_coordinates)
+        event.listen(model, "before_update", _set_coordinates)
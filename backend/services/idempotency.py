@@ -0,0 +1,263 @@
+import functools
+import hashlib
+import json
+import threading
+import time
+import zlib
+from collections import OrderedDict, namedtuple
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app, jsonify, make_response, request
+from flask.cli import with_appcontext
+from flask_jwt_extended import get_jwt_identity
+from sqlalchemy import delete, insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from extensions import db
+
+# Idempotency-Key support for write endpoints
+# The first request with a key runs and its response is stored; retries with
+# the same key (same identity, method and path) get the stored response back
+# instead of running again. Responses live in an in-process LRU in front of the
+# idempotency_keys table. Before running, a request claims its key with an
+# INSERT, so a concurrent retry in another worker waits for the first one;
+# retries within one process wait on an event instead of polling. Server
+# errors (5xx) are not stored, so they can be retried. A claim is only taken
+# over once it is older than IDEMPOTENCY_TAKEOVER_TIMEOUT (the worker that
+# made it died), well past the time a retry waits, so a slow first request
+# never runs twice.
+
+HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+# Headers replayed along with the body
+REPLAYED_HEADERS = ("Content-Type", "Location")
+POLL_INTERVAL = 0.05
+
+StoredResponse = namedtuple("StoredResponse", "request_hash status_code headers body expires_at")
+
+
+class IdempotencyStore:
+    """Stored responses by idempotency key, with in-process coalescing of concurrent retries"""
+
+    def __init__(self, app=None):
+        self.ttl = timedelta(hours=24)
+        self.cache_size = 10000
+        self.wait_timeout = 30.0
+        self.takeover_timeout = 600.0
+        self.cleanup_interval = 600.0
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self._last_cleanup = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.ttl = timedelta(hours=float(app.config.get("IDEMPOTENCY_TTL_HOURS", 24)))
+        self.cache_size = int(app.config.get("IDEMPOTENCY_CACHE_SIZE", 10000))
+        self.wait_timeout = float(app.config.get("IDEMPOTENCY_WAIT_TIMEOUT", 30))
+        self.takeover_timeout = max(float(app.config.get("IDEMPOTENCY_TAKEOVER_TIMEOUT", 600)), self.wait_timeout)
+        self.cleanup_interval = float(app.config.get("IDEMPOTENCY_CLEANUP_INTERVAL", 600))
+        app.extensions["idempotency"] = self
+        app.cli.add_command(purge_idempotency_keys_command)
+
+    def after_fork(self):
+        """Requests in flight belong to the parent; start with no waiters"""
+        self._lock = threading.Lock()
+        self._inflight = {}
+
+    def handle(self, key, view, args, kwargs):
+        """Run view once per key; replay its response for retries"""
+        try:
+            identity = get_jwt_identity()
+        except RuntimeError:
+            # Endpoint without authentication (register): the key alone scopes it
+            identity = None
+        scope = hashlib.sha256(f"{identity}|{request.method}|{request.path}|{key}".encode("utf-8")).hexdigest()
+        request_hash = hashlib.sha256(request.get_data()).hexdigest()
+        deadline = time.monotonic() + self.wait_timeout
+
+        while True:
+            stored = self._cached(scope)
+            if stored is not None:
+                return self._replay(stored, request_hash)
+            with self._lock:
+                waiter = self._inflight.get(scope)
+                if waiter is None:
+                    done = self._inflight[scope] = threading.Event()
+            if waiter is None:
+                break
+            # A retry of a request still running in this process
+            if not waiter.wait(max(deadline - time.monotonic(), 0)):
+                return _in_progress()
+
+        try:
+            return self._run_claimed(scope, request_hash, deadline, view, args, kwargs)
+        finally:
+            with self._lock:
+                self._inflight.pop(scope, None)
+            done.set()
+
+    def _run_claimed(self, scope, request_hash, deadline, view, args, kwargs):
+        claim = self._claim(scope, request_hash, deadline)
+        if claim is None:
+            return _in_progress()
+        if claim is not True:
+            if claim.status_code is not None:
+                self._remember(scope, claim)
+            return self._replay(claim, request_hash)
+
+        try:
+            response = make_response(view(*args, **kwargs))
+        except Exception:
+            self._release(scope)
+            raise
+        if response.status_code >= 500 or response.is_streamed:
+            self._release(scope)
+            return response
+        self._store(scope, request_hash, response)
+        return response
+
+    def _claim(self, scope, request_hash, deadline):
+        """
+        True once this request owns the key; otherwise the stored response
+        (or the claim of a different request), or None after waiting too long
+        """
+        from models.idempotency_record import IdempotencyRecord as R
+
+        while True:
+            now = datetime.utcnow()
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(insert(R).values(
+                        key_hash=scope, request_hash=request_hash, created_at=now, expires_at=now + self.ttl
+                    ))
+                return True
+            except IntegrityError:
+                pass
+
+            with db.engine.begin() as connection:
+                row = connection.execute(select(R).where(R.key_hash == scope)).first()
+                if row is None:
+                    continue
+                if row.expires_at < now:
+                    connection.execute(delete(R).where(R.key_hash == scope, R.expires_at < now))
+                    continue
+                if row.status_code is not None or row.request_hash != request_hash:
+                    return self._from_row(row)
+                # Running in another worker; a claim older than the takeover timeout was abandoned
+                if row.created_at < now - timedelta(seconds=self.takeover_timeout):
+                    taken = connection.execute(update(R).where(
+                        R.key_hash == scope, R.status_code.is_(None), R.created_at == row.created_at
+                    ).values(created_at=now, expires_at=now + self.ttl))
+                    if taken.rowcount == 1:
+                        return True
+            if time.monotonic() >= deadline:
+                return None
+            time.sleep(POLL_INTERVAL)
+
+    def _release(self, scope):
+        from models.idempotency_record import IdempotencyRecord as R
+
+        with db.engine.begin() as connection:
+            connection.execute(delete(R).where(R.key_hash == scope, R.status_code.is_(None)))
+
+    def _store(self, scope, request_hash, response):
+        from models.idempotency_record import IdempotencyRecord as R
+
+        headers = [[name, response.headers[name]] for name in REPLAYED_HEADERS if name in response.headers]
+        expires_at = datetime.utcnow() + self.ttl
+        stored = StoredResponse(request_hash, response.status_code, headers, response.get_data(), expires_at)
+        with db.engine.begin() as connection:
+            connection.execute(update(R).where(R.key_hash == scope).values(
+                status_code=stored.status_code, headers=json.dumps(headers),
+                body=zlib.compress(stored.body), expires_at=expires_at,
+            ))
+        self._remember(scope, stored)
+        self._cleanup_if_due()
+
+    @staticmethod
+    def _from_row(row):
+        return StoredResponse(
+            row.request_hash, row.status_code, json.loads(row.headers) if row.headers else [],
+            zlib.decompress(row.body) if row.body is not None else b"", row.expires_at,
+        )
+
+    def _cached(self, scope):
+        with self._lock:
+            stored = self._cache.get(scope)
+            if stored is None:
+                return None
+            if stored.expires_at < datetime.utcnow():
+                del self._cache[scope]
+                return None
+            self._cache.move_to_end(scope)
+            return stored
+
+    def _remember(self, scope, stored):
+        with self._lock:
+            self._cache[scope] = stored
+            self._cache.move_to_end(scope)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    @staticmethod
+    def _replay(stored, request_hash):
+        if stored.request_hash != request_hash:
+            return jsonify({"error": f"{HEADER} was already used for a different request"}), 422
+        response = current_app.response_class(stored.body, status=stored.status_code)
+        for name, value in stored.headers:
+            response.headers[name] = value
+        response.headers["Idempotent-Replayed"] = "true"
+        return response
+
+    def _cleanup_if_due(self):
+        if time.monotonic() - self._last_cleanup < self.cleanup_interval:
+            return
+        self._last_cleanup = time.monotonic()
+        self.purge_expired()
+
+    def purge_expired(self, batch_size=1000):
+        """Delete expired keys in batches; returns the number deleted"""
+        from models.idempotency_record import IdempotencyRecord as R
+
+        deleted = 0
+        while True:
+            with db.engine.begin() as connection:
+                keys = connection.execute(
+                    select(R.key_hash).where(R.expires_at < datetime.utcnow()).limit(batch_size)
+                ).scalars().all()
+                if not keys:
+                    return deleted
+                connection.execute(delete(R).where(R.key_hash.in_(keys)))
+            deleted += len(keys)
+
+
+def _in_progress():
+    return jsonify({"error": f"A request with this {HEADER} is still in progress"}), 409, {"Retry-After": "1"}
+
+
+idempotency = IdempotencyStore()
+
+
+def idempotent(view):
+    """Honour the Idempotency-Key header on a write endpoint (place below @jwt_required)"""
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        key = request.headers.get(HEADER)
+        if key is None:
+            return view(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return jsonify({"error": f"{HEADER} must be 1 to {MAX_KEY_LENGTH} characters"}), 400
+        return idempotency.handle(key, view, args, kwargs)
+
+    return wrapper
+
+
+@click.command("purge-idempotency-keys")
+@with_appcontext
+def purge_idempotency_keys_command():
+    """Delete expired idempotency keys"""
+    click.echo(f"Deleted {idempotency.purge_expired()} expired idempotency keys")
@@ -0,0 +1,113 @@
+import numpy as np
+
+from extensions import db
+from services.tariff import tariff_engine
+
+# Load consolidation for undelivered shipments
+# Parcels are grouped by lane (origin zone -> destination zone, see services/tariff.py)
+# and packed into vehicles with first-fit decreasing on weight and volume.
+
+
+def pack_first_fit_decreasing(weights, volumes, max_weight, max_volume):
+    """
+    Two-dimensional first-fit decreasing
+    Parcels are placed largest first (by the larger of their weight and volume
+    share of a vehicle) into the first vehicle with room for both.
+    Returns (vehicle index per parcel, -1 when a parcel exceeds a vehicle; vehicle count)
+    """
+    weights = np.asarray(weights, dtype=np.float64)
+    volumes = np.asarray(volumes, dtype=np.float64)
+    count = len(weights)
+    order = np.argsort(-np.maximum(weights / max_weight, volumes / max_volume), kind="stable")
+    # Smallest weight/volume still to place after each position; a vehicle that
+    # cannot take them is closed for good, so the scan can start past it
+    min_weight_after = np.minimum.accumulate(weights[order][::-1])[::-1].tolist()
+    min_volume_after = np.minimum.accumulate(volumes[order][::-1])[::-1].tolist()
+
+    free_weight = np.empty(count)
+    free_volume = np.empty(count)
+    assignment = np.full(count, -1, dtype=np.intp)
+    vehicles = first_open = 0
+    weight_list, volume_list = weights.tolist(), volumes.tolist()
+    for position, i in enumerate(order.tolist()):
+        weight, volume = weight_list[i], volume_list[i]
+        if weight > max_weight or volume > max_volume:
+            continue
+        while first_open < vehicles and (
+            free_weight[first_open] < min_weight_after[position] or free_volume[first_open] < min_volume_after[position]
+        ):
+            first_open += 1
+        fits = (free_weight[first_open:vehicles] >= weight) & (free_volume[first_open:vehicles] >= volume)
+        slot = int(fits.argmax()) if fits.size else 0
+        if fits.size and fits[slot]:
+            vehicle = first_open + slot
+        else:
+            vehicle = vehicles
+            free_weight[vehicle] = max_weight
+            free_volume[vehicle] = max_volume
+            vehicles += 1
+        free_weight[vehicle] -= weight
+        free_volume[vehicle] -= volume
+        assignment[i] = vehicle
+    return assignment, vehicles
+
+
+def undelivered_parcels():
+    """(id, tracking number, weight, volume, lane) for every undelivered shipment"""
+    from models.shipment import Shipment
+
+    rows = db.session.query(
+        Shipment.id, Shipment.tracking_number, Shipment.weight, Shipment.volume,
+        Shipment.origin_address, Shipment.destination_address,
+    ).filter(
+        # Same criteria as /api/shipment/reports/undelivered
+        Shipment.sent_date.isnot(None), Shipment.received_date.is_(None), Shipment.status != "CANCELLED"
+    ).order_by(Shipment.id).yield_per(5000)
+
+    zones = {}
+    for row in rows:
+        for address in (row.origin_address, row.destination_address):
+            if address not in zones:
+                zones[address] = tariff_engine.zone_index(address)
+        yield row.id, row.tracking_number, row.weight, row.volume, (zones[row.origin_address], zones[row.destination_address])
+
+
+def plan_loads(parcels, max_weight, max_volume):
+    """
+    Pack parcels lane by lane
+    Yields one manifest per vehicle, then {"unassigned": [...]} for parcels that
+    have no parsed volume or exceed a vehicle on their own
+    """
+    lanes = {}
+    unassigned = []
+    for parcel_id, tracking_number, weight, volume, lane in parcels:
+        if volume is None:
+            unassigned.append({"id": parcel_id, "tracking_number": tracking_number, "reason": "unknown dimensions"})
+        else:
+            lanes.setdefault(lane, []).append((parcel_id, tracking_number, weight, volume))
+
+    zone_names = tariff_engine.zones
+    for (origin, destination), lane_parcels in sorted(lanes.items()):
+        ids, tracking_numbers, weights, volumes = zip(*lane_parcels)
+        assignment, vehicles = pack_first_fit_decreasing(weights, volumes, max_weight, max_volume)
+        loads = [[] for _ in range(vehicles)]
+        for i, vehicle in enumerate(assignment.tolist()):
+            if vehicle < 0:
+                unassigned.append({"id": ids[i], "tracking_number": tracking_numbers[i], "reason": "exceeds vehicle capacity"})
+            else:
+                loads[vehicle].append(i)
+        for vehicle, members in enumerate(loads):
+            load_weight = sum(weights[i] for i in members)
+            load_volume = sum(volumes[i] for i in members)
+            yield {
+                "origin_zone": zone_names[origin],
+                "destination_zone": zone_names[destination],
+                "vehicle": vehicle + 1,
+                "shipment_count": len(members),
+                "weight": round(load_weight, 3),
+                "volume": round(load_volume, 1),
+                "weight_utilization": round(load_weight / max_weight, 4),
+                "volume_utilization": round(load_volume / max_volume, 4),
+                "shipments": [{"id": ids[i], "tracking_number": tracking_numbers[i]} for i in members],
+            }
+    yield {"unassigned": unassigned}
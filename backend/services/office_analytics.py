@@ -0,0 +1,278 @@
+import threading
+import time
+from decimal import Decimal
+
+from sqlalchemy import case, event, func, inspect, select
+from sqlalchemy.orm import Session
+
+from extensions import db
+from services.archival import report_models
+from services.sharding import ShardLocal, shards
+
+# Shipment volume and revenue by company -> office -> employee
+# Shipments carry the office of the employee who registered them (office_id),
+# copied on write so the report is one GROUP BY over the covering index
+# ix_shipments_analytics (sent_date, office_id, registered_by_employee_id,
+# status, price) without joining employees. A shipment stays with the office it
+# was registered at when the employee later moves.
+# Subtotals are rolled up from the leaf groups here rather than with
+# GROUP BY ... WITH ROLLUP, which MySQL and SQLite spell differently (or not at all).
+
+_listening = False
+
+
+class EmployeeDirectory:
+    """
+    In-process map of employee id -> office id, so registering a shipment does
+    not query employees. Reloaded every EMPLOYEE_DIRECTORY_TTL seconds and
+    updated when this process commits employee changes; an unknown id is
+    looked up on its own.
+    """
+
+    def __init__(self, ttl=60):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._offices = None
+        self._loaded_at = 0
+
+    def init_app(self, app):
+        self.ttl = float(app.config.get("EMPLOYEE_DIRECTORY_TTL", 60))
+        self.clear()
+
+    def _load(self, connection):
+        from models.employee import Employee
+
+        rows = connection.execute(select(Employee.id, Employee.office_id)).all()
+        with self._lock:
+            self._offices = dict(rows)
+            self._loaded_at = time.monotonic()
+
+    def _current(self, connection):
+        if self._offices is None or time.monotonic() - self._loaded_at > self.ttl:
+            self._load(connection)
+        return self._offices
+
+    def office_of(self, connection, employee_id):
+        """Office id of an employee, None when there is no such employee"""
+        from models.employee import Employee
+
+        if employee_id is None:
+            return None
+        offices = self._current(connection)
+        if employee_id not in offices:
+            office_id = connection.execute(select(Employee.office_id).where(Employee.id == employee_id)).scalar()
+            if office_id is None:
+                return None
+            with self._lock:
+                offices[employee_id] = office_id
+        return offices[employee_id]
+
+    def intake_employee(self, connection):
+        """Employee that registers shipments created by clients (the first one), or None"""
+        offices = self._current(connection)
+        return min(offices) if offices else None
+
+    def apply(self, changes):
+        with self._lock:
+            if self._offices is None:
+                return
+            for employee_id, office_id in changes.items():
+                if office_id is None:
+                    self._offices.pop(employee_id, None)
+                else:
+                    self._offices[employee_id] = office_id
+
+    def clear(self):
+        with self._lock:
+            self._offices = None
+
+
+# One map per database shard (services/sharding.py)
+employee_directory = ShardLocal(EmployeeDirectory)
+
+
+def _before_insert(mapper, connection, target):
+    if target.office_id is None:
+        target.office_id = employee_directory.office_of(connection, target.registered_by_employee_id)
+
+
+def _before_update(mapper, connection, target):
+    if inspect(target).attrs.registered_by_employee_id.history.has_changes():
+        target.office_id = employee_directory.office_of(connection, target.registered_by_employee_id)
+
+
+def _remember_employee(mapper, connection, target, deleted=False):
+    session = Session.object_session(target)
+    if session is not None:
+        session.info.setdefault("employee_directory_changes", {})[target.id] = None if deleted else target.office_id
+
+
+def init_app(app):
+    global _listening
+    employee_directory.init_app(app)
+    if _listening:
+        return
+    _listening = True
+
+    from models.employee import Employee
+    from models.shipment import Shipment
+
+    event.listen(Shipment, "before_insert", _before_insert)
+    event.listen(Shipment, "before_update", _before_update)
+    event.listen(Employee, "after_insert", _remember_employee)
+    event.listen(Employee, "after_update", _remember_employee)
+    event.listen(Employee, "after_delete", lambda m, c, t: _remember_employee(m, c, t, deleted=True))
+
+    @event.listens_for(Session, "after_commit")
+    def apply_employee_changes(session):
+        changes = session.info.pop("employee_directory_changes", None)
+        if changes:
+            employee_directory.apply(changes)
+
+    @event.listens_for(Session, "after_rollback")
+    def discard_employee_changes(session):
+        session.info.pop("employee_directory_changes", None)
+
+
+def _empty_totals():
+    return {"shipment_count": 0, "delivered_count": 0, "revenue": Decimal("0")}
+
+
+def _add(totals, shipment_count, delivered_count, revenue):
+    totals["shipment_count"] += shipment_count
+    totals["delivered_count"] += delivered_count
+    totals["revenue"] += revenue
+
+
+def _leaf_rows(start_date=None, end_date=None, office_ids=None):
+    """{(office id, employee id): [shipments, delivered, delivered revenue]} over the hot table and the archive"""
+    leaves = {}
+    for model in report_models(start_date):
+        delivered = model.status == "DELIVERED"
+        query = db.session.query(
+            model.office_id,
+            model.registered_by_employee_id,
+            func.count(model.id),
+            func.coalesce(func.sum(case((delivered, 1), else_=0)), 0),
+            # Revenue follows /api/shipment/reports/revenue: delivered shipments only
+            func.coalesce(func.sum(case((delivered, model.price), else_=0)), 0),
+        )
+        if start_date:
+            query = query.filter(model.sent_date >= start_date)
+        if end_date:
+            query = query.filter(model.sent_date <= end_date)
+        if office_ids is not None:
+            query = query.filter(model.office_id.in_(office_ids))
+        for office_id, employee_id, count, delivered_count, revenue in query.group_by(
+            model.office_id, model.registered_by_employee_id
+        ):
+            leaf = leaves.setdefault((office_id, employee_id), [0, 0, Decimal("0")])
+            leaf[0] += count
+            leaf[1] += int(delivered_count)
+            leaf[2] += Decimal(str(revenue))
+    return leaves
+
+
+def _add_node(totals, node):
+    _add(totals, node["shipment_count"], node["delivered_count"], node["revenue"])
+
+
+def office_rollup(start_date=None, end_date=None, company_id=None):
+    """
+    Nested company -> office -> employee totals with a subtotal on every level
+    Shipments without an office (registered before office_id existed and not
+    backfilled) are reported under "unassigned"
+    With shards, one company is read from its shard; all of them from every
+    database in parallel, merged here
+    """
+    if company_id is not None:
+        with shards.use(shards.for_company(company_id)):
+            parts = [_rollup(start_date, end_date, company_id)]
+    else:
+        parts = shards.fan_out(_rollup, start_date, end_date, None)
+
+    company_nodes, unassigned, grand_total = parts[0]
+    for other_companies, other_unassigned, other_total in parts[1:]:
+        _add_node(grand_total, other_total)
+        for other_id, other in other_companies.items():
+            node = company_nodes.get(other_id)
+            if node is None:
+                company_nodes[other_id] = other
+            else:
+                _add_node(node, other)
+                node["offices"].update(other["offices"])
+        if other_unassigned is not None:
+            if unassigned is None:
+                unassigned = other_unassigned
+            else:
+                _add_node(unassigned, other_unassigned)
+                unassigned["employees"].extend(other_unassigned["employees"])
+
+    def serialize(node):
+        node = dict(node, revenue=str(node["revenue"]))
+        if "offices" in node:
+            node["offices"] = [serialize(office) for office in node["offices"].values()]
+        if "employees" in node:
+            node["employees"] = [serialize(employee) for employee in node["employees"]]
+        return node
+
+    return {
+        "companies": [serialize(node) for node in company_nodes.values()],
+        "unassigned": serialize(unassigned) if unassigned is not None else None,
+        "total": serialize(grand_total),
+    }
+
+
+def _rollup(start_date, end_date, company_id):
+    """(company nodes, unassigned node, grand total) of one database"""
+    from models.company import Company
+    from models.employee import Employee
+    from models.office import Office
+
+    offices = Office.query.with_entities(Office.id, Office.name, Office.company_id)
+    if company_id is not None:
+        offices = offices.filter(Office.company_id == company_id)
+    offices = {row.id: row for row in offices}
+    leaves = _leaf_rows(start_date, end_date, list(offices) if company_id is not None else None)
+
+    employee_ids = {employee_id for _, employee_id in leaves}
+    employees = {
+        row.id: f"{row.first_name} {row.last_name}"
+        for row in db.session.query(Employee.id, Employee.first_name, Employee.last_name).filter(Employee.id.in_(employee_ids))
+    } if employee_ids else {}
+    company_ids = {office.company_id for office in offices.values()}
+    companies = {
+        row.id: row.name for row in db.session.query(Company.id, Company.name).filter(Company.id.in_(company_ids))
+    } if company_ids else {}
+
+    grand_total = _empty_totals()
+    company_nodes = {}
+    unassigned = None
+    for (office_id, employee_id), (count, delivered_count, revenue) in sorted(
+        leaves.items(), key=lambda item: (item[0][0] is None, item[0][0] or 0, item[0][1] or 0)
+    ):
+        _add(grand_total, count, delivered_count, revenue)
+        employee_node = dict(_empty_totals(), employee_id=employee_id, name=employees.get(employee_id))
+        _add(employee_node, count, delivered_count, revenue)
+
+        office = offices.get(office_id)
+        if office is None:
+            if unassigned is None:
+                unassigned = dict(_empty_totals(), employees=[])
+            office_node = unassigned
+        else:
+            company_node = company_nodes.get(office.company_id)
+            if company_node is None:
+                company_node = company_nodes[office.company_id] = dict(
+                    _empty_totals(), company_id=office.company_id, name=companies.get(office.company_id), offices={}
+                )
+            _add(company_node, count, delivered_count, revenue)
+            office_node = company_node["offices"].get(office_id)
+            if office_node is None:
+                office_node = company_node["offices"][office_id] = dict(
+                    _empty_totals(), office_id=office_id, name=office.name, employees=[]
+                )
+        _add(office_node, count, delivered_count, revenue)
+        office_node["employees"].append(employee_node)
+
+    return company_nodes, unassigned, grand_total
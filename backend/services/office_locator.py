@@ -0,0 +1,204 @@
+import heapq
+import math
+import threading
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from services.sharding import ShardLocal, current as current_shard
+
+# Nearest-office lookup
+# Offices with coordinates live in an in-memory grid, sized on build to hold
+# about one office per cell. A query scans rings of cells outwards from the
+# point and stops once no unscanned cell can be closer than the N-th best
+# office; rings are clipped to the occupied rows and columns, so a point far
+# outside them costs no more than one inside. Office changes are applied to
+# the grid after their transaction commits.
+
+MIN_CELL_DEGREES = 0.01
+MAX_CELL_DEGREES = 1.0
+EARTH_RADIUS_KM = 6371.0
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def haversine_km(lat1, lon1, lat2, lon2):
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+class OfficeLocator:
+    """Grid index over office coordinates, built on first use"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._cells = {}
+        self._offices = {}
+        self._bounds = None
+        self._cell_degrees = MAX_CELL_DEGREES
+        self._gridded_count = 0
+        self._built = False
+        self._listening = False
+        self.shard = None  # set per database by ShardLocal
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.invalidate()
+        app.extensions["office_locator"] = self
+        if not self._listening:
+            self._listen()
+
+    def invalidate(self):
+        with self._lock:
+            self._built = False
+
+    def _listen(self):
+        from models.office import Office
+
+        def remember(mapper, connection, target, deleted=False):
+            session = Session.object_session(target)
+            if session is not None:
+                pending = session.info.setdefault("office_locator_changes", {})
+                pending[target.id] = None if deleted else (target.latitude, target.longitude, target.company_id)
+
+        event.listen(Office, "after_insert", remember)
+        event.listen(Office, "after_update", remember)
+        event.listen(Office, "after_delete", lambda m, c, t: remember(m, c, t, deleted=True))
+
+        @event.listens_for(Session, "after_commit")
+        def apply_changes(session):
+            if current_shard() != self.shard:
+                return  # committed on another database, left to its own instance
+            changes = session.info.pop("office_locator_changes", None)
+            if changes:
+                self._apply(changes)
+
+        @event.listens_for(Session, "after_rollback")
+        def discard_changes(session):
+            session.info.pop("office_locator_changes", None)
+
+        self._listening = True
+
+    def _add(self, office_id, latitude, longitude, company_id):
+        if latitude is None or longitude is None:
+            return
+        self._offices[office_id] = (latitude, longitude, company_id)
+        self._cells.setdefault(self._cell(latitude, longitude), set()).add(office_id)
+
+    def _remove(self, office_id):
+        office = self._offices.pop(office_id, None)
+        if office is not None:
+            cell = self._cell(office[0], office[1])
+            self._cells[cell].discard(office_id)
+            if not self._cells[cell]:
+                del self._cells[cell]
+
+    def _cell(self, latitude, longitude):
+        return int(math.floor(latitude / self._cell_degrees)), int(math.floor(longitude / self._cell_degrees))
+
+    def _apply(self, changes):
+        with self._lock:
+            if not self._built:
+                return
+            for office_id, change in changes.items():
+                self._remove(office_id)
+                if change is not None:
+                    self._add(office_id, *change)
+            count = len(self._offices)
+            if count > max(2 * self._gridded_count, 16) or count < self._gridded_count // 2:
+                # Cell size no longer fits the number of offices
+                self._regrid(dict(self._offices))
+            else:
+                self._refresh_bounds()
+
+    def _refresh_bounds(self):
+        # Occupied cell rows/columns, so queries know when to stop widening
+        if self._cells:
+            rows = [cell[0] for cell in self._cells]
+            cols = [cell[1] for cell in self._cells]
+            self._bounds = (min(rows), max(rows), min(cols), max(cols))
+        else:
+            self._bounds = None
+
+    def _regrid(self, offices):
+        """Rebuild the grid from {office id: (latitude, longitude, company id)}"""
+        if offices:
+            latitudes = [office[0] for office in offices.values()]
+            longitudes = [office[1] for office in offices.values()]
+            # Cell side so that the bounding box holds about one office per cell
+            area = (max(latitudes) - min(latitudes)) * (max(longitudes) - min(longitudes))
+            cell_degrees = math.sqrt(max(area, MIN_CELL_DEGREES ** 2) / len(offices))
+        else:
+            cell_degrees = MAX_CELL_DEGREES
+        self._cell_degrees = min(max(cell_degrees, MIN_CELL_DEGREES), MAX_CELL_DEGREES)
+        self._gridded_count = len(offices)
+        self._cells, self._offices = {}, {}
+        for office_id, office in offices.items():
+            self._add(office_id, *office)
+        self._refresh_bounds()
+
+    def _build(self):
+        from extensions import db
+        from models.office import Office
+
+        rows = db.session.query(Office.id, Office.latitude, Office.longitude, Office.company_id).filter(
+            Office.latitude.isnot(None), Office.longitude.isnot(None)
+        ).all()
+        with self._lock:
+            self._regrid({row.id: (row.latitude, row.longitude, row.company_id) for row in rows})
+            self._built = True
+
+    def nearest(self, latitude, longitude, n=1, company_id=None):
+        """[(office id, km)] for the n closest offices, optionally within one company"""
+        if not self._built:
+            self._build()
+        with self._lock:
+            if self._bounds is None:
+                return []
+            row, col = self._cell(latitude, longitude)
+            min_row, max_row, min_col, max_col = self._bounds
+            # Rings before the first and beyond the last cover no occupied cell
+            min_ring = max(min_row - row, row - max_row, min_col - col, col - max_col, 0)
+            max_ring = max(abs(row - min_row), abs(row - max_row), abs(col - min_col), abs(col - max_col))
+            # A cell r rings away is at least (r - 1) cells away; longitude cells shrink towards the poles
+            cos_lat = math.cos(math.radians(min(abs(latitude) + (max_ring + 1) * self._cell_degrees, 89.0)))
+            ring_km = self._cell_degrees * KM_PER_DEGREE * cos_lat
+
+            best = []  # max-heap of (-km, office id)
+            for ring in range(min_ring, max_ring + 1):
+                if len(best) == n and (ring - 1) * ring_km > -best[0][0]:
+                    break
+                for cell in self._ring_cells(row, col, ring, self._bounds):
+                    for office_id in self._cells.get(cell, ()):
+                        office_latitude, office_longitude, office_company = self._offices[office_id]
+                        if company_id is not None and office_company != company_id:
+                            continue
+                        km = haversine_km(latitude, longitude, office_latitude, office_longitude)
+                        if len(best) < n:
+                            heapq.heappush(best, (-km, office_id))
+                        elif km < -best[0][0]:
+                            heapq.heapreplace(best, (-km, office_id))
+        return [(office_id, -negative_km) for negative_km, office_id in sorted(best, reverse=True)]
+
+    @staticmethod
+    def _ring_cells(row, col, ring, bounds):
+        """Cells of one ring around (row, col) that lie within bounds (occupied rows/columns)"""
+        min_row, max_row, min_col, max_col = bounds
+        if ring == 0:
+            if min_row <= row <= max_row and min_col <= col <= max_col:
+                yield row, col
+            return
+        cols = range(max(col - ring, min_col), min(col + ring, max_col) + 1)
+        for r in (row - ring, row + ring):
+            if min_row <= r <= max_row:
+                for c in cols:
+                    yield r, c
+        for c in (col - ring, col + ring):
+            if min_col <= c <= max_col:
+                for r in range(max(row - ring + 1, min_row), min(row + ring - 1, max_row) + 1):
+                    yield r, c
+
+
+# One grid per database shard (services/sharding.py)
+office_locator = ShardLocal(OfficeLocator)
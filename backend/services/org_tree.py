@@ -0,0 +1,161 @@
+import json
+import threading
+
+from sqlalchemy import event, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import Session
+
+from services.sharding import current as current_shard
+
+# Organisation tree (companies > offices > employees) for GET /api/org/tree
+# The tree is assembled from three queries and kept in memory as serialized
+# JSON together with the version it was built at. ORM writes to companies,
+# offices or employees bump the "org_tree" row of cache_versions in their own
+# transaction, so a request reads one counter and rebuilds only when it moved,
+# whichever worker made the change. The version doubles as the ETag.
+# Bulk UPDATE/DELETE statements skip the ORM events; call bump() after them.
+# With shards, companies bump the main database and offices and employees the
+# shard they live on; the tree of a shard is versioned by the sum of both.
+
+CACHE_NAME = "org_tree"
+
+
+def bump(connection, name=CACHE_NAME):
+    """Increment a cache version in the transaction of the given connection"""
+    from models.cache_version import CacheVersion
+
+    table = CacheVersion.__table__
+    if connection.dialect.name == "mysql":
+        stmt = mysql_insert(table).values(name=name, version=1)
+        stmt = stmt.on_duplicate_key_update(version=table.c.version + 1)
+    else:
+        stmt = sqlite_insert(table).values(name=name, version=1)
+        stmt = stmt.on_conflict_do_update(index_elements=["name"], set_={"version": table.c.version + 1})
+    connection.execute(stmt)
+
+
+class OrgTreeCache:
+    """Serialized organisation tree, rebuilt when its cache version changes"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self._cached = {}  # shard -> (version, body)
+        self._listening = False
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.invalidate()
+        app.extensions["org_tree"] = self
+        if not self._listening:
+            self._listen()
+
+    def invalidate(self):
+        with self._lock:
+            self._cached = {}
+
+    def _listen(self):
+        from models.company import Company
+        from models.employee import Employee
+        from models.office import Office
+
+        def changed(mapper, connection, target):
+            # Once per transaction is enough: the counter only has to differ after commit
+            session = Session.object_session(target)
+            if session is None or not session.info.get("org_tree_bumped"):
+                bump(connection)
+                if session is not None:
+                    session.info["org_tree_bumped"] = True
+
+        for model in (Company, Office, Employee):
+            for name in ("after_insert", "after_update", "after_delete"):
+                event.listen(model, name, changed)
+
+        @event.listens_for(Session, "after_commit")
+        def committed(session):
+            session.info.pop("org_tree_bumped", None)
+
+        @event.listens_for(Session, "after_rollback")
+        def rolled_back(session):
+            session.info.pop("org_tree_bumped", None)
+
+        self._listening = True
+
+    def version(self, session):
+        from models.cache_version import CacheVersion
+        from models.company import Company
+        from models.office import Office
+
+        stmt = select(CacheVersion.version).where(CacheVersion.name == CACHE_NAME)
+        main = session.connection(bind_arguments={"mapper": Company})
+        local = session.connection(bind_arguments={"mapper": Office})
+        version = main.execute(stmt).scalar() or 0
+        if local.engine is not main.engine:
+            # Both counters only grow, so their sum moves whenever either does
+            version += local.execute(stmt).scalar() or 0
+        return version
+
+    def get(self, session, version=None):
+        """(version, JSON body) of the tree at version (read now when not given)"""
+        # The version is read first: a tree built after it is at least that new
+        if version is None:
+            version = self.version(session)
+        shard = current_shard()
+        with self._lock:
+            cached = self._cached.get(shard)
+        if cached is not None and cached[0] == version:
+            return cached
+        body = json.dumps({"version": version, "companies": build_tree(session)},
+                          ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        with self._lock:
+            if shard not in self._cached or self._cached[shard][0] <= version:
+                self._cached[shard] = (version, body)
+        return version, body
+
+
+def build_tree(session):
+    """Companies with their offices and each office's employees"""
+    from models.company import Company
+    from models.employee import Employee
+    from models.office import Office
+
+    companies = [
+        {"id": row.id, "name": row.name, "registration_number": row.registration_number,
+         "address": row.address, "phone": row.phone, "email": row.email, "offices": []}
+        for row in session.execute(select(
+            Company.id, Company.name, Company.registration_number, Company.address, Company.phone, Company.email
+        ).order_by(Company.id))
+    ]
+    by_company = {company["id"]: company for company in companies}
+
+    offices = {}
+    for row in session.execute(select(
+        Office.id, Office.company_id, Office.name, Office.address, Office.city, Office.country,
+        Office.phone, Office.email, Office.latitude, Office.longitude,
+    ).order_by(Office.company_id, Office.id)):
+        company = by_company.get(row.company_id)
+        if company is None:
+            continue
+        office = {
+            "id": row.id, "name": row.name, "address": row.address, "city": row.city, "country": row.country,
+            "phone": row.phone, "email": row.email, "latitude": row.latitude, "longitude": row.longitude,
+            "employees": [],
+        }
+        offices[row.id] = office
+        company["offices"].append(office)
+
+    for row in session.execute(select(
+        Employee.id, Employee.office_id, Employee.first_name, Employee.last_name,
+        Employee.phone, Employee.hire_date, Employee.is_active,
+    ).order_by(Employee.office_id, Employee.last_name, Employee.first_name, Employee.id)):
+        office = offices.get(row.office_id)
+        if office is not None:
+            office["employees"].append({
+                "id": row.id, "first_name": row.first_name, "last_name": row.last_name, "phone": row.phone,
+                "hire_date": row.hire_date.isoformat() if row.hire_date else None, "is_active": row.is_active,
+            })
+    return companies
+
+
+org_tree = OrgTreeCache()
@@ -0,0 +1,42 @@
+import math
+import re
+
+# Parcel size: parse free-text dimensions ("30x40x50", cm) into numbers
+# and turn min_/max_ query params into SQL range filters
+
+DIMENSIONS_RE = re.compile(
+    r"^\s*(\d+(?:[.,]\d+)?)\s*[x×хX*]\s*(\d+(?:[.,]\d+)?)\s*[x×хX*]\s*(\d+(?:[.,]\d+)?)\s*(?:cm|см)?\s*$"
+)
+
+# Columns filterable with min_<name> / max_<name>
+SIZE_FIELDS = ("weight", "length", "width", "height", "volume")
+
+
+def parse_dimensions(text):
+    """(length, width, height) in cm from a string like "30x40x50"; raises ValueError"""
+    match = DIMENSIONS_RE.match(text or "") if isinstance(text, str) else None
+    if not match:
+        raise ValueError("dimensions must look like 30x40x50 (cm)")
+    return tuple(float(part.replace(",", ".")) for part in match.groups())
+
+
+def size_filters(args, model):
+    """
+    SQL conditions for min_weight, max_volume, ... in request args (Flask or Starlette)
+    Raises ValueError for non-numeric values (nan and inf included)
+    """
+    conditions = []
+    for name in SIZE_FIELDS:
+        column = getattr(model, name)
+        for prefix, compare in (("min_", column.__ge__), ("max_", column.__le__)):
+            value = args.get(prefix + name)
+            if value in (None, ""):
+                continue
+            try:
+                number = float(value)
+            except ValueError:
+                number = math.nan
+            if not math.isfinite(number):
+                raise ValueError(f"{prefix}{name} must be a number")
+            conditions.append(compare(number))
+    return conditions
@@ -0,0 +1,138 @@
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+from werkzeug.security import generate_password_hash, check_password_hash
+
+# Password hashing offloaded from request threads
+# Hashing runs in a bounded process pool so a login storm cannot pin every
+# web worker's CPU. Requests beyond the queue limit are rejected immediately.
+
+# bcrypt only looks at the first 72 bytes of a password
+BCRYPT_MAX_BYTES = 72
+
+
+class PasswordHasherBusy(Exception):
+    """Raised when the hashing queue is full or a job did not finish in time"""
+
+
+def hash_password(password, method, rounds):
+    """Hash a password with the given method (runs inside a pool worker)"""
+    if method == "bcrypt":
+        salt = bcrypt.gensalt(rounds=rounds)
+        return bcrypt.hashpw(password.encode("utf-8")[:BCRYPT_MAX_BYTES], salt).decode("ascii")
+    return generate_password_hash(password, method=method)
+
+
+def verify_password(password_hash, password):
+    """Check a password against a bcrypt or werkzeug hash (runs inside a pool worker)"""
+    if not password_hash or password is None:
+        return False
+    if password_hash.startswith("$2"):
+        try:
+            return bcrypt.checkpw(password.encode("utf-8")[:BCRYPT_MAX_BYTES], password_hash.encode("ascii"))
+        except ValueError:
+            return False
+    return check_password_hash(password_hash, password)
+
+
+def _hash_prefix(password_hash):
+    # werkzeug: "scrypt:32768:8:1$salt$hash", bcrypt: "$2b$12$..."
+    if password_hash.startswith("$2"):
+        return "bcrypt:" + password_hash.split("$")[2]
+    return password_hash.split("$", 1)[0]
+
+
+class PasswordHasher:
+    """
+    Process pool for password hashing with a queue-depth limit
+    Configured from PASSWORD_HASH_* settings; 0 workers hashes inline
+    """
+
+    def __init__(self, app=None):
+        self.method = "scrypt"
+        self.rounds = 12
+        self.workers = 0
+        self.queue_limit = 0
+        self.timeout = 10.0
+        self._executor = None
+        self._slots = None
+        self._lock = threading.Lock()
+        self._expected_prefix = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get("PASSWORD_HASH_METHOD", "scrypt")
+        self.rounds = int(app.config.get("BCRYPT_ROUNDS", 12))
+        self.workers = int(app.config.get("PASSWORD_HASH_WORKERS", 0))
+        self.queue_limit = int(app.config.get("PASSWORD_HASH_QUEUE_LIMIT", 0)) or self.workers * 8
+        self.timeout = float(app.config.get("PASSWORD_HASH_TIMEOUT", 10))
+        self._expected_prefix = None
+        self.shutdown()
+        app.extensions["password_hasher"] = self
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+                self._slots = threading.BoundedSemaphore(self.queue_limit)
+            return self._executor
+
+    def shutdown(self):
+        """Stop the pool (it is recreated lazily on next use)"""
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+            self._slots = None
+
+    def prestart(self):
+        """Spawn the pool processes ahead of the first login"""
+        if self.workers > 0:
+            executor = self._get_executor()
+            for future in [executor.submit(int) for _ in range(self.workers)]:
+                future.result()
+
+    def after_fork(self):
+        """Forget a pool inherited from the parent process (it belongs to the parent)"""
+        self._lock = threading.Lock()
+        self._executor = None
+        self._slots = None
+
+    def _run(self, fn, *args):
+        if self.workers <= 0:
+            return fn(*args)
+
+        executor = self._get_executor()
+        slots = self._slots
+        # Fail fast instead of queueing behind a login storm
+        if not slots.acquire(blocking=False):
+            raise PasswordHasherBusy("Password hashing queue is full")
+        try:
+            future = executor.submit(fn, *args)
+        except Exception:
+            slots.release()
+            raise
+        future.add_done_callback(lambda _: slots.release())
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            future.cancel()
+            raise PasswordHasherBusy("Password hashing timed out")
+
+    def hash(self, password):
+        return self._run(hash_password, password, self.method, self.rounds)
+
+    def verify(self, password_hash, password):
+        return self._run(verify_password, password_hash, password)
+
+    def needs_rehash(self, password_hash):
+        """True when the hash was made with a different algorithm or cost than configured"""
+        if self._expected_prefix is None:
+            if self.method == "bcrypt":
+                self._expected_prefix = f"bcrypt:{self.rounds:02d}"
+            else:
+                # werkzeug normalizes e.g. "scrypt" to "scrypt:32768:8:1"
+                self._expected_prefix = _hash_prefix(generate_password_hash("", method=self.method))
+        return _hash_prefix(password_hash) != self._expected_prefix
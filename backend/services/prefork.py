@@ -0,0 +1,108 @@
+import logging
+import time
+
+from flask_jwt_extended import create_access_token
+
+from extensions import db, password_hasher
+from services.report_jobs import report_jobs
+from services.purge import purge_jobs
+from services.idempotency import idempotency
+from services.admission import admission
+from services.contact_buffer import contact_buffer
+from services.sharding import shards
+
+# Pre-fork serving (gunicorn.conf.py)
+# The app is built once in the master and forked into the workers, so
+# create_app() must not open connections or start pools. Each worker drops
+# the pool state it inherited, then warms up before it accepts traffic.
+
+logger = logging.getLogger(__name__)
+
+# (role, method, path, json body) replayed through the app on warm-up.
+# Identity 0 matches no rows, so the requests read nothing and write nothing;
+# they still route, decode JWTs, render templates and compile the same SQL
+# as real traffic (SQLAlchemy caches compiled statements per engine).
+WARMUP_REQUESTS = (
+    (None, "GET", "/login.html", None),
+    (None, "GET", "/register.html", None),
+    (None, "GET", "/shipments.html", None),
+    (None, "GET", "/dashboard.html", None),
+    (None, "GET", "/api/health", None),
+    (None, "POST", "/api/auth/login", {"email": "warmup@invalid", "password": ""}),
+    (None, "GET", "/api/shipment/track/WARMUP", None),
+    ("CLIENT", "GET", "/api/client/me", None),
+    ("CLIENT", "GET", "/api/shipment", None),
+    ("CLIENT", "GET", "/api/shipment/0", None),
+    ("CLIENT", "GET", "/api/office/nearest?lat=0&lon=0", None),
+    ("EMPLOYEE", "GET", "/api/client/0", None),
+    ("EMPLOYEE", "GET", "/api/client/search?q=warmup", None),
+    ("EMPLOYEE", "GET", "/api/shipment/search?q=warmup", None),
+)
+
+
+def after_fork(app):
+    """Reset per-process state inherited from the master"""
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: the sockets belong to the master, only forget them here
+            engine.dispose(close=False)
+    password_hasher.after_fork()
+    report_jobs.after_fork()
+    purge_jobs.after_fork()
+    idempotency.after_fork()
+    admission.after_fork()
+    contact_buffer.after_fork()
+    shards.after_fork()
+
+
+def _open_connections(app):
+    wanted = int(app.config.get("WARMUP_DB_CONNECTIONS", 4))
+    for engine in db.engines.values():
+        size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+        connections = []
+        try:
+            for _ in range(min(wanted, size)):
+                connection = engine.connect()
+                connection.exec_driver_sql("SELECT 1")
+                connections.append(connection)
+        finally:
+            # Back to the pool, where they stay open for the first requests
+            for connection in connections:
+                connection.close()
+
+
+def _replay_requests(app):
+    client = app.test_client()
+    tokens = {
+        role: create_access_token(identity="0", additional_claims={"role": role})
+        for role in ("CLIENT", "EMPLOYEE")
+    }
+    for role, method, path, body in WARMUP_REQUESTS:
+        headers = {"Authorization": f"Bearer {tokens[role]}"} if role else {}
+        response = client.open(path, method=method, json=body, headers=headers)
+        if response.status_code >= 500:
+            logger.warning("Warm-up request %s %s returned %s", method, path, response.status_code)
+
+
+def warm_up(app):
+    """
+    Open pool connections, start the hashing pool and replay the hot routes
+    Returns the time spent per step in milliseconds
+    """
+    timings = {}
+    steps = (
+        ("connections", _open_connections),
+        ("password_pool", lambda app: password_hasher.prestart()),
+        ("requests", _replay_requests),
+    )
+    with app.app_context():
+        for name, step in steps:
+            started = time.perf_counter()
+            try:
+                step(app)
+            except Exception:
+                # A failed warm-up only costs latency; still serve traffic
+                logger.exception("Warm-up step %s failed", name)
+            timings[name] = round((time.perf_counter() - started) * 1000, 1)
+        db.session.remove()
+    return timings
@@ -0,0 +1,328 @@
+import json
+import logging
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, or_, select
+from sqlalchemy.engine import Engine
+
+from extensions import db
+from services.sharding import current as current_shard, shards
+
+# Deleting a company, office or client with everything that depends on it
+# Offices, employees and client counters reference their parent with ON DELETE
+# CASCADE and the ORM relations are passive, so nothing is loaded to delete
+# them. Shipments are the bulk of a tenant and carry counters and search
+# entries, so they never cascade. A purge walks the steps below in order,
+# deleting at most PURGE_BATCH_SIZE rows per transaction (counters, search
+# index and caches updated in the same batch) and pausing PURGE_BATCH_PAUSE
+# seconds in between, so no lock is held for long. Deletions of more than
+# PURGE_SYNC_LIMIT rows run as a background job whose progress is committed
+# with every batch. The parent goes last: a failed or lost job leaves it in
+# place and can simply be started again.
+# An office purge removes the office and its employees but never shipment
+# history: it is refused while its employees have registered shipments (hot
+# or archived), like deleting such an employee. Shipments are only deleted
+# with their company or client.
+# With shards a company is purged on its shard (the company row itself is
+# global), an office or client on the shard of the requesting employee.
+
+TARGETS = ("company", "office", "client")
+
+logger = logging.getLogger(__name__)
+
+
+@event.listens_for(Engine, "connect")
+def _sqlite_foreign_keys(dbapi_connection, connection_record):
+    # SQLite only enforces foreign keys (and runs ON DELETE) when asked, per connection
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.close()
+
+
+def steps(target, target_id):
+    """[(name, model, where clause)] in the order they are deleted"""
+    from models.client import Client
+    from models.company import Company
+    from models.employee import Employee
+    from models.office import Office
+    from models.shipment import Shipment, ShipmentArchive
+
+    if target == "client":
+        return [
+            (model.__tablename__, model, or_(model.sender_id == target_id, model.receiver_id == target_id))
+            for model in (Shipment, ShipmentArchive)
+        ] + [("clients", Client, Client.id == target_id)]
+
+    if target == "office":
+        # Refused while the employees have shipments (office_shipment_count)
+        return [
+            ("employees", Employee, Employee.office_id == target_id),
+            ("offices", Office, Office.id == target_id),
+        ]
+
+    employees = select(Employee.id).where(Employee.company_id == target_id)
+    return [
+        (model.__tablename__, model, model.registered_by_employee_id.in_(employees))
+        for model in (Shipment, ShipmentArchive)
+    ] + [
+        ("employees", Employee, Employee.company_id == target_id),
+        ("offices", Office, Office.company_id == target_id),
+        ("companies", Company, Company.id == target_id),
+    ]
+
+
+def office_shipment_count(office_id):
+    """Shipments (hot and archived) registered by the employees of an office"""
+    from models.employee import Employee
+    from models.shipment import Shipment, ShipmentArchive
+
+    employees = select(Employee.id).where(Employee.office_id == office_id)
+    return sum(
+        db.session.execute(
+            select(func.count()).select_from(model).where(model.registered_by_employee_id.in_(employees))
+        ).scalar()
+        for model in (Shipment, ShipmentArchive)
+    )
+
+
+def target_shard(target, target_id):
+    """Shard a purge of this target runs on (None = main database)"""
+    return shards.for_company(target_id) if target == "company" else current_shard()
+
+
+def count_rows(target, target_id):
+    """{step name: rows} a purge would delete"""
+    return {
+        name: db.session.execute(select(func.count()).select_from(model).where(where)).scalar()
+        for name, model, where in steps(target, target_id)
+    }
+
+
+def _forget(key, ids):
+    # Picked up by the after-commit handlers of the in-process caches
+    db.session.info.setdefault(key, {}).update(dict.fromkeys(ids))
+
+
+def delete_batch(name, model, where, batch_size):
+    """Delete up to batch_size rows of one step (not committed); returns the number deleted"""
+    from services import client_stats, throughput
+    from services.org_tree import bump
+    from services.shipment_search import remove_from_search_index
+
+    # The database the step deletes from (companies are global, the rest may be on a shard)
+    connection = db.session.connection(bind_arguments={"mapper": model})
+    if name in ("shipments", "shipments_archive"):
+        shipments = db.session.execute(
+            select(model.id, model.sender_id, model.receiver_id, model.status, model.price, model.office_id,
+                   model.created_at, model.sent_date, model.received_date)
+            .where(where).order_by(model.id).limit(batch_size)
+        ).all()
+        ids = [shipment.id for shipment in shipments]
+        if not ids:
+            return 0
+        # Counters cover the archive too (see reconcile/rebuild)
+        client_stats.apply_removals(connection, shipments)
+        throughput.apply_removals(connection, shipments)
+        if name == "shipments":
+            remove_from_search_index(ids)
+    else:
+        ids = db.session.execute(select(model.id).where(where).order_by(model.id).limit(batch_size)).scalars().all()
+        if not ids:
+            return 0
+        if name == "clients":
+            _forget("client_search_changes", ids)
+        else:
+            bump(connection)
+        if name == "employees":
+            _forget("employee_directory_changes", ids)
+        elif name == "offices":
+            _forget("office_locator_changes", ids)
+    db.session.execute(delete(model.__table__).where(model.__table__.c.id.in_(ids)))
+    return len(ids)
+
+
+def run_purge(target, target_id, batch_size=500, pause=0.0, on_batch=None):
+    """
+    Delete the target and its dependent rows batch by batch, committing each one
+    on_batch(step name, rows) runs before every commit. Returns {step name: rows deleted}
+    """
+    if target not in TARGETS:
+        raise ValueError(f"target must be one of: {', '.join(TARGETS)}")
+    deleted = {}
+    for name, model, where in steps(target, target_id):
+        while True:
+            try:
+                count = delete_batch(name, model, where, batch_size)
+                if count and on_batch is not None:
+                    on_batch(name, count)
+                db.session.commit()
+            except Exception:
+                db.session.rollback()
+                raise
+            if not count:
+                break
+            deleted[name] = deleted.get(name, 0) + count
+            if count < batch_size:
+                break
+            # Throttle so replicas and concurrent writers keep up
+            if pause:
+                time.sleep(pause)
+    return deleted
+
+
+class PurgeJobQueue:
+    """Background purge jobs in a local thread pool (no external broker)"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.workers = 1
+        self.batch_size = 500
+        self.pause = 0.2
+        self.sync_limit = 1000
+        self.stale_after = timedelta(minutes=5)
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.workers = int(app.config.get("PURGE_WORKERS", 1))
+        self.batch_size = int(app.config.get("PURGE_BATCH_SIZE", 500))
+        self.pause = float(app.config.get("PURGE_BATCH_PAUSE", 0.2))
+        self.sync_limit = int(app.config.get("PURGE_SYNC_LIMIT", 1000))
+        self.stale_after = timedelta(seconds=float(app.config.get("PURGE_STALE_AFTER", 300)))
+        app.extensions["purge_jobs"] = self
+        app.cli.add_command(purge_command)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="purge-job")
+            return self._executor
+
+    def after_fork(self):
+        """Worker threads do not survive fork; start a fresh pool on next use"""
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def submit(self, target, target_id, user_id):
+        """
+        Delete a target: inline when it is small, else as a background job
+        Returns (job, created); an inline job comes back DONE or FAILED
+        """
+        from models.purge_job import PurgeJob
+
+        if target not in TARGETS:
+            raise ValueError(f"target must be one of: {', '.join(TARGETS)}")
+        with self._lock:
+            shard = target_shard(target, target_id)
+            existing = PurgeJob.query.filter(
+                PurgeJob.target == target,
+                PurgeJob.target_id == target_id,
+                PurgeJob.shard == shard,
+                PurgeJob.status.in_(("QUEUED", "RUNNING")),
+                PurgeJob.updated_at >= datetime.utcnow() - self.stale_after,
+            ).first()
+            if existing:
+                return existing, False
+
+            with shards.use(shard):
+                counts = count_rows(target, target_id)
+            job = PurgeJob(
+                id=uuid.uuid4().hex,
+                target=target,
+                target_id=target_id,
+                shard=shard,
+                status="QUEUED",
+                requested_by_user_id=user_id,
+                total_rows=sum(counts.values()),
+                deleted_rows=0,
+            )
+            db.session.add(job)
+            db.session.commit()
+
+        if job.total_rows <= self.sync_limit:
+            self._execute(job.id, pause=0)
+            db.session.refresh(job)
+        else:
+            self._get_executor().submit(self._run, job.id)
+        return job, True
+
+    def _run(self, job_id):
+        with self.app.app_context():
+            try:
+                self._execute(job_id, self.pause)
+            finally:
+                db.session.remove()
+
+    def _execute(self, job_id, pause):
+        from models.purge_job import PurgeJob
+
+        job = db.session.get(PurgeJob, job_id)
+        deleted = {}
+
+        def record(name, count):
+            # Committed together with the batch it describes
+            deleted[name] = deleted.get(name, 0) + count
+            job.deleted_rows = sum(deleted.values())
+            job.progress = json.dumps(deleted)
+
+        try:
+            job.status = "RUNNING"
+            job.started_at = datetime.utcnow()
+            db.session.commit()
+            with shards.use(job.shard):
+                run_purge(job.target, job.target_id, self.batch_size, pause, on_batch=record)
+            job.status = "DONE"
+        except Exception as e:
+            db.session.rollback()
+            logger.exception("Purge job %s failed", job_id)
+            job = db.session.get(PurgeJob, job_id)
+            job.status = "FAILED"
+            job.error = str(e)
+        job.finished_at = datetime.utcnow()
+        db.session.commit()
+
+
+@click.command("purge")
+@with_appcontext
+@click.argument("target", type=click.Choice(TARGETS))
+@click.argument("target_id", type=int)
+@click.option("--batch-size", type=int, default=None)
+@click.option("--pause", type=float, default=None, help="Seconds between batches")
+def purge_command(target, target_id, batch_size, pause):
+    """Delete a company or client with all its shipments, or an office without any, in throttled batches"""
+    config = current_app.config
+    shard = target_shard(target, target_id)
+    with shards.use(shard):
+        if target == "office" and office_shipment_count(target_id):
+            raise click.ClickException("The office's employees have registered shipments; move them to another office first")
+        counts = count_rows(target, target_id)
+    click.echo(f"Deleting {sum(counts.values())} rows{f' on shard {shard}' if shard else ''}: {counts}")
+    done = {}
+
+    def progress(name, count):
+        done[name] = done.get(name, 0) + count
+        click.echo(f"  {name}: {done[name]}/{counts[name]}")
+
+    with shards.use(shard):
+        deleted = run_purge(
+            target, target_id,
+            batch_size or int(config.get("PURGE_BATCH_SIZE", 500)),
+            pause if pause is not None else float(config.get("PURGE_BATCH_PAUSE", 0.2)),
+            on_batch=progress,
+        )
+    click.echo(f"Deleted {deleted}")
+
+
+purge_jobs = PurgeJobQueue()
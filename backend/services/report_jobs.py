@@ -0,0 +1,280 @@
+import csv
+import gzip
+import hashlib
+import json
+import logging
+import os
+import threading
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from decimal import Decimal
+
+from sqlalchemy import func
+
+from extensions import db
+from services.sharding import shards
+
+# Asynchronous report jobs
+# Large reports run in a local thread pool instead of a WSGI worker and are
+# written to disk as gzip-compressed NDJSON or CSV. Identical in-flight
+# requests share one job; finished results expire after REPORT_RESULT_TTL_HOURS.
+
+FORMATS = ("ndjson", "csv")
+
+logger = logging.getLogger(__name__)
+
+
+def _date_param(params, name):
+    value = params.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} must be an ISO date")
+
+
+def _int_param(params, name):
+    try:
+        return int(params.get(name))
+    except (TypeError, ValueError):
+        raise ValueError(f"{name} is required and must be a number")
+
+
+def _shipment_rows(filters, params, hot_only=False):
+    from models.shipment import Shipment
+    from services.archival import report_models
+
+    start_date = datetime.fromisoformat(params["start_date"]) if params.get("start_date") else None
+    end_date = datetime.fromisoformat(params["end_date"]) if params.get("end_date") else None
+    # One database after the other; ids repeat across shards, so rows say where they are from
+    for shard in shards.all():
+        with shards.use(shard):
+            for model in (Shipment,) if hot_only else report_models(start_date):
+                query = model.query.filter(*filters(model))
+                if start_date:
+                    query = query.filter(model.sent_date >= start_date)
+                if end_date:
+                    query = query.filter(model.sent_date <= end_date)
+                # Stream rows instead of loading the whole table; populate_existing
+                # so an id already seen on another shard is not served from the identity map
+                for shipment in query.order_by(model.id).populate_existing().yield_per(1000):
+                    row = shipment.to_dict()
+                    if shards.shards:
+                        row["shard"] = shard
+                    yield row
+
+
+def _revenue_rows(params):
+    """Delivered shipment count and revenue per month"""
+    start_date = datetime.fromisoformat(params["start_date"]) if params.get("start_date") else None
+    end_date = datetime.fromisoformat(params["end_date"]) if params.get("end_date") else None
+    totals = {}
+    # Every database in parallel, merged by month
+    for part in shards.fan_out(_monthly_revenue, start_date, end_date):
+        for key, (count, revenue) in part.items():
+            previous_count, previous_revenue = totals.get(key, (0, Decimal("0")))
+            totals[key] = (previous_count + count, previous_revenue + revenue)
+    for (row_year, row_month), (count, revenue) in sorted(totals.items()):
+        yield {"year": row_year, "month": row_month, "shipment_count": count, "revenue": str(revenue)}
+
+
+def _monthly_revenue(start_date, end_date):
+    """{(year, month): (count, revenue)} of delivered shipments in one database"""
+    from services.archival import report_models
+
+    totals = {}
+    for model in report_models(start_date):
+        year = func.extract("year", model.sent_date)
+        month = func.extract("month", model.sent_date)
+        query = db.session.query(year, month, func.count(model.id), func.coalesce(func.sum(model.price), 0)).filter(
+            model.status == "DELIVERED"
+        )
+        if start_date:
+            query = query.filter(model.sent_date >= start_date)
+        if end_date:
+            query = query.filter(model.sent_date <= end_date)
+        for row_year, row_month, count, revenue in query.group_by(year, month):
+            key = (int(row_year), int(row_month))
+            previous_count, previous_revenue = totals.get(key, (0, Decimal("0")))
+            totals[key] = (previous_count + count, previous_revenue + Decimal(str(revenue)))
+    return totals
+
+
+# report name -> (params normalizer, row generator)
+REPORTS = {
+    "all_shipments": (
+        lambda p: {"start_date": _date_param(p, "start_date"), "end_date": _date_param(p, "end_date")},
+        lambda p: _shipment_rows(lambda model: [], p),
+    ),
+    "by_employee": (
+        lambda p: {"employee_id": _int_param(p, "employee_id"),
+                   "start_date": _date_param(p, "start_date"), "end_date": _date_param(p, "end_date")},
+        lambda p: _shipment_rows(lambda model: [model.registered_by_employee_id == p["employee_id"]], p),
+    ),
+    "by_sender": (
+        lambda p: {"client_id": _int_param(p, "client_id"),
+                   "start_date": _date_param(p, "start_date"), "end_date": _date_param(p, "end_date")},
+        lambda p: _shipment_rows(lambda model: [model.sender_id == p["client_id"]], p),
+    ),
+    "by_receiver": (
+        lambda p: {"client_id": _int_param(p, "client_id"),
+                   "start_date": _date_param(p, "start_date"), "end_date": _date_param(p, "end_date")},
+        lambda p: _shipment_rows(lambda model: [model.receiver_id == p["client_id"]], p),
+    ),
+    "undelivered": (
+        lambda p: {},
+        # Same criteria as /api/shipment/reports/undelivered (archived shipments are finished)
+        lambda p: _shipment_rows(lambda model: [
+            model.sent_date.isnot(None), model.received_date.is_(None), model.status != "CANCELLED"
+        ], p, hot_only=True),
+    ),
+    "revenue": (
+        lambda p: {"start_date": _date_param(p, "start_date"), "end_date": _date_param(p, "end_date")},
+        _revenue_rows,
+    ),
+}
+
+
+def write_rows(path, rows, fmt):
+    """Write rows to a gzip file atomically; returns the row count"""
+    tmp_path = path + ".tmp"
+    count = 0
+    with gzip.open(tmp_path, "wt", encoding="utf-8", newline="") as out:
+        writer = None
+        for row in rows:
+            if fmt == "csv":
+                if writer is None:
+                    writer = csv.DictWriter(out, fieldnames=list(row.keys()), extrasaction="ignore")
+                    writer.writeheader()
+                writer.writerow(row)
+            else:
+                out.write(json.dumps(row, ensure_ascii=False))
+                out.write("\n")
+            count += 1
+    os.replace(tmp_path, path)
+    return count
+
+
+class ReportJobQueue:
+    """Local worker pool for report jobs (no external broker)"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.results_dir = None
+        self.workers = 2
+        self.ttl = timedelta(hours=24)
+        self.job_timeout = timedelta(hours=1)
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.results_dir = app.config.get("REPORT_RESULTS_DIR") or os.path.join(app.instance_path, "reports")
+        self.workers = int(app.config.get("REPORT_WORKERS", 2))
+        self.ttl = timedelta(hours=float(app.config.get("REPORT_RESULT_TTL_HOURS", 24)))
+        self.job_timeout = timedelta(seconds=float(app.config.get("REPORT_JOB_TIMEOUT", 3600)))
+        app.extensions["report_jobs"] = self
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                os.makedirs(self.results_dir, exist_ok=True)
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="report-job")
+            return self._executor
+
+    def after_fork(self):
+        """Worker threads do not survive fork; start a fresh pool on next use"""
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def result_path(self, job):
+        return os.path.join(self.results_dir, f"{job.id}.{job.format}.gz")
+
+    def submit(self, report, raw_params, fmt, user_id):
+        """
+        Queue a report, or return the identical job already in flight
+        Returns (job, created)
+        """
+        from models.report_job import ReportJob
+
+        if report not in REPORTS:
+            raise ValueError(f"report must be one of: {', '.join(REPORTS)}")
+        if fmt not in FORMATS:
+            raise ValueError(f"format must be one of: {', '.join(FORMATS)}")
+        params = REPORTS[report][0](raw_params or {})
+        params_json = json.dumps(params, sort_keys=True)
+        dedupe_key = hashlib.sha256(f"{report}|{fmt}|{params_json}".encode("utf-8")).hexdigest()
+
+        self.expire()
+        with self._lock:
+            # Jobs older than the timeout are treated as lost (e.g. worker restarted)
+            existing = ReportJob.query.filter(
+                ReportJob.dedupe_key == dedupe_key,
+                ReportJob.status.in_(("QUEUED", "RUNNING")),
+                ReportJob.created_at >= datetime.utcnow() - self.job_timeout,
+            ).first()
+            if existing:
+                return existing, False
+
+            job = ReportJob(
+                id=uuid.uuid4().hex,
+                report=report,
+                params=params_json,
+                format=fmt,
+                dedupe_key=dedupe_key,
+                status="QUEUED",
+                requested_by_user_id=user_id,
+            )
+            db.session.add(job)
+            db.session.commit()
+
+        self._get_executor().submit(self._run, job.id)
+        return job, True
+
+    def _run(self, job_id):
+        from models.report_job import ReportJob
+
+        with self.app.app_context():
+            job = db.session.get(ReportJob, job_id)
+            try:
+                job.status = "RUNNING"
+                job.started_at = datetime.utcnow()
+                db.session.commit()
+
+                path = self.result_path(job)
+                rows = REPORTS[job.report][1](json.loads(job.params))
+                job.row_count = write_rows(path, rows, job.format)
+                job.result_size = os.path.getsize(path)
+                job.status = "DONE"
+            except Exception as e:
+                db.session.rollback()
+                logger.exception("Report job %s failed", job_id)
+                job = db.session.get(ReportJob, job_id)
+                job.status = "FAILED"
+                job.error = str(e)
+            job.finished_at = datetime.utcnow()
+            job.expires_at = job.finished_at + self.ttl
+            db.session.commit()
+            db.session.remove()
+
+    def expire(self):
+        """Delete expired job rows and their result files"""
+        from models.report_job import ReportJob
+
+        expired = ReportJob.query.filter(ReportJob.expires_at < datetime.utcnow()).all()
+        for job in expired:
+            try:
+                os.remove(self.result_path(job))
+            except FileNotFoundError:
+                pass
+            db.session.delete(job)
+        if expired:
+            db.session.commit()
+        return len(expired)
+
+
+report_jobs = ReportJobQueue()
@@ -0,0 +1,216 @@
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from extensions import db
+from services.geocoding import address_key, lookup
+
+# Courier route planning for an office's deliveries
+# Stops are split between couriers by an angular sweep around the office,
+# each courier's tour is built nearest-neighbour first and then improved with
+# 2-opt until the time budget runs out. Distances are great-circle km between
+# geocoded addresses, cached per office and day.
+
+EARTH_RADIUS_KM = 6371.0
+
+
+def haversine_matrix(lat1, lon1, lat2, lon2):
+    """Great-circle distances in km between every (lat1, lon1) and every (lat2, lon2)"""
+    lat1, lon1, lat2, lon2 = (np.radians(np.asarray(a, dtype=np.float64)) for a in (lat1, lon1, lat2, lon2))
+    dlat = lat2[None, :] - lat1[:, None]
+    dlon = lon2[None, :] - lon1[:, None]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1)[:, None] * np.cos(lat2)[None, :] * np.sin(dlon / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+
+
+class DistanceMatrixCache:
+    """
+    Distance matrices per (office, day), extended in place when new stops appear
+    Re-planning after a new pickup only computes the new rows and columns
+    """
+
+    def __init__(self, max_entries=64):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def matrix(self, office_id, day, points):
+        """points: [(key, latitude, longitude)]; returns the distance matrix in that order"""
+        with self._lock:
+            entry = self._entries.pop((office_id, day), None) or {"index": {}, "lat": [], "lon": [], "matrix": np.zeros((0, 0))}
+            self._entries[(office_id, day)] = entry
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+            index = entry["index"]
+            new_points = [(key, lat, lon) for key, lat, lon in dict.fromkeys(points) if key not in index]
+            if new_points:
+                old_size = len(entry["lat"])
+                for key, lat, lon in new_points:
+                    index[key] = len(entry["lat"])
+                    entry["lat"].append(lat)
+                    entry["lon"].append(lon)
+                size = len(entry["lat"])
+                grown = np.empty((size, size))
+                grown[:old_size, :old_size] = entry["matrix"]
+                new_rows = haversine_matrix(entry["lat"][old_size:], entry["lon"][old_size:], entry["lat"], entry["lon"])
+                grown[old_size:, :] = new_rows
+                grown[:, old_size:] = new_rows.T
+                entry["matrix"] = grown
+            positions = np.fromiter((index[key] for key, _, _ in points), dtype=np.intp, count=len(points))
+            return entry["matrix"][np.ix_(positions, positions)]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def sweep_clusters(depot, coordinates, couriers):
+    """Split stop indices into contiguous angular sectors around the depot with equal stop counts"""
+    coordinates = np.asarray(coordinates, dtype=np.float64)
+    angles = np.arctan2(coordinates[:, 0] - depot[0], (coordinates[:, 1] - depot[1]) * np.cos(np.radians(depot[0])))
+    order = np.argsort(angles, kind="stable")
+    return [chunk.tolist() for chunk in np.array_split(order, min(couriers, len(order))) if len(chunk)]
+
+
+def nearest_neighbor_tour(dist, nodes):
+    """Closed tour from the depot (node 0) through nodes, always visiting the closest next"""
+    tour = [0]
+    remaining = np.asarray(nodes, dtype=np.intp)
+    while remaining.size:
+        nearest = int(dist[tour[-1], remaining].argmin())
+        tour.append(int(remaining[nearest]))
+        remaining = np.delete(remaining, nearest)
+    tour.append(0)
+    return tour
+
+
+def two_opt(dist, tour, deadline):
+    """Improve a closed tour with best-improvement 2-opt moves until none is left or the deadline passes"""
+    tour = np.asarray(tour, dtype=np.intp)
+    improved = True
+    while improved and time.monotonic() < deadline:
+        improved = False
+        for i in range(1, len(tour) - 2):
+            # Reversing tour[i..j] replaces edges (a, b) and (c, d) with (a, c) and (b, d)
+            a, b = tour[i - 1], tour[i]
+            c, d = tour[i + 1:-1], tour[i + 2:]
+            delta = dist[a, c] + dist[b, d] - dist[a, b] - dist[c, d]
+            j = int(delta.argmin())
+            if delta[j] < -1e-9:
+                tour[i:i + j + 2] = tour[i:i + j + 2][::-1].copy()
+                improved = True
+            if time.monotonic() >= deadline:
+                break
+    return tour.tolist()
+
+
+def tour_length(dist, tour):
+    tour = np.asarray(tour, dtype=np.intp)
+    return float(dist[tour[:-1], tour[1:]].sum())
+
+
+def plan_routes(dist, depot, coordinates, couriers, time_budget):
+    """
+    dist: matrix over [depot] + stops; coordinates: (lat, lon) per stop
+    Returns [(tour of stop indices, km, km before 2-opt)] per courier
+    """
+    started = time.monotonic()
+    clusters = sweep_clusters(depot, coordinates, couriers)
+    total_stops = sum(len(cluster) for cluster in clusters) or 1
+    routes = []
+    for cluster in clusters:
+        # Matrix node = stop index + 1 (node 0 is the depot)
+        nodes = [stop + 1 for stop in cluster]
+        tour = nearest_neighbor_tour(dist, nodes)
+        constructed = tour_length(dist, tour)
+        # Each courier gets budget in proportion to its stops
+        deadline = started + time_budget * (sum(len(route[0]) for route in routes) + len(cluster)) / total_stops
+        tour = two_opt(dist, tour, deadline)
+        routes.append(([node - 1 for node in tour[1:-1]], tour_length(dist, tour), constructed))
+    return routes
+
+
+def office_deliveries(office, day):
+    """
+    IN_TRANSIT shipments of the office's company (registered by its
+    employees) sent by the end of day and delivered by this office: those
+    whose geocoded destination is closer to it than to the company's other
+    located offices. Shipments sent after the day are not out for it yet.
+    Returns (office coordinates or None, {address: (coordinates, [shipments])}, [not geocoded shipments])
+    """
+    from models.employee import Employee
+    from models.office import Office
+    from models.shipment import Shipment
+
+    if office.latitude is None or office.longitude is None:
+        return None, {}, []
+    located = Office.query.filter(
+        Office.company_id == office.company_id, Office.latitude.isnot(None), Office.longitude.isnot(None)
+    ).all()
+    office_lat = [o.latitude for o in located]
+    office_lon = [o.longitude for o in located]
+    own = located.index(office)
+
+    shipments = db.session.query(Shipment.id, Shipment.tracking_number, Shipment.destination_address).join(
+        Employee, Employee.id == Shipment.registered_by_employee_id
+    ).filter(
+        Shipment.status == "IN_TRANSIT", Employee.company_id == office.company_id,
+        Shipment.sent_date < datetime.combine(day + timedelta(days=1), datetime.min.time()),
+    ).all()
+    destinations = lookup({s.destination_address for s in shipments})
+    stops, not_geocoded = {}, []
+    geocoded = [s for s in shipments if s.destination_address in destinations]
+    for s in shipments:
+        if s.destination_address not in destinations:
+            not_geocoded.append(s)
+    if geocoded:
+        lat, lon = zip(*(destinations[s.destination_address] for s in geocoded))
+        nearest = haversine_matrix(lat, lon, office_lat, office_lon).argmin(axis=1)
+        for s, office_index in zip(geocoded, nearest.tolist()):
+            if office_index == own:
+                stops.setdefault(s.destination_address, (destinations[s.destination_address], []))[1].append(s)
+    return (office.latitude, office.longitude), stops, not_geocoded
+
+
+distance_cache = DistanceMatrixCache()
+
+
+def plan_office_routes(office, day, couriers, time_budget):
+    """Route plan for an office's deliveries; raises ValueError when the office is not geocoded"""
+    depot, stops, not_geocoded = office_deliveries(office, day)
+    if depot is None:
+        raise ValueError("Office has no coordinates")
+
+    addresses = sorted(stops)
+    coordinates = [stops[a][0] for a in addresses]
+    points = [(f"office:{office.id}", *depot)] + [(address_key(a), *c) for a, c in zip(addresses, coordinates)]
+    dist = distance_cache.matrix(office.id, day, points)
+
+    routes = plan_routes(dist, depot, coordinates, couriers, time_budget) if addresses else []
+    return {
+        "office_id": office.id,
+        "date": day.isoformat(),
+        "couriers": [
+            {
+                "courier": number,
+                "distance_km": round(km, 3),
+                "constructed_distance_km": round(constructed, 3),
+                "stops": [
+                    {
+                        "address": addresses[stop],
+                        "latitude": coordinates[stop][0],
+                        "longitude": coordinates[stop][1],
+                        "shipments": [{"id": s.id, "tracking_number": s.tracking_number} for s in stops[addresses[stop]][1]],
+                    }
+                    for stop in tour
+                ],
+            }
+            for number, (tour, km, constructed) in enumerate(routes, start=1)
+        ],
+        "total_distance_km": round(sum(km for _, km, _ in routes), 3),
+        "not_geocoded": [{"id": s.id, "tracking_number": s.tracking_number} for s in not_geocoded],
+    }
@@ -0,0 +1,279 @@
+import contextlib
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextvars import ContextVar
+
+import click
+from flask import current_app, g
+from flask.cli import AppGroup
+from flask_jwt_extended import get_jwt, verify_jwt_in_request
+from flask_jwt_extended.exceptions import JWTExtendedException
+from flask_sqlalchemy.session import Session as FlaskSession
+from jwt.exceptions import PyJWTError
+from sqlalchemy import inspect
+from sqlalchemy.schema import CreateIndex, CreateTable
+from sqlalchemy.sql.util import find_tables
+
+# Horizontal sharding of operational data by company
+# SHARDS names extra databases ("big=mysql+pymysql://.../logistics_big"), added
+# to SQLALCHEMY_BINDS as "shard_<name>", and SHARD_MAP assigns companies to
+# them ("3=big,7=big"); companies not in the map stay in the main database.
+# Users, companies and the bookkeeping tables below live in the main database
+# only; offices, employees, clients, shipments, their counters and the caches
+# (cache_versions, geocoded_addresses) live in the database of their company.
+# A request runs against the shard of the company in its JWT (employees) or
+# the shard claim (clients registered on a shard): the session sends every
+# statement there unless all tables it touches are global. Public tracking
+# looks the number up in every database (locate). Reports cover every database
+# (revenue in parallel through fan_out) and merge the results. Without SHARDS
+# nothing changes. ASGI mode (asgi.py) reads the main database only and
+# refuses to start with SHARDS set.
+# Shard schemas are not managed by alembic: "flask shards create-schema".
+
+GLOBAL_TABLES = frozenset(("users", "companies", "contacts", "report_jobs", "purge_jobs", "idempotency_keys"))
+
+# Active shard name; None is the main database
+_current = ContextVar("shard")
+_pinned = None
+
+
+def bind_key(name):
+    return f"shard_{name}"
+
+
+def current():
+    """Shard the current request or job runs against (None = main database)"""
+    return _current.get(_pinned)
+
+
+def _parse_pairs(value):
+    pairs = {}
+    for item in (value or "").split(","):
+        key, sep, target = item.partition("=")
+        if item.strip():
+            if not sep or not key.strip() or not target.strip():
+                raise ValueError(f"Expected name=value, got {item!r}")
+            pairs[key.strip()] = target.strip()
+    return pairs
+
+
+def _global_only(mapper, clause):
+    tables = []
+    if mapper is not None:
+        tables.append(inspect(mapper).local_table)
+    if clause is not None:
+        tables.extend(find_tables(clause, include_crud=True))
+    return bool(tables) and all(getattr(table, "name", None) in GLOBAL_TABLES for table in tables)
+
+
+class RoutingSession(FlaskSession):
+    """Session that sends statements on sharded tables to the active shard"""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None:
+            name = current()
+            if name is not None and not _global_only(mapper, clause):
+                return self._db.engines[bind_key(name)]
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+class ShardRouter:
+    """Shard map, request routing and parallel fan-out over all databases"""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.shards = {}
+        self.companies = {}
+        self.workers = 4
+        self._executor = None
+        self._lock = threading.Lock()
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        """Must run before db.init_app: registers the shard binds"""
+        global _pinned
+        self.app = app
+        self.shards = _parse_pairs(app.config.get("SHARDS"))
+        companies = _parse_pairs(app.config.get("SHARD_MAP"))
+        unknown = set(companies.values()) - set(self.shards)
+        if unknown:
+            raise ValueError(f"SHARD_MAP uses shards missing from SHARDS: {', '.join(sorted(unknown))}")
+        self.companies = {int(company_id): name for company_id, name in companies.items()}
+        self.workers = int(app.config.get("SHARD_FAN_OUT_WORKERS", 4))
+        pinned = app.config.get("SHARD") or None
+        if pinned is not None and pinned not in self.shards:
+            raise ValueError(f"SHARD {pinned!r} is not in SHARDS")
+        _pinned = pinned
+
+        binds = dict(app.config.get("SQLALCHEMY_BINDS") or {})
+        binds.update({bind_key(name): uri for name, uri in self.shards.items()})
+        app.config["SQLALCHEMY_BINDS"] = binds
+        app.extensions["shards"] = self
+        app.cli.add_command(shards_cli)
+        if self.shards:
+            app.before_request(self._route_request)
+            app.teardown_request(self._end_request)
+
+    def names(self):
+        """Configured shard names (not including the main database)"""
+        return list(self.shards)
+
+    def all(self):
+        """Every database: None (main) first, then the shards"""
+        return [None, *self.shards]
+
+    def for_company(self, company_id):
+        """Shard of a company, None when it lives in the main database"""
+        try:
+            return self.companies.get(int(company_id))
+        except (TypeError, ValueError):
+            return None
+
+    def engine(self, name):
+        from extensions import db
+
+        return db.engines[bind_key(name)] if name is not None else db.engine
+
+    @contextlib.contextmanager
+    def use(self, name):
+        """Run the block against one shard (None = main database)"""
+        if name is not None and name not in self.shards:
+            raise ValueError(f"Unknown shard {name!r}")
+        token = _current.set(name)
+        try:
+            yield
+        finally:
+            _current.reset(token)
+
+    def locate(self, stmt):
+        """(shard, first value) of the first database where stmt finds a row, else (None, None)"""
+        from extensions import db
+
+        for name in self.all():
+            with self.use(name):
+                value = db.session.execute(stmt).scalar()
+            if value is not None:
+                return name, value
+        return None, None
+
+    def _route_request(self):
+        try:
+            if not verify_jwt_in_request(optional=True):
+                return
+        except (JWTExtendedException, PyJWTError):
+            # Left to the view: @jwt_required answers 401, public routes ignore the header
+            return
+        claims = get_jwt()
+        name = claims.get("shard") or self.for_company(claims.get("company_id"))
+        g.shard_token = _current.set(name if name in self.shards else None)
+
+    def _end_request(self, exc=None):
+        token = g.pop("shard_token", None)
+        if token is not None:
+            _current.reset(token)
+
+    def _get_executor(self):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="shard-fan-out")
+            return self._executor
+
+    def after_fork(self):
+        """Worker threads do not survive fork; start a fresh pool on next use"""
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def fan_out(self, fn, *args):
+        """[fn(*args) on every database], run in parallel, main database first"""
+        if not self.shards:
+            return [fn(*args)]
+        app = current_app._get_current_object()
+
+        def run(name):
+            # Own app context, so each thread gets its own session
+            with app.app_context(), self.use(name):
+                return fn(*args)
+
+        return list(self._get_executor().map(run, self.all()))
+
+    def create_schema(self, name):
+        """Create the missing sharded tables in a shard, without foreign keys to global tables"""
+        from extensions import db
+
+        created = []
+        with self.engine(name).begin() as connection:
+            existing = set(inspect(connection).get_table_names())
+            for table in db.metadata.sorted_tables:
+                if table.name in GLOBAL_TABLES or table.name in existing:
+                    continue
+                local = [fk for fk in table.foreign_key_constraints if fk.referred_table.name not in GLOBAL_TABLES]
+                connection.execute(CreateTable(table, include_foreign_key_constraints=local))
+                for index in table.indexes:
+                    connection.execute(CreateIndex(index))
+                # Search index and archive partitions (services/shipment_search.py, archival.py)
+                table.dispatch.after_create(table, connection, checkfirst=False, _ddl_runner=None)
+                created.append(table.name)
+        return created
+
+
+class ShardLocal:
+    """
+    One instance of an in-process cache per database, picked by the active shard
+    Each instance knows its shard (.shard) so its commit listeners only apply
+    changes committed on that shard.
+    """
+
+    def __init__(self, factory):
+        self._factory = factory
+        self._instances = {None: factory()}
+
+    def init_app(self, app):
+        names = app.extensions["shards"].names()
+        for name in names:
+            if name not in self._instances:
+                instance = self._instances[name] = self._factory()
+                instance.shard = name
+        # The main instance last, so it is the one left in app.extensions
+        for name in [*names, None]:
+            self._instances[name].init_app(app)
+
+    def instances(self):
+        return list(self._instances.values())
+
+    def __getattr__(self, name):
+        instances = self.__dict__.get("_instances")
+        if instances is None:
+            raise AttributeError(name)
+        return getattr(instances.get(current(), instances[None]), name)
+
+
+shards = ShardRouter()
+
+
+@click.group("shards", cls=AppGroup)
+def shards_cli():
+    """Database shards (SHARDS, SHARD_MAP)"""
+
+
+@shards_cli.command("list")
+def list_shards_command():
+    """Show the shards and the companies assigned to them"""
+    if not shards.shards:
+        click.echo("No shards configured; everything is in the main database")
+        return
+    for name in shards.names():
+        companies = sorted(company_id for company_id, shard in shards.companies.items() if shard == name)
+        click.echo(f"{name}: {shards.engine(name).url.render_as_string(hide_password=True)} "
+                   f"companies={','.join(map(str, companies)) or '-'}")
+
+
+@shards_cli.command("create-schema")
+@click.argument("name", required=False)
+def create_schema_command(name):
+    """Create the sharded tables in one shard (default: all of them)"""
+    for shard in [name] if name else shards.names():
+        if shard not in shards.shards:
+            raise click.BadParameter(f"Unknown shard {shard!r}")
+        created = shards.create_schema(shard)
+        click.echo(f"{shard}: created {', '.join(created) if created else 'nothing (up to date)'}")
@@ -0,0 +1,148 @@
+import re
+
+import click
+from flask.cli import with_appcontext
+from sqlalchemy import DDL, event, inspect, select, text, union, or_
+
+from extensions import db
+
+# Full-text search over shipments
+# MySQL uses a FULLTEXT index on description + addresses. SQLite keeps an
+# FTS5 shadow table (rowid = shipment id) in sync through Shipment model
+# events. Tracking numbers are prefix-matched through their unique index.
+
+FTS_TABLE = "shipments_fts"
+FTS_COLUMNS = ("description", "origin_address", "destination_address")
+_WORD_RE = re.compile(r"\w+", re.UNICODE)
+
+_SQLITE_CREATE = DDL(
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    f"USING fts5({', '.join(FTS_COLUMNS)}, tokenize='unicode61')"
+)
+_MYSQL_CREATE = DDL(
+    f"CREATE FULLTEXT INDEX ix_shipments_fulltext ON shipments ({', '.join(FTS_COLUMNS)})"
+)
+_listening = False
+
+
+def search_words(query):
+    return _WORD_RE.findall((query or "").lower())
+
+
+def _fts_insert(connection, shipment):
+    connection.execute(
+        text(f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+             "VALUES (:id, :description, :origin_address, :destination_address)"),
+        {"id": shipment.id, **{column: getattr(shipment, column) for column in FTS_COLUMNS}},
+    )
+
+
+def _fts_delete(connection, shipment_id):
+    connection.execute(text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), {"id": shipment_id})
+
+
+def init_app(app):
+    """Create the dialect-specific index with the tables and keep SQLite FTS in sync"""
+    global _listening
+    app.cli.add_command(reindex_shipments_command)
+    if _listening:
+        return
+    _listening = True
+
+    from models.shipment import Shipment
+
+    shipments = Shipment.__table__
+    event.listen(shipments, "after_create", _SQLITE_CREATE.execute_if(dialect="sqlite"))
+    event.listen(shipments, "after_create", _MYSQL_CREATE.execute_if(dialect="mysql"))
+    event.listen(shipments, "before_drop", DDL(f"DROP TABLE IF EXISTS {FTS_TABLE}").execute_if(dialect="sqlite"))
+
+    @event.listens_for(Shipment, "after_insert")
+    def index_inserted(mapper, connection, target):
+        if connection.dialect.name == "sqlite":
+            _fts_insert(connection, target)
+
+    @event.listens_for(Shipment, "after_update")
+    def index_updated(mapper, connection, target):
+        # Status/date updates leave the searchable text untouched
+        state = inspect(target)
+        if not any(state.attrs[column].history.has_changes() for column in FTS_COLUMNS):
+            return
+        if connection.dialect.name == "sqlite":
+            _fts_delete(connection, target.id)
+            _fts_insert(connection, target)
+
+    @event.listens_for(Shipment, "after_delete")
+    def index_deleted(mapper, connection, target):
+        if connection.dialect.name == "sqlite":
+            _fts_delete(connection, target.id)
+
+
+def remove_from_search_index(shipment_ids):
+    """Drop rows deleted in bulk (bypassing model events) from the SQLite FTS table"""
+    connection = db.session.connection()
+    if connection.dialect.name == "sqlite" and shipment_ids:
+        connection.execute(
+            text(f"DELETE FROM {FTS_TABLE} WHERE rowid = :id"), [{"id": shipment_id} for shipment_id in shipment_ids]
+        )
+
+
+def rebuild_search_index():
+    """Refill the SQLite FTS table from shipments (no-op on MySQL, the index is native)"""
+    connection = db.session.connection()
+    if connection.dialect.name != "sqlite":
+        return 0
+    connection.execute(text(f"DELETE FROM {FTS_TABLE}"))
+    result = connection.execute(text(
+        f"INSERT INTO {FTS_TABLE} (rowid, {', '.join(FTS_COLUMNS)}) "
+        f"SELECT id, {', '.join(FTS_COLUMNS)} FROM shipments"
+    ))
+    db.session.commit()
+    return result.rowcount
+
+
+def matching_ids(query):
+    """
+    Selectable of shipment ids matching the search words in the text
+    columns, or whose tracking number starts with the query
+    """
+    from models.shipment import Shipment
+
+    words = search_words(query)
+    dialect = db.session.get_bind().dialect.name
+    prefix = query.strip()
+    pattern = prefix.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+    # The range lets SQLite use the unique index (its LIKE is case-insensitive)
+    by_tracking = select(Shipment.id).where(
+        Shipment.tracking_number >= prefix,
+        Shipment.tracking_number < prefix + "\U0010ffff",
+        Shipment.tracking_number.like(pattern, escape="\\"),
+    )
+    if not words:
+        return by_tracking
+
+    if dialect == "sqlite":
+        # Every word must match as a prefix: "word1"* "word2"*
+        fts_query = " ".join(f'"{word}"*' for word in words)
+        by_text = select(text("rowid")).select_from(text(FTS_TABLE)).where(
+            text(f"{FTS_TABLE} MATCH :fts_query").bindparams(fts_query=fts_query)
+        )
+    elif dialect == "mysql":
+        fts_query = " ".join(f"+{word}*" for word in words)
+        by_text = select(Shipment.id).where(
+            text(f"MATCH ({', '.join(FTS_COLUMNS)}) AGAINST (:fts_query IN BOOLEAN MODE)").bindparams(fts_query=fts_query)
+        )
+    else:
+        # No full-text support: substring match on every word
+        by_text = select(Shipment.id)
+        for word in words:
+            by_text = by_text.where(or_(*(getattr(Shipment, column).ilike(f"%{word}%") for column in FTS_COLUMNS)))
+
+    return union(by_text, by_tracking)
+
+
+@click.command("reindex-shipments")
+@with_appcontext
+def reindex_shipments_command():
+    """Rebuild the SQLite shipment full-text index"""
+    count = rebuild_search_index()
+    click.echo(f"Indexed {count} shipments")
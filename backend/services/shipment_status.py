@@ -0,0 +1,124 @@
+from datetime import datetime
+
+from sqlalchemy import or_, select, tuple_, update
+
+from extensions import db
+from services import client_stats, throughput
+
+# Shipment status transitions
+# PENDING -> IN_TRANSIT -> DELIVERED, and PENDING or IN_TRANSIT -> CANCELLED.
+# A transition is one conditional UPDATE ... WHERE id IN (...) AND status IN
+# (allowed current statuses) [AND version = read version], so nothing is read
+# first and concurrent changes cannot overwrite each other. A batch changes all
+# of its shipments or none. The statement bypasses the ORM events, so the
+# client counters and throughput buckets are moved here from the changed rows.
+
+STATUSES = ("PENDING", "IN_TRANSIT", "DELIVERED", "CANCELLED")
+TRANSITIONS = {
+    "PENDING": ("IN_TRANSIT", "CANCELLED"),
+    "IN_TRANSIT": ("DELIVERED", "CANCELLED"),
+    "DELIVERED": (),
+    "CANCELLED": (),
+}
+# Statuses a shipment can be in to move to each status
+SOURCES = {status: tuple(current for current, targets in TRANSITIONS.items() if status in targets) for status in STATUSES}
+# Read back from the changed rows for the derived tables
+CHANGED_COLUMNS = (
+    "id", "version", "sender_id", "receiver_id", "price", "office_id",
+    "status", "previous_status", "created_at", "sent_date", "received_date",
+)
+NOT_FOUND = "Shipment not found"
+
+
+class StatusConflict(Exception):
+    """Raised when some shipments of a transition are missing, in the wrong status or modified"""
+
+    def __init__(self, conflicts):
+        super().__init__(conflicts[0]["error"] if conflicts else "Shipments were modified by another request")
+        self.conflicts = conflicts
+
+
+def can_transition(current, status):
+    return status in TRANSITIONS.get(current, ())
+
+
+def transition(shipments, status, received_date=None):
+    """
+    Move shipments {id: version read or None} to status in one statement and commit
+    Returns {id: new version}; raises StatusConflict (nothing changed) or ValueError
+    """
+    from models.shipment import Shipment
+
+    if status not in STATUSES:
+        raise ValueError(f"status must be one of {', '.join(STATUSES)}")
+    if not shipments:
+        return {}
+
+    table = Shipment.__table__
+    plain = [shipment_id for shipment_id, version in shipments.items() if version is None]
+    versioned = [(shipment_id, version) for shipment_id, version in shipments.items() if version is not None]
+    matches = []
+    if plain:
+        matches.append(table.c.id.in_(plain))
+    if versioned:
+        matches.append(tuple_(table.c.id, table.c.version).in_(versioned))
+
+    now = datetime.utcnow()
+    # MySQL assigns left to right, so previous_status has to come before status
+    values = [
+        (table.c.previous_status, table.c.status),
+        (table.c.status, status),
+        (table.c.version, table.c.version + 1),
+        (table.c.updated_at, now),
+    ]
+    if status == "DELIVERED":
+        values.append((table.c.received_date, received_date or now))
+    stmt = update(table).where(or_(*matches), table.c.status.in_(SOURCES[status])).ordered_values(*values)
+
+    connection = db.session.connection()
+    columns = [table.c[name] for name in CHANGED_COLUMNS]
+    if connection.dialect.update_returning:
+        changed = connection.execute(stmt.returning(*columns)).all()
+        count = len(changed)
+    else:
+        count = connection.execute(stmt).rowcount
+        changed = None
+    if count < len(shipments):
+        db.session.rollback()
+        raise StatusConflict(_conflicts(shipments, status))
+    if changed is None:
+        # Every listed row was changed (and is locked) by the UPDATE above
+        changed = connection.execute(select(*columns).where(table.c.id.in_(list(shipments)))).all()
+
+    client_stats.apply_status_changes(connection, changed)
+    throughput.apply_status_changes(connection, changed)
+    db.session.commit()
+    return {row.id: row.version for row in changed}
+
+
+def _conflicts(shipments, status):
+    """Why each shipment of a failed transition did not match"""
+    from models.shipment import Shipment
+
+    table = Shipment.__table__
+    current = {
+        row.id: row for row in db.session.execute(
+            select(table.c.id, table.c.status, table.c.version).where(table.c.id.in_(list(shipments)))
+        )
+    }
+    conflicts = []
+    for shipment_id, version in shipments.items():
+        row = current.get(shipment_id)
+        if row is None:
+            conflicts.append({"id": shipment_id, "error": NOT_FOUND})
+        elif row.status not in SOURCES[status]:
+            conflicts.append({
+                "id": shipment_id, "error": f"Cannot change status from {row.status} to {status}",
+                "status": row.status, "version": row.version,
+            })
+        elif version is not None and row.version != version:
+            conflicts.append({
+                "id": shipment_id, "error": "Shipment was modified by another request",
+                "status": row.status, "version": row.version,
+            })
+    return conflicts
@@ -0,0 +1,189 @@
+import json
+import threading
+from decimal import Decimal
+
+import numpy as np
+
+from services.geocoding import place_key
+from services.parcel_size import parse_dimensions
+
+# Tariff engine
+# Price = (base + per_kg * billable weight) * service multiplier, where
+# billable weight is the larger of actual and volumetric weight rounded up to
+# the weight step, and base/per_kg come from a zone x zone matrix precomputed
+# from the lane bands. Batches are priced with NumPy in one pass.
+
+# Default tariff (BGN); TARIFF_FILE points to a JSON file with the same shape
+DEFAULT_TARIFF = {
+    "currency": "BGN",
+    # cm3 per kg
+    "volumetric_divisor": 5000,
+    "weight_step": 0.5,
+    "minimum_charge": 4.5,
+    "zones": {
+        "SOFIA": ["Sofia", "София"],
+        "WEST": ["Pernik", "Перник", "Kyustendil", "Кюстендил", "Blagoevgrad", "Благоевград", "Vratsa", "Враца", "Montana", "Монтана", "Vidin", "Видин"],
+        "SOUTH": ["Plovdiv", "Пловдив", "Stara Zagora", "Стара Загора", "Haskovo", "Хасково", "Pazardzhik", "Пазарджик", "Smolyan", "Смолян", "Kardzhali", "Кърджали"],
+        "NORTH": ["Ruse", "Русе", "Pleven", "Плевен", "Veliko Tarnovo", "Велико Търново", "Gabrovo", "Габрово", "Lovech", "Ловеч", "Targovishte", "Търговище"],
+        "EAST": ["Varna", "Варна", "Burgas", "Бургас", "Shumen", "Шумен", "Dobrich", "Добрич", "Sliven", "Сливен", "Yambol", "Ямбол"],
+    },
+    # Zone used when an address names no known city
+    "default_zone": "NORTH",
+    # Lane band between origin and destination zones (rows/columns in "zones" order)
+    "lanes": [
+        [0, 1, 1, 2, 2],
+        [1, 0, 2, 2, 3],
+        [1, 2, 0, 1, 1],
+        [2, 2, 1, 0, 1],
+        [2, 3, 1, 1, 0],
+    ],
+    # Per band: [base, per kg]
+    "bands": [[4.5, 0.6], [5.5, 0.8], [6.5, 1.0], [7.5, 1.2]],
+    "services": {"ECONOMY": 0.85, "STANDARD": 1.0, "EXPRESS": 1.6},
+    "default_service": "STANDARD",
+}
+
+class TariffEngine:
+    """Zone matrix tariff; loaded from TARIFF_FILE or DEFAULT_TARIFF"""
+
+    def __init__(self, app=None):
+        self._lock = threading.Lock()
+        self.load(DEFAULT_TARIFF)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        path = app.config.get("TARIFF_FILE")
+        if path:
+            with open(path, encoding="utf-8") as f:
+                self.load(json.load(f))
+        app.extensions["tariff_engine"] = self
+
+    def load(self, tariff):
+        zones = list(tariff["zones"])
+        lanes = np.asarray(tariff["lanes"], dtype=np.intp)
+        bands = np.asarray(tariff["bands"], dtype=np.float64)
+        if lanes.shape != (len(zones), len(zones)):
+            raise ValueError("lanes must be a zones x zones matrix")
+        cities = {place_key(city): i for i, zone in enumerate(zones) for city in tariff["zones"][zone]}
+        services = list(tariff["services"])
+        with self._lock:
+            self.currency = tariff.get("currency", "BGN")
+            self.zones = zones
+            self.services = services
+            self.default_service = tariff.get("default_service", services[0])
+            self.default_zone = zones.index(tariff["default_zone"]) if tariff.get("default_zone") else 0
+            self.volumetric_divisor = float(tariff.get("volumetric_divisor", 5000))
+            self.weight_step = float(tariff.get("weight_step", 0.5))
+            self.minimum_charge = float(tariff.get("minimum_charge", 0))
+            self._cities = cities
+            self._service_index = {name: i for i, name in enumerate(services)}
+            self._multipliers = np.asarray([tariff["services"][name] for name in services], dtype=np.float64)
+            # Precomputed zone matrices: base[o, d] and per_kg[o, d]
+            self._base = bands[lanes, 0]
+            self._per_kg = bands[lanes, 1]
+
+    def zone_index(self, place):
+        """Zone of a city name or an address ("Ул. Търговска 10, София")"""
+        if not place:
+            return self.default_zone
+        cities = self._cities
+        key = place_key(place)
+        if key in cities:
+            return cities[key]
+        # Addresses usually end with the city
+        for part in reversed(place.split(",")):
+            key = place_key(part)
+            if key in cities:
+                return cities[key]
+        return self.default_zone
+
+    def service_index(self, service):
+        try:
+            return self._service_index[(service or self.default_service).upper()]
+        except (KeyError, AttributeError):
+            raise ValueError(f"service must be one of: {', '.join(self.services)}")
+
+    def quote_arrays(self, weights, volumes, origins, destinations, services):
+        """
+        Vectorized pricing; all arguments are equal-length arrays
+        (kg, cm3, zone index, zone index, service index). Returns (prices, billable weights)
+        """
+        billable = np.maximum(weights, volumes / self.volumetric_divisor)
+        billable = np.ceil(billable / self.weight_step) * self.weight_step
+        prices = (self._base[origins, destinations] + self._per_kg[origins, destinations] * billable)
+        prices = np.maximum(prices * self._multipliers[services], self.minimum_charge)
+        return np.round(prices, 2), billable
+
+    def quote_parcels(self, parcels, default_service=None):
+        """
+        Price a list of parcel dicts (weight, dimensions, origin, destination, service)
+        Returns one dict per parcel: the quote, or {"error": ...} for invalid input
+        """
+        count = len(parcels)
+        weights = np.zeros(count)
+        volumes = np.zeros(count)
+        origins = np.zeros(count, dtype=np.intp)
+        destinations = np.zeros(count, dtype=np.intp)
+        services = np.zeros(count, dtype=np.intp)
+        errors = {}
+        zone_cache = {}
+
+        def zone(place):
+            if place is not None and not isinstance(place, str):
+                raise ValueError("origin and destination must be city names or addresses")
+            if place not in zone_cache:
+                zone_cache[place] = self.zone_index(place)
+            return zone_cache[place]
+
+        # Parsing is per row; the pricing itself is one vectorized pass
+        for i, parcel in enumerate(parcels):
+            try:
+                if not isinstance(parcel, dict):
+                    raise ValueError("parcel must be an object")
+                try:
+                    weight = float(parcel.get("weight"))
+                except (TypeError, ValueError):
+                    raise ValueError("weight must be a number")
+                if not 0 <= weight < float("inf"):
+                    raise ValueError("weight must be a non-negative number")
+                length, width, height = parse_dimensions(parcel.get("dimensions"))
+                weights[i] = weight
+                volumes[i] = length * width * height
+                origins[i] = zone(parcel.get("origin"))
+                destinations[i] = zone(parcel.get("destination"))
+                services[i] = self.service_index(parcel.get("service") or default_service)
+            except ValueError as e:
+                errors[i] = str(e)
+
+        prices, billable = self.quote_arrays(weights, volumes, origins, destinations, services)
+        zones = self.zones
+        service_names = self.services
+        quotes = []
+        for i, (price, weight, origin, destination, service) in enumerate(zip(
+            prices.tolist(), billable.tolist(), origins.tolist(), destinations.tolist(), services.tolist()
+        )):
+            if i in errors:
+                quotes.append({"error": errors[i]})
+            else:
+                quotes.append({
+                    "price": f"{price:.2f}",
+                    "billable_weight": weight,
+                    "origin_zone": zones[origin],
+                    "destination_zone": zones[destination],
+                    "service": service_names[service],
+                })
+        return quotes
+
+    def price(self, weight, dimensions, origin, destination, service=None):
+        """Price of one parcel as a Decimal; raises ValueError for invalid input"""
+        quote = self.quote_parcels([{
+            "weight": weight, "dimensions": dimensions, "origin": origin,
+            "destination": destination, "service": service,
+        }])[0]
+        if "error" in quote:
+            raise ValueError(quote["error"])
+        return Decimal(quote["price"])
+
+
+tariff_engine = TariffEngine()
@@ -0,0 +1,241 @@
+import re
+from datetime import datetime, timezone
+
+import click
+import numpy as np
+from flask.cli import with_appcontext
+from sqlalchemy import delete, event, func, inspect, select
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from extensions import db
+
+# Shipment throughput buckets (shipment_throughput)
+# Every shipment counts once per event (CREATED at created_at, SENT at
+# sent_date, DELIVERED at received_date once delivered) in a minute, an hour
+# and a day bucket, keyed by office and current status. ORM writes apply their
+# deltas on the same connection, like services/client_stats.py; bulk
+# statements bypass them (status transitions call apply_status_changes) and
+# "flask rebuild-throughput" recounts everything.
+# Coarser resolutions (15m, 6h, 7d) are resampled from the stored ones with NumPy.
+
+RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+EVENTS = {"CREATED": "created_count", "SENT": "sent_count", "DELIVERED": "delivered_count"}
+GROUPS = ("office", "status")
+RESOLUTION_RE = re.compile(r"^(\d+)\s*([mhd])$")
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400}
+EPOCH = datetime(1970, 1, 1)
+_listening = False
+
+
+def parse_resolution(value):
+    """Bucket width in seconds from "minute"/"hour"/"day" or "<n>m", "<n>h", "<n>d" """
+    if value in RESOLUTIONS:
+        return RESOLUTIONS[value]
+    match = RESOLUTION_RE.match((value or "").strip().lower())
+    if not match or int(match.group(1)) < 1:
+        raise ValueError("resolution must be minute, hour, day or a multiple like 15m, 6h, 7d")
+    return int(match.group(1)) * UNIT_SECONDS[match.group(2)]
+
+
+def stored_resolution(seconds):
+    """Coarsest stored resolution that a bucket of this width is made of"""
+    for name in ("day", "hour", "minute"):
+        if seconds % RESOLUTIONS[name] == 0:
+            return name
+
+
+def epoch_seconds(at):
+    if at.tzinfo is not None:
+        # Stored dates are naive UTC
+        at = at.astimezone(timezone.utc).replace(tzinfo=None)
+    return int((at - EPOCH).total_seconds())
+
+
+def bucket_start(at, seconds):
+    """Start (Unix seconds) of the bucket holding datetime at; buckets are aligned to the epoch (UTC)"""
+    return epoch_seconds(at) // seconds * seconds
+
+
+def contributions(office_id, status, created_at, sent_date, received_date, sign=1):
+    """{(resolution, bucket start, office id, status): {column: count}} that one shipment adds"""
+    deltas = {}
+    delivered_at = received_date if status == "DELIVERED" else None
+    for name, at in (("CREATED", created_at), ("SENT", sent_date), ("DELIVERED", delivered_at)):
+        if at is None:
+            continue
+        for resolution, seconds in RESOLUTIONS.items():
+            row = deltas.setdefault((resolution, bucket_start(at, seconds), office_id or 0, status), {})
+            row[EVENTS[name]] = row.get(EVENTS[name], 0) + sign
+    return deltas
+
+
+def _merge(deltas, more):
+    for key, columns in more.items():
+        row = deltas.setdefault(key, {})
+        for column, count in columns.items():
+            row[column] = row.get(column, 0) + count
+    return deltas
+
+
+def _rows(deltas):
+    return [
+        dict({column: columns.get(column, 0) for column in EVENTS.values()},
+             resolution=key[0], bucket_start=key[1], office_id=key[2], status=key[3])
+        for key, columns in deltas.items() if any(columns.values())
+    ]
+
+
+def apply_deltas(connection, deltas):
+    """Add the counts to their buckets, creating missing ones (one upsert statement)"""
+    from models.shipment_throughput import ShipmentThroughput
+
+    rows = _rows(deltas)
+    if not rows:
+        return
+    table = ShipmentThroughput.__table__
+    if connection.dialect.name == "mysql":
+        stmt = mysql_insert(table)
+        stmt = stmt.on_duplicate_key_update(**{column: table.c[column] + stmt.inserted[column] for column in EVENTS.values()})
+    else:
+        stmt = sqlite_insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[column.name for column in table.primary_key],
+            set_={column: table.c[column] + stmt.excluded[column] for column in EVENTS.values()},
+        )
+    connection.execute(stmt, rows)
+
+
+def _old_value(state, name):
+    history = state.attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(state.object, name)
+
+
+def _shipment_values(target, old=False):
+    state = inspect(target)
+    names = ("office_id", "status", "created_at", "sent_date", "received_date")
+    if old:
+        return tuple(_old_value(state, name) for name in names)
+    return tuple(getattr(target, name) for name in names)
+
+
+def _after_insert(mapper, connection, target):
+    apply_deltas(connection, contributions(*_shipment_values(target)))
+
+
+def _after_update(mapper, connection, target):
+    old, new = _shipment_values(target, old=True), _shipment_values(target)
+    if old == new:
+        return
+    apply_deltas(connection, _merge(contributions(*old, sign=-1), contributions(*new)))
+
+
+def _after_delete(mapper, connection, target):
+    apply_deltas(connection, contributions(*_shipment_values(target, old=True), sign=-1))
+
+
+def apply_status_changes(connection, shipments):
+    """Move shipments changed by a status UPDATE (rows with previous_status) to their new status"""
+    deltas = {}
+    for shipment in shipments:
+        dates = (shipment.created_at, shipment.sent_date, shipment.received_date)
+        # received_date only counts when DELIVERED, which no transition starts from
+        _merge(deltas, contributions(shipment.office_id, shipment.previous_status, *dates, sign=-1))
+        _merge(deltas, contributions(shipment.office_id, shipment.status, *dates))
+    apply_deltas(connection, deltas)
+
+
+def apply_removals(connection, shipments):
+    """Take shipments deleted in bulk (rows with office_id, status and the dates) out of their buckets"""
+    deltas = {}
+    for shipment in shipments:
+        _merge(deltas, contributions(
+            shipment.office_id, shipment.status, shipment.created_at, shipment.sent_date, shipment.received_date, sign=-1
+        ))
+    apply_deltas(connection, deltas)
+
+
+def rebuild():
+    """Recount every bucket from shipments and the archive; returns the number of buckets"""
+    from models.shipment import Shipment, ShipmentArchive
+    from models.shipment_throughput import ShipmentThroughput
+
+    totals = {}
+    for model in (Shipment, ShipmentArchive):
+        rows = db.session.query(
+            model.office_id, model.status, model.created_at, model.sent_date, model.received_date
+        ).order_by(model.id).yield_per(5000)
+        for row in rows:
+            _merge(totals, contributions(*row))
+
+    # Replace the table in one transaction; readers keep the old buckets until commit
+    table = ShipmentThroughput.__table__
+    rows = _rows(totals)
+    db.session.execute(delete(table))
+    for start in range(0, len(rows), 1000):
+        db.session.execute(table.insert(), rows[start:start + 1000])
+    db.session.commit()
+    return len(rows)
+
+
+def series(start, end, seconds, events=None, office_ids=None, group_by=(), max_buckets=None):
+    """
+    Counts per bucket of `seconds` between start and end (widened to whole buckets)
+    One series per event and per requested group (office, status); returns
+    (bucket starts, [(group dict, counts)])
+    """
+    from models.shipment_throughput import ShipmentThroughput as T
+
+    first = bucket_start(start, seconds)
+    stop = -(-epoch_seconds(end) // seconds) * seconds
+    if max_buckets is not None and (stop - first) // seconds > max_buckets:
+        raise ValueError(f"At most {max_buckets} buckets per request")
+
+    keys = [{"office": T.office_id, "status": T.status}[group] for group in group_by]
+    events = list(events or EVENTS)
+    query = select(T.bucket_start, *keys, *(func.sum(T.__table__.c[EVENTS[name]]) for name in events)).where(
+        T.resolution == stored_resolution(seconds), T.bucket_start >= first, T.bucket_start < stop
+    )
+    if office_ids:
+        query = query.where(T.office_id.in_(office_ids))
+    rows = db.session.connection().execute(query.group_by(T.bucket_start, *keys)).all()
+
+    # One matrix per event: group x requested bucket
+    index = {} if keys else {(): 0}
+    group_index = np.fromiter((index.setdefault(tuple(row[1:1 + len(keys)]), len(index)) for row in rows), dtype=np.intp, count=len(rows))
+    positions = (np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows)) - first) // seconds
+    sums = np.array([row[1 + len(keys):] for row in rows], dtype=np.int64).reshape(len(rows), len(events))
+    counts = np.zeros((len(events), len(index), (stop - first) // seconds), dtype=np.int64)
+    for e in range(len(events)):
+        np.add.at(counts[e], (group_index, positions), sums[:, e])
+
+    names = tuple(f"{group}_id" if group == "office" else group for group in group_by)
+    groups = sorted(index, key=lambda key: tuple(str(value) for value in key))
+    buckets = np.arange(first, stop, seconds).astype("datetime64[s]").astype(str).tolist()
+    return buckets, [
+        (dict(zip(names, group), event=name), counts[e, index[group]].tolist())
+        for e, name in enumerate(events) for group in groups
+    ]
+
+
+@click.command("rebuild-throughput")
+@with_appcontext
+def rebuild_throughput_command():
+    """Recount shipment_throughput from shipments and the archive"""
+    click.echo(f"Rebuilt {rebuild()} throughput buckets")
+
+
+def init_app(app):
+    global _listening
+    app.cli.add_command(rebuild_throughput_command)
+    if _listening:
+        return
+    _listening = True
+
+    from models.shipment import Shipment
+
+    event.listen(Shipment, "after_insert", _after_insert)
+    event.listen(Shipment, "after_update", _after_update)
+    event.listen(Shipment, "after_delete", _after_delete)
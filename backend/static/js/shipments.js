@@ -3,6 +3,7 @@ let currentFilter = 'ALL';
 let currentClientId = null;
 let currentUserId = null;
 let allClients = [];
+let receiverSearchTimer = null;
 
 async function init() {
     const token = localStorage.getItem("access_token");
@@ -26,8 +27,9 @@ async function init() {
     // Load clients for the send shipment form
     await loadClientsForForm();
     
-    // Attach form handler
+    // Attach form handlers
     document.getElementById("sendShipmentForm").addEventListener("submit", handleSendShipment);
+    document.getElementById("receiver_search").addEventListener("input", handleReceiverSearch);
 }
 
 async function loadClientProfile() {
@@ -85,11 +87,19 @@ async function loadShipments() {
     }
 }
 
-async function loadClientsForForm() {
+function handleReceiverSearch(e) {
+    // Debounce typeahead requests while the user is typing
+    clearTimeout(receiverSearchTimer);
+    const query = e.target.value.trim();
+    receiverSearchTimer = setTimeout(() => loadClientsForForm(query), 200);
+}
+
+async function loadClientsForForm(query = "") {
     const token = localStorage.getItem("access_token");
+    const params = new URLSearchParams({ q: query, limit: 20 });
     
     try {
-        const response = await fetch("/api/client", {
+        const response = await fetch(`/api/client/search?${params}`, {
             method: "GET",
             headers: { 
                 "Authorization": `Bearer ${token}`,
@@ -250,7 +260,8 @@ async function handleSendShipment(e) {
         weight: parseFloat(document.getElementById("send_weight").value),
         dimensions: document.getElementById("send_dimensions").value,
         description: document.getElementById("send_description").value,
-        price: parseFloat(document.getElementById("send_price").value),
+        // Empty price: the server prices the shipment by tariff
+        price: document.getElementById("send_price").value ? parseFloat(document.getElementById("send_price").value) : undefined,
         sent_date: new Date().toISOString(),
         status: "PENDING",
         origin_address: document.getElementById("send_origin_address").value,
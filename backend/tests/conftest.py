@@ -0,0 +1,90 @@
+import os
+import sys
+import tempfile
+
+import pytest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+# Temporary SQLite databases and no rate limits, set before the app reads its config
+# Company 1 (the fixture's) lives in the main database, company 2 on the "east" shard
+DB_DIR = tempfile.mkdtemp()
+DB_PATH = os.path.join(DB_DIR, "tests.db")
+SHARD_PATH = os.path.join(DB_DIR, "east.db")
+os.environ["DATABASE_URL"] = "sqlite:///" + DB_PATH
+os.environ["SHARDS"] = "east=sqlite:///" + SHARD_PATH
+os.environ["SHARD_MAP"] = "2=east"
+os.environ["ADMISSION_ENABLED"] = "0"
+os.environ.setdefault("JWT_SECRET_KEY", "test-secret-key-long-enough-for-hs256")
+
+from app import app as flask_app
+from extensions import db
+from services.sharding import shards
+from models import Company, Office, User, Employee, Client
+
+
+@pytest.fixture
+def app():
+    """The app on empty databases with one company, office, employee and two clients (main database)"""
+    flask_app.config["TESTING"] = True
+    with flask_app.app_context():
+        for engine in db.engines.values():
+            engine.dispose()
+        for path in (DB_PATH, SHARD_PATH):
+            if os.path.exists(path):
+                os.remove(path)
+        db.create_all()
+        shards.create_schema("east")
+
+        company = Company(name="Test", registration_number="T1", address="a", phone="p", email="e@test")
+        db.session.add(company)
+        db.session.flush()
+        office = Office(name="Sofia", company_id=company.id, address="a", phone="p", email="o@test",
+                        city="Sofia", country="Bulgaria")
+        db.session.add(office)
+        db.session.flush()
+        user = User(email="employee@test", role="EMPLOYEE")
+        user.set_password("employee123")
+        db.session.add(user)
+        db.session.flush()
+        db.session.add(Employee(user_id=user.id, company_id=company.id, office_id=office.id,
+                                first_name="E", last_name="Mployee", phone="1"))
+        for name in ("sender", "receiver"):
+            user = User(email=f"{name}@test", role="CLIENT")
+            user.set_password("client123")
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(Client(user_id=user.id, company_name=name, first_name=name, last_name="C",
+                                  phone="1", address="a", city="Sofia", country="BG"))
+        db.session.commit()
+        yield flask_app
+        db.session.remove()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def employee_headers(client):
+    response = client.post("/api/auth/login", json={"email": "employee@test", "password": "employee123"})
+    assert response.status_code == 200, response.get_json()
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+@pytest.fixture
+def create_shipment(client, employee_headers):
+    """create_shipment(tracking_number, price=10) -> id of a new PENDING shipment from client 1 to client 2"""
+
+    def create(tracking_number, price=10):
+        response = client.post("/api/shipment", headers=employee_headers, json={
+            "sender_id": 1, "receiver_id": 2, "registered_by_employee_id": 1,
+            "tracking_number": tracking_number, "weight": 1, "dimensions": "1x1x1", "description": "d",
+            "origin_address": "a", "destination_address": "b", "price": price,
+        })
+        assert response.status_code == 201, response.get_json()
+        return response.get_json()["shipment_id"]
+
+    return create
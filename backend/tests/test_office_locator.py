@@ -0,0 +1,54 @@
+import random
+
+import pytest
+
+from services.office_locator import OfficeLocator, haversine_km
+
+# Nearest-office grid (services/office_locator.py) and GET /api/office/nearest
+
+
+def grid(offices):
+    locator = OfficeLocator()
+    locator._regrid(offices)
+    locator._built = True
+    return locator
+
+
+def brute_force(offices, latitude, longitude, n, company_id=None):
+    distances = sorted(
+        (haversine_km(latitude, longitude, lat, lon), office_id)
+        for office_id, (lat, lon, company) in offices.items()
+        if company_id is None or company == company_id
+    )
+    return [office_id for _, office_id in distances[:n]]
+
+
+def test_nearest_matches_brute_force_inside_and_outside_the_grid():
+    rng = random.Random(7)
+    offices = {i: (rng.uniform(41.2, 44.2), rng.uniform(22.4, 28.6), rng.choice((1, 2))) for i in range(1, 301)}
+    locator = grid(offices)
+    points = [(rng.uniform(41, 44.5), rng.uniform(22, 29)) for _ in range(50)]
+    # Far outside the occupied cells, including the poles and the antimeridian
+    points += [(-89.9, -179.9), (90, 180), (0, 0), (60, 25), (42.7, -120)]
+    for latitude, longitude in points:
+        for n, company_id in ((1, None), (5, None), (3, 2)):
+            found = [office_id for office_id, _ in locator.nearest(latitude, longitude, n, company_id)]
+            assert found == brute_force(offices, latitude, longitude, n, company_id)
+
+
+def test_empty_grid():
+    assert grid({}).nearest(42.7, 23.3) == []
+
+
+@pytest.mark.parametrize("query", [
+    "lat=nan&lon=23", "lat=42&lon=inf", "lat=-inf&lon=0", "lat=91&lon=23", "lat=42&lon=180.5", "lat=1e7&lon=0",
+])
+def test_nearest_rejects_out_of_range_coordinates(client, employee_headers, query):
+    response = client.get(f"/api/office/nearest?{query}", headers=employee_headers)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "lat must be within -90..90 and lon within -180..180"
+
+
+def test_nearest_accepts_the_edges(client, employee_headers):
+    response = client.get("/api/office/nearest?lat=-90&lon=180", headers=employee_headers)
+    assert response.status_code == 200
@@ -0,0 +1,24 @@
+import pytest
+
+# Size range filters on GET /api/shipment (services/parcel_size.py)
+
+
+def test_size_filters_select_by_weight(client, employee_headers):
+    for tracking_number, weight in (("LIGHT", 1), ("HEAVY", 20)):
+        response = client.post("/api/shipment", headers=employee_headers, json={
+            "sender_id": 1, "receiver_id": 2, "registered_by_employee_id": 1,
+            "tracking_number": tracking_number, "weight": weight, "dimensions": "1x1x1", "description": "d",
+            "origin_address": "a", "destination_address": "b", "price": 10,
+        })
+        assert response.status_code == 201, response.get_json()
+
+    response = client.get("/api/shipment?min_weight=5", headers=employee_headers)
+    assert response.status_code == 200
+    assert [s["tracking_number"] for s in response.get_json()] == ["HEAVY"]
+
+
+@pytest.mark.parametrize("value", ["abc", "nan", "NaN", "inf", "-Infinity"])
+def test_size_filters_reject_non_numbers(client, employee_headers, value):
+    response = client.get(f"/api/shipment?min_weight={value}", headers=employee_headers)
+    assert response.status_code == 400
+    assert response.get_json()["error"] == "min_weight must be a number"
@@ -0,0 +1,42 @@
+from extensions import db
+from models.geocoded_address import GeocodedAddress
+from models.office import Office
+from services.geocoding import address_key
+
+# Courier route plans (GET /api/planning/routes/<office_id>, services/route_planner.py)
+
+DESTINATIONS = {"Vitosha 1, Sofia": (42.69, 23.32), "Rakovski 5, Sofia": (42.70, 23.33)}
+
+
+def planned(client, headers, day):
+    response = client.get(f"/api/planning/routes/1?date={day}&couriers=1&time_budget=0.1", headers=headers)
+    assert response.status_code == 200, response.get_json()
+    plan = response.get_json()
+    assert plan["date"] == day
+    return sorted(s["tracking_number"] for courier in plan["couriers"] for stop in courier["stops"] for s in stop["shipments"])
+
+
+def test_plan_covers_shipments_sent_by_the_day(client, employee_headers):
+    office = db.session.get(Office, 1)
+    office.latitude, office.longitude = 42.6977, 23.3219
+    for address, (latitude, longitude) in DESTINATIONS.items():
+        db.session.add(GeocodedAddress(address_key=address_key(address), address=address,
+                                       latitude=latitude, longitude=longitude))
+    db.session.commit()
+
+    for tracking_number, sent_date, address in (
+        ("EARLY", "2026-03-01T09:00:00", "Vitosha 1, Sofia"),
+        ("LATE", "2026-03-02T23:30:00", "Rakovski 5, Sofia"),
+        ("NEXT", "2026-03-03T00:00:00", "Rakovski 5, Sofia"),
+    ):
+        response = client.post("/api/shipment", headers=employee_headers, json={
+            "sender_id": 1, "receiver_id": 2, "registered_by_employee_id": 1, "tracking_number": tracking_number,
+            "weight": 1, "dimensions": "1x1x1", "description": "d", "origin_address": "a",
+            "destination_address": address, "price": 10, "status": "IN_TRANSIT", "sent_date": sent_date,
+        })
+        assert response.status_code == 201, response.get_json()
+
+    assert planned(client, employee_headers, "2026-02-28") == []
+    assert planned(client, employee_headers, "2026-03-01") == ["EARLY"]
+    assert planned(client, employee_headers, "2026-03-02") == ["EARLY", "LATE"]
+    assert planned(client, employee_headers, "2026-03-03") == ["EARLY", "LATE", "NEXT"]
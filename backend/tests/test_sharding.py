@@ -0,0 +1,114 @@
+import pytest
+from sqlalchemy import create_engine, text
+
+from conftest import SHARD_PATH
+from extensions import db
+from models import Client, Employee, Shipment, User
+from services.sharding import shards
+
+# Sharding by company (services/sharding.py): company 2 lives on the "east"
+# shard, a separate SQLite file; company 1 stays in the main database
+
+
+def shard_counts(*tables):
+    """Rows per table in the east shard file, read without the app"""
+    engine = create_engine("sqlite:///" + SHARD_PATH)
+    try:
+        with engine.connect() as connection:
+            return [connection.execute(text(f"SELECT COUNT(*) FROM {table}")).scalar() for table in tables]
+    finally:
+        engine.dispose()
+
+
+def login(client, email, password):
+    response = client.post("/api/auth/login", json={"email": email, "password": password})
+    assert response.status_code == 200, response.get_json()
+    return {"Authorization": f"Bearer {response.get_json()['access_token']}"}
+
+
+def shipment(tracking_number, employee_id, price=10):
+    return {
+        "sender_id": 1, "receiver_id": 2, "registered_by_employee_id": employee_id,
+        "tracking_number": tracking_number, "weight": 1, "dimensions": "1x1x1", "description": "d",
+        "origin_address": "a", "destination_address": "b", "price": price, "status": "DELIVERED",
+    }
+
+
+@pytest.fixture
+def east_headers(client, employee_headers):
+    """Company 2 with an office, an employee and two clients, all on the east shard"""
+    response = client.post("/api/company", headers=employee_headers, json={
+        "name": "East", "registration_number": "E1", "address": "a", "phone": "p", "email": "east@test",
+    })
+    assert response.get_json()["company_id"] == 2
+    response = client.post("/api/office", headers=employee_headers, json={
+        "name": "Varna", "company_id": 2, "address": "a", "phone": "p", "email": "v@test",
+        "city": "Varna", "country": "Bulgaria",
+    })
+    assert response.status_code == 201, response.get_json()
+    response = client.post("/api/auth/register", json={
+        "email": "east@test", "password": "east12345", "role": "EMPLOYEE", "company_id": 2, "office_id": 1,
+        "first_name": "East", "last_name": "Employee", "phone": "1",
+    })
+    assert response.status_code == 201, response.get_json()
+    headers = login(client, "east@test", "east12345")
+
+    for name in ("east-sender", "east-receiver"):
+        user = User(email=f"{name}@test", role="CLIENT")
+        user.set_password("client123")
+        db.session.add(user)
+        db.session.commit()
+        response = client.post("/api/client", headers=headers, json={
+            "user_id": user.id, "company_name": name, "first_name": name, "last_name": "C",
+            "phone": "1", "address": "a", "city": "Varna", "country": "BG",
+        })
+        assert response.status_code == 201, response.get_json()
+    return headers
+
+
+def test_create_schema_is_idempotent(app):
+    assert shards.create_schema("east") == []
+
+
+def test_shard_employee_writes_land_on_the_shard(client, employee_headers, east_headers):
+    assert shard_counts("offices", "employees", "clients") == [1, 1, 2]
+    assert (Employee.query.count(), Client.query.count()) == (1, 2)
+
+    with shards.use("east"):
+        east_employee = Employee.query.one().id
+    response = client.post("/api/shipment", headers=east_headers, json=shipment("EAST1", east_employee))
+    assert response.status_code == 201, response.get_json()
+    response = client.post("/api/shipment", headers=employee_headers, json=shipment("MAIN1", 1))
+    assert response.status_code == 201, response.get_json()
+
+    assert shard_counts("shipments", "client_shipment_stats") == [1, 2]
+    assert [s.tracking_number for s in Shipment.query] == ["MAIN1"]
+    # Each employee lists the shipments of their own database
+    assert [s["tracking_number"] for s in client.get("/api/shipment", headers=east_headers).get_json()] == ["EAST1"]
+    assert [s["tracking_number"] for s in client.get("/api/shipment", headers=employee_headers).get_json()] == ["MAIN1"]
+
+
+def test_public_tracking_finds_the_shard_row(client, east_headers):
+    with shards.use("east"):
+        east_employee = Employee.query.one().id
+    client.post("/api/shipment", headers=east_headers, json=shipment("EAST1", east_employee))
+
+    response = client.get("/api/shipment/track/EAST1")
+    assert response.status_code == 200
+    assert response.get_json()["tracking_number"] == "EAST1"
+    assert client.get("/api/shipment/track/NOPE").status_code == 404
+
+
+def test_reports_merge_every_database(client, employee_headers, east_headers):
+    with shards.use("east"):
+        east_employee = Employee.query.one().id
+    client.post("/api/shipment", headers=east_headers, json=shipment("EAST1", east_employee, price=5))
+    client.post("/api/shipment", headers=employee_headers, json=shipment("MAIN1", 1, price=7))
+
+    # Same shipment id 1 in both databases, told apart by the shard
+    rows = client.get("/api/shipment/reports/all-shipments", headers=employee_headers).get_json()
+    assert [(row["id"], row["tracking_number"], row["shard"]) for row in rows] == [(1, "MAIN1", None), (1, "EAST1", "east")]
+    assert rows == client.get("/api/shipment/reports/all-shipments", headers=east_headers).get_json()
+
+    revenue = client.get("/api/shipment/reports/revenue", headers=employee_headers).get_json()
+    assert (revenue["shipment_count"], revenue["total_revenue"]) == (2, "12.00")
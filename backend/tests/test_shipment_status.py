@@ -0,0 +1,151 @@
+from sqlalchemy import func
+
+from extensions import db
+from models.client_shipment_stats import ClientShipmentStats
+from models.shipment import Shipment
+from models.shipment_throughput import ShipmentThroughput
+from services import client_stats, throughput
+from services.shipment_status import StatusConflict, can_transition, transition
+
+# Batch status changes: POST /api/shipment/status and services/shipment_status.py
+
+
+def change_status(client, headers, status, shipments, **extra):
+    return client.post("/api/shipment/status", headers=headers, json={"status": status, "shipments": shipments, **extra})
+
+
+def statuses():
+    return {shipment.id: (shipment.status, shipment.version) for shipment in Shipment.query.order_by(Shipment.id)}
+
+
+def stats(client_id):
+    return db.session.get(ClientShipmentStats, client_id).to_dict()
+
+
+def throughput_by_status():
+    """{status: (created, sent, delivered)} of the day buckets"""
+    rows = db.session.query(
+        ShipmentThroughput.status,
+        func.sum(ShipmentThroughput.created_count),
+        func.sum(ShipmentThroughput.sent_count),
+        func.sum(ShipmentThroughput.delivered_count),
+    ).filter(ShipmentThroughput.resolution == "day").group_by(ShipmentThroughput.status)
+    return {status: (created, sent, delivered) for status, created, sent, delivered in rows if created or sent or delivered}
+
+
+def test_transition_table():
+    assert can_transition("PENDING", "IN_TRANSIT")
+    assert can_transition("PENDING", "CANCELLED")
+    assert can_transition("IN_TRANSIT", "DELIVERED")
+    assert can_transition("IN_TRANSIT", "CANCELLED")
+    assert not can_transition("PENDING", "DELIVERED")
+    assert not can_transition("IN_TRANSIT", "PENDING")
+    assert not can_transition("DELIVERED", "CANCELLED")
+    assert not can_transition("CANCELLED", "PENDING")
+
+
+def test_allowed_transitions_bump_versions(client, employee_headers, create_shipment):
+    shipment_id = create_shipment("S1")
+
+    response = change_status(client, employee_headers, "IN_TRANSIT", [shipment_id])
+    assert response.status_code == 200
+    assert response.get_json()["versions"] == {str(shipment_id): 2}
+
+    response = change_status(client, employee_headers, "DELIVERED", [{"id": shipment_id, "version": 2}],
+                             received_date="2026-03-01T10:00:00")
+    assert response.status_code == 200
+    assert response.get_json()["versions"] == {str(shipment_id): 3}
+
+    shipment = db.session.get(Shipment, shipment_id)
+    assert (shipment.status, shipment.previous_status, shipment.version) == ("DELIVERED", "IN_TRANSIT", 3)
+    assert shipment.received_date.isoformat() == "2026-03-01T10:00:00"
+
+
+def test_rejected_transitions_answer_409(client, employee_headers, create_shipment):
+    shipment_id = create_shipment("S1")
+
+    response = change_status(client, employee_headers, "DELIVERED", [shipment_id])
+    assert response.status_code == 409
+    assert response.get_json()["conflicts"] == [{
+        "id": shipment_id, "error": "Cannot change status from PENDING to DELIVERED", "status": "PENDING", "version": 1,
+    }]
+
+    assert change_status(client, employee_headers, "CANCELLED", [shipment_id]).status_code == 200
+    response = change_status(client, employee_headers, "IN_TRANSIT", [shipment_id])
+    assert response.status_code == 409
+    assert response.get_json()["conflicts"][0]["status"] == "CANCELLED"
+    assert statuses() == {shipment_id: ("CANCELLED", 2)}
+
+
+def test_unknown_status_and_bad_payload_answer_400(client, employee_headers, create_shipment):
+    shipment_id = create_shipment("S1")
+
+    assert change_status(client, employee_headers, "LOST", [shipment_id]).status_code == 400
+    assert change_status(client, employee_headers, "IN_TRANSIT", []).status_code == 400
+    assert change_status(client, employee_headers, "IN_TRANSIT", [{"id": shipment_id, "version": "x"}]).status_code == 400
+    assert statuses() == {shipment_id: ("PENDING", 1)}
+
+
+def test_stale_version_answers_409(client, employee_headers, create_shipment):
+    shipment_id = create_shipment("S1")
+    assert change_status(client, employee_headers, "IN_TRANSIT", [{"id": shipment_id, "version": 1}]).status_code == 200
+
+    # A second request still holding version 1
+    response = change_status(client, employee_headers, "CANCELLED", [{"id": shipment_id, "version": 1}])
+    assert response.status_code == 409
+    assert response.get_json()["conflicts"] == [{
+        "id": shipment_id, "error": "Shipment was modified by another request", "status": "IN_TRANSIT", "version": 2,
+    }]
+    assert statuses() == {shipment_id: ("IN_TRANSIT", 2)}
+
+
+def test_partial_batch_changes_nothing(client, employee_headers, create_shipment):
+    first, second, third = create_shipment("S1"), create_shipment("S2"), create_shipment("S3")
+    assert change_status(client, employee_headers, "CANCELLED", [third]).status_code == 200
+    before = statuses()
+    stats_before = stats(1)
+    throughput_before = throughput_by_status()
+
+    response = change_status(client, employee_headers, "IN_TRANSIT", [first, second, third, 999])
+    assert response.status_code == 409
+    assert {conflict["id"] for conflict in response.get_json()["conflicts"]} == {third, 999}
+
+    db.session.expire_all()
+    assert statuses() == before
+    assert stats(1) == stats_before
+    assert throughput_by_status() == throughput_before
+
+
+def test_transition_raises_conflict_and_rolls_back(app, create_shipment):
+    first, second = create_shipment("S1"), create_shipment("S2")
+    try:
+        transition({first: None, second: 5}, "IN_TRANSIT")
+    except StatusConflict as e:
+        assert [conflict["id"] for conflict in e.conflicts] == [second]
+    else:
+        raise AssertionError("expected StatusConflict")
+    assert statuses() == {first: ("PENDING", 1), second: ("PENDING", 1)}
+
+
+def test_counters_follow_status_update(client, employee_headers, create_shipment):
+    first, second = create_shipment("S1", price=10), create_shipment("S2", price=5)
+    assert stats(1) == {"sent": 2, "received": 0, "pending": 2, "in_transit": 0, "delivered": 0, "total_spend": "15.00"}
+    assert stats(2)["pending"] == 2
+    assert throughput_by_status() == {"PENDING": (2, 2, 0)}
+
+    assert change_status(client, employee_headers, "IN_TRANSIT", [first, second]).status_code == 200
+    assert change_status(client, employee_headers, "DELIVERED", [first]).status_code == 200
+    assert change_status(client, employee_headers, "CANCELLED", [second]).status_code == 200
+
+    db.session.expire_all()
+    # Cancelled shipments no longer count as spend; both clients see the same statuses
+    assert stats(1) == {"sent": 2, "received": 0, "pending": 0, "in_transit": 0, "delivered": 1, "total_spend": "10.00"}
+    assert stats(2) == {"sent": 0, "received": 2, "pending": 0, "in_transit": 0, "delivered": 1, "total_spend": "0.00"}
+    assert throughput_by_status() == {"DELIVERED": (1, 1, 1), "CANCELLED": (1, 1, 0)}
+
+    # The maintained counters match a recount from the shipments
+    live = (stats(1), stats(2), throughput_by_status())
+    client_stats.reconcile()
+    throughput.rebuild()
+    db.session.expire_all()
+    assert (stats(1), stats(2), throughput_by_status()) == live
@@ -0,0 +1,55 @@
+from datetime import datetime
+
+from extensions import db
+from models.shipment import Shipment
+from models.shipment_throughput import ShipmentThroughput
+from services.throughput import bucket_start, epoch_seconds
+
+# Throughput buckets with the dates the UI sends (new Date().toISOString(): UTC with a Z)
+
+
+def shipment_payload(tracking_number, **extra):
+    return {
+        "sender_id": 1, "receiver_id": 2, "registered_by_employee_id": 1,
+        "tracking_number": tracking_number, "weight": 1, "dimensions": "1x1x1", "description": "d",
+        "origin_address": "a", "destination_address": "b", "price": 10, **extra,
+    }
+
+
+def test_epoch_seconds_of_aware_dates_is_utc():
+    assert epoch_seconds(datetime.fromisoformat("2026-10-19T17:00:00+00:00")) == epoch_seconds(datetime(2026, 10, 19, 17))
+    assert epoch_seconds(datetime.fromisoformat("2026-10-19T19:00:00+02:00")) == epoch_seconds(datetime(2026, 10, 19, 17))
+
+
+def test_create_with_utc_sent_date(client, employee_headers):
+    response = client.post("/api/shipment", headers=employee_headers,
+                           json=shipment_payload("Z1", sent_date="2026-10-19T17:00:00.000Z"))
+    assert response.status_code == 201, response.get_json()
+
+    shipment = db.session.get(Shipment, response.get_json()["shipment_id"])
+    assert shipment.sent_date == datetime(2026, 10, 19, 17)
+    hour = ShipmentThroughput.query.filter_by(
+        resolution="hour", bucket_start=bucket_start(datetime(2026, 10, 19, 17), 3600), status="PENDING"
+    ).one()
+    assert hour.sent_count == 1
+
+
+def test_deliver_with_utc_received_date(client, employee_headers):
+    shipment_id = client.post("/api/shipment", headers=employee_headers,
+                              json=shipment_payload("Z2", status="IN_TRANSIT")).get_json()["shipment_id"]
+    response = client.put(f"/api/shipment/{shipment_id}", headers=employee_headers,
+                          json={"status": "DELIVERED", "received_date": "2026-10-20T08:30:00.000Z"})
+    assert response.status_code == 200, response.get_json()
+    assert db.session.get(Shipment, shipment_id).received_date == datetime(2026, 10, 20, 8, 30)
+
+
+def test_throughput_range_with_utc_dates(client, employee_headers):
+    client.post("/api/shipment", headers=employee_headers,
+                json=shipment_payload("Z3", sent_date="2026-10-19T17:00:00.000Z"))
+    response = client.get(
+        "/api/analytics/throughput?resolution=day&events=SENT"
+        "&start_date=2026-10-19T00:00:00.000Z&end_date=2026-10-20T00:00:00.000Z",
+        headers=employee_headers,
+    )
+    assert response.status_code == 200, response.get_json()
+    assert sum(sum(series["counts"]) for series in response.get_json()["series"]) == 1